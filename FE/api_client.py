@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = "http://127.0.0.1:8000"
+
+# (connect, read) seconds; map charts of the whole USA can take a while to stream
+TIMEOUT = (3.05, 60)
+
+
+class APIClient:
+    """
+    Client of the FastAPI backend shared by every rerun and session of the app.
+
+    Requests go through one keep-alive connection pool instead of a new TCP connection per call.
+    GETs are retried with backoff when the backend is busy (503) or restarting, and revalidated
+    with the ETag of the previous response, so an unchanged chart costs a 304 instead of its data.
+    """
+
+    def __init__(self, base_url=API_URL, pool_size=8, retries=3, timeout=TIMEOUT, max_etags=64):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="api-client")
+        self.max_etags = max_etags
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, params=None, headers=None, timeout=None):
+        """GET `path`; raises ValueError for error statuses. Returns the previous response on 304."""
+        params = {name: value for name, value in (params or {}).items() if value is not None}
+        headers = dict(headers or {})
+        key = (path, tuple(sorted((name, str(value)) for name, value in params.items())), headers.get("Accept"))
+        with self._lock:
+            previous = self._responses.get(key)
+        if previous is not None:
+            headers["If-None-Match"] = previous.headers["ETag"]
+
+        response = self.session.get(self.base_url + path, params=params, headers=headers,
+                                    timeout=timeout or self.timeout)
+        if response.status_code == 304 and previous is not None:
+            return previous
+        if response.status_code != 200:
+            raise ValueError(f"API error: {response.status_code}, {response.text}")
+
+        if "ETag" in response.headers:
+            with self._lock:
+                self._responses[key] = response
+                self._responses.move_to_end(key)
+                while len(self._responses) > self.max_etags:
+                    self._responses.popitem(last=False)
+        return response
+
+    def post(self, path, json=None, timeout=None):
+        """POST `path`; not retried, the backend may already have acted on it"""
+        return self.session.post(self.base_url + path, json=json, timeout=timeout or self.timeout)
+
+    def gather(self, *calls):
+        """Run (function, *args) calls concurrently on the client's pool and return their results in order"""
+        futures = [self.executor.submit(call[0], *call[1:]) for call in calls]
+        return [future.result() for future in futures]
+
+
+@st.cache_resource
+def get_client():
+    return APIClient()
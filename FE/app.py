@@ -4,17 +4,10 @@ import pandas as pd # read csv, df manipulation
 import time # to simulate a real time data, time loop 
 import plotly.express as px # interactive charts 
 import random
-from lat_lon_data import get_lat_lon
-from weather_data import get_weather_data
 from datetime import datetime
-import requests
 import draw_charts as draw_charts
-from astral import LocationInfo
-from astral.sun import sun
-from datetime import timedelta
-import pytz
-from database import TrafficIncidentCreate, TrafficIncident
-import get_wind_direction
+from gazetteer import load_gazetteer
+from api_client import get_client
 
 # page settings
 st.set_page_config(
@@ -70,7 +63,7 @@ st.title("Real-Time USA Accidents Dashboard")
 #     st.success("Data refreshed!")
 #     return df_accidents
 
-df_cities = pd.read_csv("uscities.csv")
+gazetteer = load_gazetteer()
 
 selected_page = st.radio("Welcome!", ["Dashboard", "Report"], horizontal=True)
 
@@ -95,18 +88,26 @@ if selected_page == "Dashboard":
 
         selected_state, selected_city = None, None
         if granularity in ["State", "City"]:
-            states = df_cities["state_id"].unique()
+            states = list(gazetteer.cities)
             selected_state = st.selectbox("Choose a State:", states)
 
         if granularity == "City":
-            cities = df_cities[df_cities["state_id"] == selected_state]["city"].unique()
+            cities = gazetteer.cities[selected_state]
             selected_city = st.selectbox("Choose a City:", cities)
 
     for seconds in range(10): # for testing 300*10 = 3000s
     #while True: # for real use
         # prepare data, dataframe and variables for all visualization
 
-        kp1_value, kp1_delta, kp2_value, kp2_delta, kp3_value, kp3_delta = draw_charts.col3(current_time)
+        # one round trip for every chart and KPI of the selected area
+        extent = draw_charts.map_extent(gazetteer, granularity, selected_state, selected_city)
+        dashboard = draw_charts.fetch_dashboard(state=selected_state, city=selected_city,
+                                                extent=extent, zoom=draw_charts.MAP_ZOOM[granularity],
+                                                as_of=current_time.date())
+        charts = dashboard["charts"]
+
+        kp1_value, kp1_delta, kp2_value, kp2_delta, kp3_value, kp3_delta = draw_charts.col3(
+            current_time, data=dashboard["stats"], state=selected_state, city=selected_city)
         with placeholder.container():
             #visualize
             # Display metrics
@@ -123,12 +124,12 @@ if selected_page == "Dashboard":
                 #st.markdown("### First Chart")
 
                 # Generate the chart
-                fig = draw_charts.chart3(granularity, state=selected_state, city=selected_city)
+                fig = draw_charts.chart3(granularity, state=selected_state, city=selected_city, data=charts["3"])
 
                 # Display the chart
                 st.plotly_chart(fig, use_container_width=True)
             with fig2_col2:
-                fig2 = draw_charts.chart4(granularity, state=selected_state, city=selected_city)
+                fig2 = draw_charts.chart4(granularity, state=selected_state, city=selected_city, data=charts["4"])
                 # Display the chart
                 st.plotly_chart(fig2, use_container_width=True)
 
@@ -138,12 +139,12 @@ if selected_page == "Dashboard":
                 #st.markdown("### First Chart")
 
                 # Generate the chart
-                fig3 = draw_charts.chart1(granularity, state=selected_state, city=selected_city)
+                fig3 = draw_charts.chart1(granularity, state=selected_state, city=selected_city, data=charts["1"])
 
                 # Display the chart
                 st.plotly_chart(fig3, use_container_width=True)
             with fig4_col2:
-                fig4 = draw_charts.chart2(granularity, state=selected_state, city=selected_city)
+                fig4 = draw_charts.chart2(granularity, state=selected_state, city=selected_city, data=charts["2"])
                 # Display the chart
                 st.plotly_chart(fig4, use_container_width=True)
             
@@ -153,12 +154,12 @@ if selected_page == "Dashboard":
                 #st.markdown("### First Chart")
 
                 # Generate the chart
-                fig5 = draw_charts.chart5(granularity, state=selected_state, city=selected_city)
+                fig5 = draw_charts.chart5(granularity, state=selected_state, city=selected_city, data=charts["5"])
 
                 # Display the chart
                 st.plotly_chart(fig5, use_container_width=True)
             with fig6_col2:
-                fig6 = draw_charts.chart6(granularity, state=selected_state, city=selected_city)
+                fig6 = draw_charts.chart6(granularity, state=selected_state, city=selected_city, data=charts["6"])
                 # Display the chart
                 st.plotly_chart(fig6, use_container_width=True)
 
@@ -189,20 +190,14 @@ st.markdown("""
 
 if selected_page == "Report":
     st.header("Accident Report Submission")
-    df = pd.read_csv("uscities.csv")
-    df = df.dropna(subset=['state_id', 'county_name', 'city'])
-
-    states = df['state_name'].unique()
+    states = list(gazetteer.state_ids)
     state = st.selectbox('Select State', states, index=0)
-    df_state = df[df['state_name'] == state]
+    state = gazetteer.state_ids[state]
     
-    state = df_state['state_id'].iloc[0]
-    
-    counties = df_state['county_name'].unique()
+    counties = gazetteer.counties[state]
     county = st.selectbox('Select County', counties, index=0)
-    df_county = df_state[df_state['county_name'] == county]
     
-    cities = df_county['city'].unique()
+    cities = gazetteer.county_cities.get((state, county), [])
     city = st.selectbox('Select City', cities, index=0)
 
     street = st.text_input("Street")
@@ -236,380 +231,44 @@ if selected_page == "Report":
         predicted_severity = st.button("Predict Severity")
         
 
-    if submitted:
-        # Save to MongoDB
-        
-        # get lat, lon
-        address = street + " " + city + " " + county + " " + state
-        lat_lon = get_lat_lon(address)
-
-        if lat_lon is None:
-            st.error("Address not found! Please check the details and try again.")
-        else:
-            lat, lon = lat_lon
-            # get weather data
-            weather_data = get_weather_data(lat, lon)
-            print(address)
-            print(weather_data)
-            
-            ## highest_id = 0
-            
-            ## last_record = reports_collection.find_one({}, sort=[("_id", pymongo.DESCENDING)])
-
-            ## if last_record:
-            ##     highest_id = int(last_record["ID"].split("-")[1])
-
-            # If collection is empty, start ID from 1
-            ## new_id = f"A-{highest_id + 1 if highest_id > 0 else 1}"
-            # for report in reports_collection.find().sort([("ID", pymongo.DESCENDING)]).limit(1):
-            #     highest_id = int(report["ID"].split("-")[1])
-
-            start_time = datetime.now()
-            end_time = start_time + timedelta(minutes=duration_minutes)
-            round_time = start_time
-
-            weather_main = weather_data.get("main", {})
-            weather_wind = weather_data.get("wind", {})
-            weather_conditions = weather_data.get("weather", [{}])[0]
-            
-            weather_report = {
-                "weather_timestamp": round_time,
-                "temperature_f": round((weather_main.get("temp", 0) - 273.15) * 9/5 + 32, 2),
-                "wind_chill_f": "",
-                "humidity_percent": weather_main.get("humidity", ""),
-                "pressure_in": round(weather_main.get("pressure", 0) * 0.02953, 2),
-                "visibility_mi": round(weather_data.get("visibility", 0) / 1609.34, 2),
-                "wind_direction": weather_wind.get("deg", 0),
-                "wind_speed_mph": round(weather_wind.get("speed", 0) * 2.23694, 2),
-                "precipitation_in": weather_data.get("rain", {}).get("1h", 0),
-                "weather_condition": weather_conditions.get("main", "Clear")
-            }
-
-            if weather_report["weather_condition"] == "Clouds":
-                weather_report["weather_condition"] = "Cloudy"
-            if weather_report["weather_condition"] == "Drizzle":
-                weather_report["weather_condition"] = "Rain"
-            if weather_report["weather_condition"] == "Mist":
-                weather_report["weather_condition"] = "Fog"
-            if weather_report["weather_condition"] == "Haze":
-                weather_report["weather_condition"] = "Fog"
-            if weather_report["weather_condition"] == "Dust":
-                weather_report["weather_condition"] = "Sand"
-            if weather_report["weather_condition"] == "Ash":
-                weather_report["weather_condition"] = "Sand"
-            if weather_report["weather_condition"] == "Squall":
-                weather_report["weather_condition"] = "Windy"
-
-            wind_direction_map = {
-                0: 'Calm',  # Calm winds
-                1: 'N',     # North
-                2: 'NE',    # North-East
-                3: 'E',     # East
-                4: 'SE',    # South-East
-                5: 'S',     # South
-                6: 'SW',    # South-West
-                7: 'W',     # West
-                8: 'NW',    # North-West
-                360: 'Calm',  # Calm (for 360 degrees)
-            }
-
-            final_wind_direction =  get_wind_direction.get_wind_direction(weather_report.get("wind_direction"), weather_report.get("wind_speed_mph"))
-
-            # Example location for now (modify as needed based on state/city input)
-            location = LocationInfo(city, "US", "UTC", lat, lon)
-
-            # Get current sun times for the location
-            s = sun(location.observer, date=datetime.now().date())
-
-            # Assume s['sunrise'] and s['sunset'] have a timezone (e.g., UTC or any other)
-            timezone = s['sunrise'].tzinfo  # Extract timezone from the datetime
-            current_time = datetime.now(pytz.utc).astimezone(timezone)  # Localize to match sunrise/sunset
-
-
-            # st.write(s.keys())
-            # Determine day or night
-            sunrise_sunset = "Day" if s['sunrise'] <= current_time <= s['sunset'] else "Night"
-            civil_twilight = "Day" if s['dawn'] <= current_time <= s['dusk'] else "Night"
-            nautical_twilight = "Day" if s['dawn'] <= current_time <= s['dusk'] else "Night"
-            astronomical_twilight = "Day" if s['dawn'] <= current_time <= s['dusk'] else "Night"
-
-            # report = {
-            #     "ID": new_id,
-            #     "Source": "Source2",
-            #     "Severity": severity,
-            #     "Start_Time": start_time,
-            #     "End_Time": end_time.strftime("%Y-%m-%d %H:%M:%S"),
-            #     "Start_Lat": lat,
-            #     "Start_Lng": lon,
-            #     "End_Lat": "",
-            #     "End_Lng": "",
-            #     "Distance(mi)": 0,
-            #     "Description": description,
-            #     "Street": street,
-            #     "City": city,
-            #     "County": county,
-            #     "State": state,
-            #     "Zipcode": 0,
-            #     "Country": "US",
-            #     "Timezone": "US/Pacific",
-            #     "Airport_Code": "",
-            #     **weather_report,
-            #     "Amenity": amenity,
-            #     "Bump": bump,
-            #     "Crossing": crossing,
-            #     "Give_Way": give_way,
-            #     "Junction": junction,
-            #     "No_Exit": no_exit,
-            #     "Railway": railway,
-            #     "Roundabout": roundabout,
-            #     "Station": station,
-            #     "Stop": stop,
-            #     "Traffic_Calming": traffic_calming,
-            #     "Traffic_Signal": traffic_signal,
-            #     "Turning_Loop": turning_loop,
-            #     "Sunrise_Sunset": sunrise_sunset,
-            #     "Civil_Twilight": civil_twilight,
-            #     "Nautical_Twilight": nautical_twilight,
-            #     "Astronomical_Twilight": astronomical_twilight
-            # }
-
-
-            # report = TrafficIncidentCreate(
-            #     severity=severity,
-            #     start_time=start_time,
-            #     end_time=end_time,
-            #     start_lat=lat,
-            #     start_lng=lon,
-            #     description=description,
-            #     street=street,
-            #     city=city,
-            #     county=county,
-            #     state=state,
-            #     weather_timestamp=round_time,
-            #     temperature_f=weather_report.get("temperature_f"),
-            #     humidity_percent=weather_report.get("humidity_percent"),
-            #     pressure_in=weather_report.get("pressure_in"),
-            #     visibility_mi=weather_report.get("visibility_mi"),
-            #     wind_direction=final_wind_direction,
-            #     wind_speed_mph=weather_report.get("wind_speed_mph"),
-            #     precipitation_in=weather_report.get("precipitation_in"),
-            #     weather_condition=weather_report.get("weather_condition"),
-            #     amenity=amenity,
-            #     bump=bump,
-            #     crossing=crossing,
-            #     give_way=give_way,
-            #     junction=junction,
-            #     no_exit=no_exit,
-            #     railway=railway,
-            #     roundabout=roundabout,
-            #     station=station,
-            #     stop=stop,
-            #     traffic_calming=traffic_calming,
-            #     traffic_signal=traffic_signal,
-            #     turning_loop=turning_loop,
-            #     sunrise_sunset=sunrise_sunset,
-            #     civil_twilight=civil_twilight,
-            #     nautical_twilight=nautical_twilight,
-            #     astronomical_twilight=astronomical_twilight
-            # )
-
-            report = {
-                "severity": severity,
-                "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "end_time": end_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "start_lat": lat,
-                "start_lng":  lon,
-                "description":  description,
-                "street":  street,
-                "city":  city,
-                "county":  county,
-                "state":  state,
-                "weather_timestamp":  round_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "temperature_f":  weather_report.get("temperature_f"),
-                "humidity_percent":  weather_report.get("humidity_percent"),
-                "pressure_in":  weather_report.get("pressure_in"),
-                "visibility_mi":  weather_report.get("visibility_mi"),
-                "wind_direction":  final_wind_direction,
-                "wind_speed_mph":  weather_report.get("wind_speed_mph"),
-                "precipitation_in":  weather_report.get("precipitation_in"),
-                "weather_condition":  weather_report.get("weather_condition"),
-                "amenity":  amenity,
-                "bump":  bump,
-                "crossing":  crossing,
-                "give_way":  give_way,
-                "junction":  junction,
-                "no_exit":  no_exit,
-                "railway":  railway,
-                "roundabout":  roundabout,
-                "station":  station,
-                "stop":  stop,
-                "traffic_calming":  traffic_calming,
-                "traffic_signal":  traffic_signal,
-                "turning_loop":  turning_loop,
-                "sunrise_sunset":  sunrise_sunset,
-                "civil_twilight":  civil_twilight,
-                "nautical_twilight":  nautical_twilight,
-                "astronomical_twilight":  astronomical_twilight
-                }
-                
-            
-            #  #to insert to postgresql
-            # reports_collection.insert_one(report)
-            
-            response_data_model = requests.post(
-                "http://127.0.0.1:8000/accident", 
-                json=report
-            )
-            if response_data_model.status_code != 200:
-                raise ValueError(f"API error: {response_data_model.status_code}, {response_data_model.text}")
-            st.success("Report submitted successfully!")
-
-    if predicted_severity:
-        # Save to MongoDB
-        
-        # get lat, lon
-        address = street + " " + city + " " + county + " " + state
-        lat_lon = get_lat_lon(address)
+    if submitted or predicted_severity:
+        # The backend geocodes the address and adds the weather and daylight before inserting or scoring it
+        report = {
+            "street": street,
+            "city": city,
+            "county": county,
+            "state": state,
+            "severity": severity,
+            "description": description,
+            "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_minutes": duration_minutes,
+            "amenity": amenity,
+            "bump": bump,
+            "crossing": crossing,
+            "give_way": give_way,
+            "junction": junction,
+            "no_exit": no_exit,
+            "railway": railway,
+            "roundabout": roundabout,
+            "station": station,
+            "stop": stop,
+            "traffic_calming": traffic_calming,
+            "traffic_signal": traffic_signal,
+            "turning_loop": turning_loop,
+            "insert": bool(submitted),
+            "predict": bool(predicted_severity),
+        }
+        response = get_client().post("/report", json=report)
 
-        if lat_lon is None:
+        if response.status_code == 404:
             st.error("Address not found! Please check the details and try again.")
+        elif response.status_code != 200:
+            raise ValueError(f"API error: {response.status_code}, {response.text}")
         else:
-            lat, lon = lat_lon
-        
-            # get weather data
-            weather_data = get_weather_data(lat, lon)
-            print(address)
-            print(weather_data)
-            
-            ## highest_id = 0
-            
-            ## last_record = reports_collection.find_one({}, sort=[("_id", pymongo.DESCENDING)])
-
-            ## if last_record:
-            ##     highest_id = int(last_record["ID"].split("-")[1])
-
-            # If collection is empty, start ID from 1
-            ## new_id = f"A-{highest_id + 1 if highest_id > 0 else 1}"
-            # for report in reports_collection.find().sort([("ID", pymongo.DESCENDING)]).limit(1):
-            #     highest_id = int(report["ID"].split("-")[1])
-
-            start_time = datetime.now()
-            end_time = start_time + timedelta(minutes=duration_minutes)
-            round_time = start_time
-
-            weather_main = weather_data.get("main", {})
-            weather_wind = weather_data.get("wind", {})
-            weather_conditions = weather_data.get("weather", [{}])[0]
-            
-            weather_report = {
-                "weather_timestamp": round_time,
-                "temperature_f": round((weather_main.get("temp", 0) - 273.15) * 9/5 + 32, 2),
-                "wind_chill_f": "",
-                "humidity_percent": weather_main.get("humidity", ""),
-                "pressure_in": round(weather_main.get("pressure", 0) * 0.02953, 2),
-                "visibility_mi": round(weather_data.get("visibility", 0) / 1609.34, 2),
-                "wind_direction": weather_wind.get("deg", 0),
-                "wind_speed_mph": round(weather_wind.get("speed", 0) * 2.23694, 2),
-                "precipitation_in": weather_data.get("rain", {}).get("1h", 0),
-                "weather_condition": weather_conditions.get("main", "Clear")
-            }
-
-            if weather_report["weather_condition"] == "Clouds":
-                weather_report["weather_condition"] = "Cloudy"
-            if weather_report["weather_condition"] == "Drizzle":
-                weather_report["weather_condition"] = "Rain"
-            if weather_report["weather_condition"] == "Mist":
-                weather_report["weather_condition"] = "Fog"
-            if weather_report["weather_condition"] == "Haze":
-                weather_report["weather_condition"] = "Fog"
-            if weather_report["weather_condition"] == "Dust":
-                weather_report["weather_condition"] = "Sand"
-            if weather_report["weather_condition"] == "Ash":
-                weather_report["weather_condition"] = "Sand"
-            if weather_report["weather_condition"] == "Squall":
-                weather_report["weather_condition"] = "Windy"
-
-            wind_direction_map = {
-                0: 'Calm',  # Calm winds
-                1: 'N',     # North
-                2: 'NE',    # North-East
-                3: 'E',     # East
-                4: 'SE',    # South-East
-                5: 'S',     # South
-                6: 'SW',    # South-West
-                7: 'W',     # West
-                8: 'NW',    # North-West
-                360: 'Calm',  # Calm (for 360 degrees)
-            }
-
-            final_wind_direction =  get_wind_direction.get_wind_direction(weather_report.get("wind_direction"), weather_report.get("wind_speed_mph"))
-
-            # Example location for now (modify as needed based on state/city input)
-            location = LocationInfo(city, "US", "UTC", lat, lon)
-
-            # Get current sun times for the location
-            s = sun(location.observer, date=datetime.now().date())
-
-            # Assume s['sunrise'] and s['sunset'] have a timezone (e.g., UTC or any other)
-            timezone = s['sunrise'].tzinfo  # Extract timezone from the datetime
-            current_time = datetime.now(pytz.utc).astimezone(timezone)  # Localize to match sunrise/sunset
-
-
-            # st.write(s.keys())
-            # Determine day or night
-            sunrise_sunset = "Day" if s['sunrise'] <= current_time <= s['sunset'] else "Night"
-            civil_twilight = "Day" if s['dawn'] <= current_time <= s['dusk'] else "Night"
-            nautical_twilight = "Day" if s['dawn'] <= current_time <= s['dusk'] else "Night"
-            astronomical_twilight = "Day" if s['dawn'] <= current_time <= s['dusk'] else "Night"
-
-            report = {
-                "severity": severity,
-                "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "end_time": end_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "start_lat": lat,
-                "start_lng":  lon,
-                "description":  description,
-                "street":  street,
-                "city":  city,
-                "county":  county,
-                "state":  state,
-                "weather_timestamp":  round_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "temperature_f":  weather_report.get("temperature_f"),
-                "humidity_percent":  weather_report.get("humidity_percent"),
-                "pressure_in":  weather_report.get("pressure_in"),
-                "visibility_mi":  weather_report.get("visibility_mi"),
-                "wind_direction":  final_wind_direction,
-                "wind_speed_mph":  weather_report.get("wind_speed_mph"),
-                "precipitation_in":  weather_report.get("precipitation_in"),
-                "weather_condition":  weather_report.get("weather_condition"),
-                "amenity":  amenity,
-                "bump":  bump,
-                "crossing":  crossing,
-                "give_way":  give_way,
-                "junction":  junction,
-                "no_exit":  no_exit,
-                "railway":  railway,
-                "roundabout":  roundabout,
-                "station":  station,
-                "stop":  stop,
-                "traffic_calming":  traffic_calming,
-                "traffic_signal":  traffic_signal,
-                "turning_loop":  turning_loop,
-                "sunrise_sunset":  sunrise_sunset,
-                "civil_twilight":  civil_twilight,
-                "nautical_twilight":  nautical_twilight,
-                "astronomical_twilight":  astronomical_twilight
-                }
-
-            # Make an API request or call the model
-            prediction_response = requests.post(
-                "http://127.0.0.1:8000/predict", 
-                json=report
-            )
-
-            st.success(f"The predicted severity of the accident is: {prediction_response.text}")
-            # if prediction_response.status_code == 200:
-            #     predicted_severity = prediction_response.json().get("predicted_severity")
-            #     st.success(f"The predicted severity of the accident is: {predicted_severity}")
-            # else:
-            #     st.error(f"Error in severity prediction: {prediction_response.status_code}")
\ No newline at end of file
+            result = response.json()
+            if result["inserted"]:
+                st.success("Report submitted successfully!")
+            if result["predicted_severity"] is not None:
+                st.success(f"The predicted severity of the accident is: {result['predicted_severity']}")
+            if result["prediction_error"]:
+                st.warning(f"The severity could not be predicted: {result['prediction_error']}")
@@ -1,10 +1,114 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import requests
 
+from api_client import get_client
 
-def col3(current_time):
+try:
+    import pyarrow as pa
+except ImportError:  # without pyarrow the charts are fetched as JSON
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+# Map charts are streamed by the backend and, as JSON, fetched page by page
+PAGINATED_CHARTS = {3, 4}
+PAGE_ROWS = 200000
+
+# Map zoom of each granularity; the map charts request tiles at the matching resolution
+MAP_ZOOM = {"USA": 3, "State": 5, "City": 9}
+# (min_lat, min_lng, max_lat, max_lng) of the contiguous United States
+USA_EXTENT = (24.0, -125.0, 50.0, -66.0)
+
+
+def map_extent(gazetteer, granularity, state=None, city=None):
+    """Bounding box shown by the map charts, from the gazetteer coordinates of the selected area"""
+    if granularity == "State" and state in gazetteer.state_extents:
+        min_lat, min_lng, max_lat, max_lng = gazetteer.state_extents[state]
+        pad = 0.5
+    elif granularity == "City" and gazetteer.city_location(state, city) is not None:
+        min_lat, min_lng = max_lat, max_lng = gazetteer.city_location(state, city)
+        pad = 0.25
+    else:
+        return USA_EXTENT
+    return min_lat - pad, min_lng - pad, max_lat + pad, max_lng + pad
+
+
+def fetch_chart(chart, state=None, city=None):
+    """
+    DataFrame of one chart endpoint. Asks for an Arrow IPC stream when pyarrow is available,
+    the backend answers with JSON records otherwise.
+    """
+    if pa is None and chart in PAGINATED_CHARTS:
+        return fetch_chart_pages(chart, state, city)
+    return fetch_frame(f"/chart/{chart}", {"state": state, "city": city})
+
+
+def fetch_tiles(zoom, extent, state=None, city=None, by_severity=False):
+    """
+    Map chart data from the backend's tile pyramid: only the tiles inside `extent`, at the
+    resolution of a map drawn at `zoom`. Same columns as /chart/3 (by_severity=False) or /chart/4.
+    """
+    min_lat, min_lng, max_lat, max_lng = extent
+    params = {"zoom": zoom, "min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng,
+              "by_severity": by_severity, "state": state, "city": city}
+    if pa is None:
+        return fetch_pages("/chart/tiles", params)
+    return fetch_frame("/chart/tiles", params)
+
+
+def fetch_frame(path, params):
+    headers = {"Accept": f"{ARROW_STREAM}, application/json;q=0.9"} if pa is not None else {}
+    response = get_client().get(path, params=params, headers=headers)
+    if response.headers.get("content-type", "").startswith(ARROW_STREAM):
+        return pa.ipc.open_stream(response.content).read_pandas()
+    return pd.DataFrame(response.json())
+
+
+def fetch_chart_pages(chart, state=None, city=None):
+    return fetch_pages(f"/chart/{chart}", {"state": state, "city": city})
+
+
+def fetch_pages(path, params):
+    """Follow the backend's next_cursor until the whole chart is fetched"""
+    pages, cursor = [], None
+    while True:
+        response = get_client().get(path, params={**params, "limit": PAGE_ROWS, "cursor": cursor})
+        page = response.json()
+        pages.append(pd.DataFrame(page["rows"]))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pd.concat(pages, ignore_index=True)
+
+
+def fetch_dashboard(state=None, city=None, extent=None, zoom=None, as_of=None):
+    """
+    Every chart dataset and the KPI stats for the day `as_of` from one /dashboard request.
+    Pass data["charts"]["1"] ... ["6"] to chart1..chart6 and data["stats"] to col3.
+    With an `extent` and `zoom` the two map charts, by far the largest, come from the tile
+    pyramid instead; otherwise they are fetched as Arrow when pyarrow is installed. The map
+    charts are fetched concurrently with the dashboard request.
+    """
+    params = {"state": state, "city": city, "as_of": as_of.isoformat() if as_of else None}
+    if extent is not None:
+        map_calls = [(fetch_tiles, zoom, extent, state, city), (fetch_tiles, zoom, extent, state, city, True)]
+    elif pa is not None:
+        map_calls = [(fetch_chart, 3, state, city), (fetch_chart, 4, state, city)]
+    else:
+        map_calls = []
+    if map_calls:
+        params["charts"] = "1,2,5,6"
+
+    client = get_client()
+    response, *maps = client.gather((client.get, "/dashboard", params), *map_calls)
+    data = response.json()
+    if maps:
+        data["charts"]["3"], data["charts"]["4"] = maps
+    return data
+
+
+def col3(current_time, data=None, state=None, city=None):
     # #### Total accident ####
     #     # Filter data for the selected day
     #     df_accidents['Start_Time'] = pd.to_datetime(df_accidents['Start_Time'], format='mixed')  #mixed, '%Y/%m/%d %H:%M:%S.%f'
@@ -121,12 +225,12 @@ def col3(current_time):
 
 
         # Fetch the data from the backend API
-    response = requests.get("http://127.0.0.1:8000/chart/stats")
-    if response.status_code != 200:
-        raise ValueError(f"API error: {response.status_code}, {response.text}")
+    if data is None:
+        response = get_client().get("/chart/stats",
+                                    params={"as_of": current_time.date().isoformat(), "state": state, "city": city})
     
-    # Parse the API response
-    data = response.json()
+        # Parse the API response
+        data = response.json()
 
     #### Total accident ####
     # Extract today's and yesterday's accident counts
@@ -176,7 +280,7 @@ def col3(current_time):
 
         
 
-def chart1(granularity, state=None, city=None):
+def chart1(granularity, state=None, city=None, data=None):
     # if granularity == "USA":
     #     filtered_df = df_accidents
     # elif granularity == "State" and state:
@@ -205,15 +309,10 @@ def chart1(granularity, state=None, city=None):
 
     # combined_data["Month"] = combined_data["Month"].dt.to_timestamp()
 
-    response = requests.get(
-        "http://127.0.0.1:8000/chart/1", 
-        params={"state": state, "city": city}
-    )
-    if response.status_code != 200:
-        raise ValueError(f"API error: {response.status_code}, {response.text}")
-
-    data = response.json()
-    combined_data = pd.DataFrame(data)
+    if data is None:
+        combined_data = fetch_chart(1, state, city)
+    else:
+        combined_data = pd.DataFrame(data)
 
     combined_data["Month"] = pd.to_datetime(combined_data["month"], format="%Y-%m")
 
@@ -248,7 +347,7 @@ def chart1(granularity, state=None, city=None):
 
     return fig
 
-def chart2(granularity, state=None, city=None):
+def chart2(granularity, state=None, city=None, data=None):
     # if granularity == "USA":
     #     filtered_df = df_accidents
     # elif granularity == "State" and state:
@@ -284,15 +383,10 @@ def chart2(granularity, state=None, city=None):
     #     .reset_index()
     # )
 
-    response = requests.get(
-        "http://127.0.0.1:8000/chart/2", 
-        params={"state": state, "city": city}
-    )
-    if response.status_code != 200:
-        raise ValueError(f"API error: {response.status_code}, {response.text}")
-
-    data = response.json()
-    weather_severity_counts = pd.DataFrame(data)
+    if data is None:
+        weather_severity_counts = fetch_chart(2, state, city)
+    else:
+        weather_severity_counts = pd.DataFrame(data)
 
 
     fig = px.bar(
@@ -313,7 +407,7 @@ def chart2(granularity, state=None, city=None):
     return fig
 
 
-def chart3(granularity, state=None, city=None):
+def chart3(granularity, state=None, city=None, data=None, extent=None):
     # if granularity == "USA":
     #     filtered_df = df_accidents
     # elif granularity == "State" and state:
@@ -330,15 +424,12 @@ def chart3(granularity, state=None, city=None):
     # )  # Format: "YYYY-MM"
 
 
-    response = requests.get(
-        "http://127.0.0.1:8000/chart/3", 
-        params={"state": state, "city": city}
-    )
-    if response.status_code != 200:
-        raise ValueError(f"API error: {response.status_code}, {response.text}")
-
-    data = response.json()
-    filtered_df = pd.DataFrame(data)
+    if data is None and extent is not None:
+        filtered_df = fetch_tiles(MAP_ZOOM[granularity], extent, state, city, by_severity=False)
+    elif data is None:
+        filtered_df = fetch_chart(3, state, city)
+    else:
+        filtered_df = pd.DataFrame(data)
 
     fig = px.density_mapbox(
         filtered_df,
@@ -354,7 +445,7 @@ def chart3(granularity, state=None, city=None):
         labels={"month": "Time (Year-Month)", "accident_count": "Accidents"},
         center={"lat": filtered_df["grid_lat"].mean(),
             "lon": filtered_df["grid_lng"].mean(),},
-        zoom=2.95 if granularity == "USA" else 5,
+        zoom=MAP_ZOOM[granularity],
     )
 
     fig.update_layout(
@@ -371,7 +462,7 @@ def chart3(granularity, state=None, city=None):
     return fig
 
 
-def chart4(granularity, state=None, city=None):
+def chart4(granularity, state=None, city=None, data=None, extent=None):
     # if granularity == "USA":
     #     filtered_df = df_accidents
     # elif granularity == "State" and state:
@@ -395,15 +486,12 @@ def chart4(granularity, state=None, city=None):
     #     filtered_df["Start_Time"].dt.to_period("M").astype(str)
     # )  # Format: "YYYY-MM"
 
-    response = requests.get(
-        "http://127.0.0.1:8000/chart/4", 
-        params={"state": state, "city": city}
-    )
-    if response.status_code != 200:
-        raise ValueError(f"API error: {response.status_code}, {response.text}")
-
-    data = response.json()
-    filtered_df = pd.DataFrame(data)
+    if data is None and extent is not None:
+        filtered_df = fetch_tiles(MAP_ZOOM[granularity], extent, state, city, by_severity=True)
+    elif data is None:
+        filtered_df = fetch_chart(4, state, city)
+    else:
+        filtered_df = pd.DataFrame(data)
 
     severity_colors = {
         '1': "#0000FF",
@@ -425,7 +513,7 @@ def chart4(granularity, state=None, city=None):
         center={"lat": 37.0902, "lon": -95.7129},
         opacity=1,
         size_max=40,
-        zoom=3 if granularity == "USA" else 5,
+        zoom=MAP_ZOOM[granularity],
         title="Accidents by Severity",
     )
 
@@ -442,7 +530,7 @@ def chart4(granularity, state=None, city=None):
     return fig
 
 
-def chart5(granularity, state=None, city=None):
+def chart5(granularity, state=None, city=None, data=None):
     # if granularity == "USA":
     #     filtered_df = df_accidents
     # elif granularity == "State" and state:
@@ -475,15 +563,10 @@ def chart5(granularity, state=None, city=None):
     #     value_name="Accident_Count"
     # )
 
-    response = requests.get(
-    "http://127.0.0.1:8000/chart/5", 
-    params={"state": state, "city": city}
-    )
-    if response.status_code != 200:
-        raise ValueError(f"API error: {response.status_code}, {response.text}")
-
-    data = response.json()
-    df_heatmap = pd.DataFrame(data)
+    if data is None:
+        df_heatmap = fetch_chart(5, state, city)
+    else:
+        df_heatmap = pd.DataFrame(data)
 
     df_heatmap = df_heatmap.melt(
         id_vars=["year", "Severity"],
@@ -521,7 +604,7 @@ def chart5(granularity, state=None, city=None):
     return fig
 
 
-def chart6(granularity, state=None, city=None):
+def chart6(granularity, state=None, city=None, data=None):
     # if granularity == "USA":
     #     filtered_df = df_accidents
     # elif granularity == "State" and state:
@@ -554,15 +637,10 @@ def chart6(granularity, state=None, city=None):
 
     # hourly_severity["Severity"] = hourly_severity["Severity"].astype(str)
 
-    response = requests.get(
-    "http://127.0.0.1:8000/chart/6", 
-    params={"state": state, "city": city}
-    )
-    if response.status_code != 200:
-        raise ValueError(f"API error: {response.status_code}, {response.text}")
-
-    data = response.json()
-    df_heatmap = pd.DataFrame(data)
+    if data is None:
+        df_heatmap = fetch_chart(6, state, city)
+    else:
+        df_heatmap = pd.DataFrame(data)
 
     fig = px.density_heatmap(
         df_heatmap,
@@ -0,0 +1,55 @@
+import pandas as pd
+import streamlit as st
+
+CITIES_CSV = "uscities.csv"
+
+
+class Gazetteer:
+    """
+    The state -> county -> city hierarchy and city coordinates of uscities.csv as plain dicts,
+    so the sidebar and report widgets look up their options instead of filtering a DataFrame.
+    Lists keep the order of the CSV, like DataFrame.unique() did.
+    """
+
+    def __init__(self, df):
+        df = df.dropna(subset=["state_id", "city"])
+        self.state_names = {}                 # state_id -> state name
+        self.state_ids = {}                   # state name -> state_id
+        self.cities = {}                      # state_id -> [city]
+        self.counties = {}                    # state_id -> [county]
+        self.county_cities = {}               # (state_id, county) -> [city]
+        self.coordinates = {}                 # (state_id, city) -> (lat, lng) of its first row
+        self.state_extents = {}               # state_id -> (min_lat, min_lng, max_lat, max_lng)
+
+        for state_id, state_name, county, city, lat, lng in zip(
+                df["state_id"], df["state_name"], df["county_name"], df["city"], df["lat"], df["lng"]):
+            if state_id not in self.state_names:
+                self.state_names[state_id] = state_name
+                self.state_ids[state_name] = state_id
+                self.cities[state_id] = {}
+                self.counties[state_id] = {}
+            self.cities[state_id][city] = None
+            if isinstance(county, str):
+                self.counties[state_id][county] = None
+                self.county_cities.setdefault((state_id, county), {})[city] = None
+            self.coordinates.setdefault((state_id, city), (float(lat), float(lng)))
+
+            min_lat, min_lng, max_lat, max_lng = self.state_extents.get(state_id, (lat, lng, lat, lng))
+            self.state_extents[state_id] = (min(min_lat, lat), min(min_lng, lng), max(max_lat, lat), max(max_lng, lng))
+
+        # Ordered dicts were used as ordered sets
+        self.cities = {state_id: list(cities) for state_id, cities in self.cities.items()}
+        self.counties = {state_id: list(counties) for state_id, counties in self.counties.items()}
+        self.county_cities = {key: list(cities) for key, cities in self.county_cities.items()}
+        self.state_extents = {state_id: tuple(float(value) for value in extent)
+                              for state_id, extent in self.state_extents.items()}
+
+    def city_location(self, state_id, city):
+        """(lat, lng) of a city, None when it is not in the gazetteer"""
+        return self.coordinates.get((state_id, city))
+
+
+@st.cache_resource
+def load_gazetteer(path=CITIES_CSV):
+    """Parsed once per Streamlit server, shared by every session and rerun"""
+    return Gazetteer(pd.read_csv(path, usecols=["city", "state_id", "state_name", "county_name", "lat", "lng"]))
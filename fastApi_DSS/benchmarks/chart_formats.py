@@ -0,0 +1,54 @@
+"""
+JSON records against Arrow IPC for the chart endpoints on a USA-wide request (no filters).
+
+For each chart reports the payload size as transferred (gzip) and decoded, the request
+time and the client-side decode time into a DataFrame, which is what draw_charts does
+with every response.
+
+Usage (with the API running on localhost:8000, pyarrow installed on both ends):
+    python chart_formats.py --charts 3 4 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+import pandas as pd
+import pyarrow as pa
+import requests
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def measure(url: str, accept: str, decode, repeat: int):
+    session = requests.Session()
+    fetch, parse = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = session.get(url, headers={"Accept": accept})
+        response.raise_for_status()
+        fetched = time.perf_counter()
+        frame = decode(response)
+        parse.append(time.perf_counter() - fetched)
+        fetch.append(fetched - start)
+    transferred = int(response.headers.get("Content-Length") or len(response.content))
+    return len(frame), transferred, len(response.content), statistics.median(fetch), statistics.median(parse)
+
+
+def report(chart: str, name: str, result) -> None:
+    rows, transferred, decoded, fetch, parse = result
+    print(f"/chart/{chart} {name:5s} rows={rows:9d}  transferred={transferred / 1024 ** 2:8.2f} MiB  "
+          f"decoded={decoded / 1024 ** 2:8.2f} MiB  request={fetch * 1000:8.1f}ms  decode={parse * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--charts", nargs="+", default=["1", "2", "3", "4", "5", "6"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for chart in args.charts:
+        url = f"{args.url}/chart/{chart}"
+        report(chart, "json", measure(url, "application/json", lambda r: pd.DataFrame(r.json()), args.repeat))
+        report(chart, "arrow", measure(url, ARROW_STREAM,
+                                       lambda r: pa.ipc.open_stream(r.content).read_pandas(), args.repeat))
@@ -0,0 +1,72 @@
+"""
+Load benchmark for the dashboard chart endpoints.
+
+Simulates N dashboard clients that each request every chart for a random state
+and reports requests/sec per concurrency level, plus /health latency measured
+while the chart queries are running.
+
+Usage (with the API running on localhost:8000):
+    python chart_load.py --clients 1 2 4 8 16 --rounds 3
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+CHARTS = ["/chart/1", "/chart/2", "/chart/3", "/chart/4", "/chart/5", "/chart/6"]
+STATES = ["CA", "TX", "FL", "NY", "PA", "OH", "GA", "NC", "MI", "IL"]
+
+
+def dashboard_client(base_url: str, rounds: int) -> int:
+    session = requests.Session()
+    done = 0
+    for _ in range(rounds):
+        state = random.choice(STATES)
+        for chart in CHARTS:
+            response = session.get(base_url + chart, params={"state": state})
+            response.raise_for_status()
+            done += 1
+    return done
+
+
+def probe_health(base_url: str, stop: threading.Event, latencies: list) -> None:
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        session.get(base_url + "/health").raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.05)
+
+
+def run(base_url: str, clients: int, rounds: int) -> None:
+    stop = threading.Event()
+    health_latencies = []
+    prober = threading.Thread(target=probe_health, args=(base_url, stop, health_latencies), daemon=True)
+    prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        total = sum(pool.map(lambda _: dashboard_client(base_url, rounds), range(clients)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+    health_p50 = statistics.median(health_latencies) * 1000 if health_latencies else float("nan")
+    health_max = max(health_latencies) * 1000 if health_latencies else float("nan")
+    print(f"clients={clients:3d}  requests={total:5d}  elapsed={elapsed:8.2f}s  "
+          f"throughput={total / elapsed:8.2f} req/s  health p50={health_p50:7.1f}ms max={health_max:7.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    for n in args.clients:
+        run(args.url, n, args.rounds)
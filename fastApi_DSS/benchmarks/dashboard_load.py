@@ -0,0 +1,64 @@
+"""
+End-to-end dashboard load time: the seven separate calls the frontend used to make
+(/chart/stats and /chart/1 ... /chart/6, each on a fresh connection) against one
+/dashboard request.
+
+Each round uses a state neither path has requested before, so both are measured
+against a cold result cache. Payload sizes are reported as transferred (gzip) and decoded.
+
+Usage (with the API running on localhost:8000):
+    python dashboard_load.py --states CA TX FL NY PA
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+CHARTS = ["/chart/stats", "/chart/1", "/chart/2", "/chart/3", "/chart/4", "/chart/5", "/chart/6"]
+
+
+def wire_bytes(response: requests.Response) -> int:
+    return int(response.headers.get("Content-Length") or len(response.content))
+
+
+def seven_calls(base_url: str, state: str):
+    start = time.perf_counter()
+    transferred = decoded = 0
+    for chart in CHARTS:
+        params = {} if chart == "/chart/stats" else {"state": state}
+        response = requests.get(base_url + chart, params=params)
+        response.raise_for_status()
+        response.json()
+        transferred += wire_bytes(response)
+        decoded += len(response.content)
+    return time.perf_counter() - start, transferred, decoded
+
+
+def one_call(base_url: str, state: str):
+    start = time.perf_counter()
+    response = requests.get(base_url + "/dashboard", params={"state": state})
+    response.raise_for_status()
+    response.json()
+    return time.perf_counter() - start, wire_bytes(response), len(response.content)
+
+
+def report(name: str, results) -> None:
+    times = [r[0] for r in results]
+    print(f"{name:12s} median={statistics.median(times) * 1000:9.1f}ms  max={max(times) * 1000:9.1f}ms  "
+          f"transferred={statistics.mean(r[1] for r in results) / 1024:9.1f} KiB  "
+          f"decoded={statistics.mean(r[2] for r in results) / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--states", nargs="+", default=["CA", "TX", "FL", "NY", "PA", "OH", "GA", "NC"])
+    args = parser.parse_args()
+
+    before, after = [], []
+    for state in args.states:
+        before.append(seven_calls(args.url, state))
+        after.append(one_call(args.url, state))
+    report("seven calls", before)
+    report("/dashboard", after)
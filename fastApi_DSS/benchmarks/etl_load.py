@@ -0,0 +1,168 @@
+"""
+Benchmark of the accident load step of the daily ETL.
+
+Builds an in-memory warehouse with a 600k-row location dimension, stages N synthetic
+incidents and times the load with the previous correlated-subquery key lookups
+("before") against the bulk dimension upsert + hash-join load used by the ETL ("after").
+
+Usage:
+    python etl_load.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from orchestrator import CREATE_DIMENSION_INDEXES, LOAD_DIMENSIONS, LOAD_ACCIDENTS  # noqa: E402
+
+LOCATIONS = 600_000
+
+SCHEMA = """
+CREATE TABLE environment (
+    Amenity BOOLEAN, Bump BOOLEAN, Crossing BOOLEAN, Give_Way BOOLEAN, Junction BOOLEAN, No_Exit BOOLEAN,
+    Railway BOOLEAN, Roundabout BOOLEAN, Station BOOLEAN, Stop BOOLEAN, Traffic_Calming BOOLEAN,
+    Traffic_Signal BOOLEAN, Turning_Loop BOOLEAN, Environment_ID INTEGER PRIMARY KEY
+);
+CREATE TABLE location (Street VARCHAR, City VARCHAR, County VARCHAR, State CHAR(2), Location_ID INTEGER PRIMARY KEY);
+CREATE TABLE twilight (
+    Sunrise_Sunset VARCHAR, Civil_Twilight VARCHAR, Nautical_Twilight VARCHAR, Astronomical_Twilight VARCHAR,
+    Twilight_ID INTEGER PRIMARY KEY
+);
+CREATE TABLE weather (Weather_Condition VARCHAR, Weather_Condition_ID INTEGER PRIMARY KEY);
+CREATE TABLE wind (Wind_Direction VARCHAR, Wind_Direction_ID INTEGER PRIMARY KEY);
+CREATE TABLE accident (
+    Accident_ID BIGINT PRIMARY KEY, Severity INTEGER, Start_Time TIMESTAMP, End_Time TIMESTAMP,
+    Start_Lat DECIMAL(10, 7), Start_Lng DECIMAL(10, 7), End_Lat DECIMAL(10, 7), End_Lng DECIMAL(10, 7),
+    Distance_mi DECIMAL(5, 2), Weather_Timestamp TIMESTAMP, Temperature_F DECIMAL(8, 2),
+    Humidity_percent DECIMAL(8, 2), Wind_Speed_mph DECIMAL(8, 2), Precipitation_in DECIMAL(8, 2),
+    Visibility_mi DECIMAL(8, 2),
+    Location_ID INTEGER REFERENCES location(Location_ID),
+    Weather_Condition_ID INTEGER REFERENCES weather(Weather_Condition_ID),
+    Wind_Direction_ID INTEGER REFERENCES wind(Wind_Direction_ID),
+    Environment_ID INTEGER REFERENCES environment(Environment_ID),
+    Twilight_ID INTEGER REFERENCES twilight(Twilight_ID),
+    State CHAR(2), City VARCHAR
+);
+"""
+
+SEED = f"""
+INSERT INTO location
+SELECT concat('Street ', i), concat('City ', i % 5000), concat('County ', i % 1500),
+       chr((65 + i % 26)::INTEGER) || chr((65 + i % 23)::INTEGER), i
+FROM range(1, {LOCATIONS} + 1) r(i);
+
+INSERT INTO environment
+SELECT i & 1 > 0, i & 2 > 0, i & 4 > 0, i & 8 > 0, i & 16 > 0, i & 32 > 0, i & 64 > 0, i & 128 > 0,
+       i & 256 > 0, false, false, false, false, i + 1
+FROM range(0, 348) r(i);
+
+INSERT INTO twilight
+SELECT CASE WHEN i & 1 > 0 THEN 'Night' ELSE 'Day' END, CASE WHEN i & 2 > 0 THEN 'Night' ELSE 'Day' END,
+       CASE WHEN i & 4 > 0 THEN 'Night' ELSE 'Day' END, CASE WHEN i & 8 > 0 THEN 'Night' ELSE 'Day' END, i + 1
+FROM range(0, 11) r(i);
+
+INSERT INTO weather
+SELECT unnest(['Clear', 'Cloudy', 'Fog', 'Hail', 'Rain', 'Sand', 'Smoke', 'Snow', 'Thunderstorm', 'Tornado']),
+       unnest(range(1, 11));
+
+INSERT INTO wind
+SELECT unnest(['Calm', 'W', 'E', 'S', 'N', 'NE', 'SW', 'SE', 'NW']), unnest(range(1, 10));
+
+CREATE SEQUENCE seq_environment_id START 349;
+CREATE SEQUENCE seq_location_id START {LOCATIONS + 1};
+CREATE SEQUENCE seq_weather_id START 11;
+CREATE SEQUENCE seq_accident_id START 1;
+CREATE SEQUENCE seq_twilight_id START 12;
+CREATE SEQUENCE seq_wind_id START 10;
+"""
+
+# Roughly 1 in 10 incidents happens on a street that is not in the location dimension yet
+STAGE = """
+CREATE OR REPLACE TEMP TABLE staged_incidents AS
+SELECT
+    1 + (hash(i) % 4)::INTEGER AS severity,
+    TIMESTAMP '2024-01-01' + to_seconds(i % 86400) AS start_time,
+    TIMESTAMP '2024-01-01' + to_seconds(i % 86400 + 1800) AS end_time,
+    25 + random() * 20 AS start_lat, -120 + random() * 40 AS start_lng,
+    NULL::DOUBLE AS end_lat, NULL::DOUBLE AS end_lng, random() AS distance_mi,
+    TIMESTAMP '2024-01-01' + to_seconds(i % 86400) AS weather_timestamp,
+    random() * 100 AS temperature_f, random() * 100 AS humidity_percent, random() * 20 AS wind_speed_mph,
+    0.0 AS precipitation_in, 10.0 AS visibility_mi,
+    CASE WHEN i % 10 = 0 THEN concat('New Street ', i) ELSE concat('Street ', 1 + hash(i) % {locations}) END AS street,
+    concat('City ', (1 + hash(i) % {locations}) % 5000) AS city,
+    concat('County ', (1 + hash(i) % {locations}) % 1500) AS county,
+    chr(65 + ((1 + hash(i) % {locations}) % 26)::INTEGER) || chr(65 + ((1 + hash(i) % {locations}) % 23)::INTEGER) AS state,
+    hash(i) % 2 = 0 AS amenity, hash(i) % 3 = 0 AS bump, false AS crossing, false AS give_way,
+    false AS junction, false AS no_exit, false AS railway, false AS roundabout, false AS station,
+    false AS stop, false AS traffic_calming, i % 7 = 0 AS traffic_signal, false AS turning_loop,
+    CASE WHEN i % 2 = 0 THEN 'Day' ELSE 'Night' END AS sunrise_sunset,
+    CASE WHEN i % 2 = 0 THEN 'Day' ELSE 'Night' END AS civil_twilight,
+    CASE WHEN i % 3 = 0 THEN 'Day' ELSE 'Night' END AS nautical_twilight,
+    CASE WHEN i % 3 = 0 THEN 'Day' ELSE 'Night' END AS astronomical_twilight,
+    ['Clear', 'Cloudy', 'Rain', 'Snow', 'Windy'][1 + (i % 5)::INTEGER] AS weather_condition,
+    ['Calm', 'W', 'E', 'S', 'N', 'Variable'][1 + (i % 6)::INTEGER] AS wind_direction
+FROM range(0, {size}) r(i);
+"""
+
+# The accident insert as it was before staging: per-row correlated lookups of every surrogate key
+LEGACY_LOAD_ACCIDENTS = """
+INSERT INTO accident (
+    Accident_ID, Severity, Start_Time, End_Time, Start_Lat, Start_Lng, End_Lat, End_Lng,
+    Distance_mi, Weather_Timestamp, Temperature_F, Humidity_percent, Wind_Speed_mph,
+    Precipitation_in, Visibility_mi, Location_ID, Environment_ID, Twilight_ID,
+    Weather_Condition_ID, Wind_Direction_ID
+)
+SELECT
+    nextval('seq_accident_id'), severity, start_time, end_time, start_lat, start_lng, end_lat, end_lng,
+    distance_mi, weather_timestamp, temperature_f, humidity_percent, wind_speed_mph, precipitation_in, visibility_mi,
+    (SELECT Location_ID FROM location WHERE street = t.street AND city = t.city AND county = t.county AND state = t.state),
+    (SELECT Environment_ID FROM environment WHERE amenity = t.amenity AND bump = t.bump AND crossing = t.crossing
+        AND give_way = t.give_way AND junction = t.junction AND no_exit = t.no_exit AND railway = t.railway
+        AND roundabout = t.roundabout AND station = t.station AND stop = t.stop
+        AND traffic_calming = t.traffic_calming AND traffic_signal = t.traffic_signal AND turning_loop = t.turning_loop),
+    (SELECT Twilight_ID FROM twilight WHERE sunrise_sunset = t.sunrise_sunset AND civil_twilight = t.civil_twilight
+        AND nautical_twilight = t.nautical_twilight AND astronomical_twilight = t.astronomical_twilight),
+    (SELECT Weather_Condition_ID FROM weather WHERE weather_condition = t.weather_condition),
+    (SELECT Wind_Direction_ID FROM wind WHERE wind_direction = t.wind_direction)
+FROM staged_incidents t;
+"""
+
+
+def build_warehouse(size: int) -> duckdb.DuckDBPyConnection:
+    conn = duckdb.connect()
+    conn.execute(SCHEMA)
+    conn.execute(SEED)
+    conn.execute(CREATE_DIMENSION_INDEXES)
+    conn.execute(STAGE.format(size=size, locations=LOCATIONS))
+    return conn
+
+
+def time_load(size: int, load_sql: str) -> float:
+    conn = build_warehouse(size)
+    try:
+        start = time.perf_counter()
+        conn.execute(f"BEGIN TRANSACTION; {load_sql} COMMIT;")
+        elapsed = time.perf_counter() - start
+        loaded = conn.execute("SELECT count(*) FROM accident").fetchone()[0]
+        assert loaded == size, f"expected {size} accidents, loaded {loaded}"
+        return elapsed
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the staged hash-join load")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        after = time_load(size, LOAD_DIMENSIONS + LOAD_ACCIDENTS)
+        if args.skip_legacy:
+            print(f"{size:>9,} incidents  after={after:8.2f}s")
+            continue
+        before = time_load(size, LOAD_DIMENSIONS + LEGACY_LOAD_ACCIDENTS)
+        print(f"{size:>9,} incidents  before={before:8.2f}s  after={after:8.2f}s  speedup={before / after:6.1f}x")
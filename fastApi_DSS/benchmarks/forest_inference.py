@@ -0,0 +1,73 @@
+"""
+sklearn RandomForestClassifier against the flattened FlatForest (src/compiled_forest.py).
+
+Reports load time and memory of both representations, checks that predict_proba
+is identical on random encoded requests, then rows/sec per batch size.
+
+Usage (from fastApi_DSS/src, so the relative models path resolves):
+    python compiled_forest.py ../models
+    python ../benchmarks/forest_inference.py --sizes 1 10 100 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from compiled_forest import FLAT_FOREST_DIR, FlatForest  # noqa: E402
+from features import CompiledFeatureEncoder  # noqa: E402
+from parity import check_forest_parity  # noqa: E402
+from predict_batch import random_request  # noqa: E402
+
+
+def timed_load(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    model = load()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return model, elapsed, size
+
+
+def rows_per_second(model, X: np.ndarray, total_rows: int) -> float:
+    batches = max(1, total_rows // len(X))
+    start = time.perf_counter()
+    for _ in range(batches):
+        model.predict_proba(X)
+    return batches * len(X) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", default="../models")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--rows", type=int, default=20000, help="rows scored per batch size")
+    parser.add_argument("--threads", type=int, default=None, help="FlatForest worker threads")
+    args = parser.parse_args()
+
+    random.seed(42)
+    model, sk_load, sk_bytes = timed_load(
+        lambda: joblib.load(os.path.join(args.models, "random_forest_model.joblib")))
+    flat, flat_load, flat_bytes = timed_load(
+        lambda: FlatForest.load(os.path.join(args.models, FLAT_FOREST_DIR), n_threads=args.threads))
+    print(f"sklearn  load={sk_load:7.2f}s  memory={sk_bytes / 1024 ** 2:8.1f} MB")
+    print(f"flat     load={flat_load:7.2f}s  memory={flat_bytes / 1024 ** 2:8.1f} MB  {flat.describe()}")
+
+    scaler = joblib.load(os.path.join(args.models, "scaler.joblib"))
+    binary_encoder = joblib.load(os.path.join(args.models, "binary_encoder.joblib"))
+    encoder = CompiledFeatureEncoder(list(model.feature_names_in_), scaler, binary_encoder)
+    X = encoder.encode_batch([random_request() for _ in range(max(args.sizes))])
+
+    check_forest_parity(model, flat, X)
+    print(f"parity: predict_proba identical on {len(X)} rows")
+
+    for size in args.sizes:
+        sk = rows_per_second(model, X[:size], args.rows)
+        fl = rows_per_second(flat, X[:size], args.rows)
+        print(f"batch={size:6d}  sklearn={sk:10.1f} rows/s  flat={fl:10.1f} rows/s  speedup={fl / sk:5.1f}x")
@@ -0,0 +1,110 @@
+"""
+Parity of the compiled prediction path with the reference one, without the trained models.
+
+Fits a small MinMaxScaler, city BinaryEncoder and random forest on synthetic requests encoded
+with the training column names, then checks that CompiledFeatureEncoder.encode_batch gives the
+identical float32 matrix as encode_request_frame, and the forest the same predict_proba, for every
+city (plus unknown and missing ones) crossed with every wind direction and weather condition,
+and for requests with missing numeric fields. Then checks that the forest flattened into a
+FlatForest gives exactly the same predict_proba as the sklearn forest.
+
+check_parity is also run against the trained models by predict_latency.py, check_forest_parity
+by forest_inference.py.
+
+Usage:
+    python benchmarks/parity.py
+"""
+import itertools
+import os
+import random
+import sys
+
+import category_encoders
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from compiled_forest import FlatForest  # noqa: E402
+from database import WeatherConditionEnum, WindDirectionEnum  # noqa: E402
+from features import (SCALED_FEATURES, CompiledFeatureEncoder, encode_request_frame, predict_proba,  # noqa: E402
+                      raw_scaled_features)
+from predict_batch import CITIES, random_request  # noqa: E402
+
+TRAINING_ROWS = 500
+
+# Optional numeric fields of PredictAccidentRequest, left empty in the missing-value requests
+NUMERIC_FIELDS = ("start_lat", "start_lng", "distance_mi", "temperature_f", "humidity_percent", "pressure_in",
+                  "visibility_mi", "wind_speed_mph", "precipitation_in")
+
+
+def fit_synthetic_models(rows: int = TRAINING_ROWS):
+    """(forest, scaler, binary_encoder) fitted on random requests, with the real training column names"""
+    requests = [random_request() for _ in range(rows)]
+    scaler = MinMaxScaler().fit(pd.DataFrame(raw_scaled_features(requests), columns=SCALED_FEATURES))
+    binary_encoder = category_encoders.BinaryEncoder().fit(
+        pd.Series([city for city in CITIES if city != "Not A Real City"], name="City"))
+
+    X = pd.concat([encode_request_frame(data, scaler, binary_encoder) for data in requests], ignore_index=True)
+    severity = np.random.default_rng(42).integers(1, 5, rows)
+    # One job sums the trees in order, so predict_proba is reproducible to the last bit
+    model = RandomForestClassifier(n_estimators=20, max_depth=10, n_jobs=1, random_state=42).fit(X, severity)
+    return model, scaler, binary_encoder
+
+
+def parity_requests(binary_encoder):
+    cities = CompiledFeatureEncoder._known_cities(binary_encoder) + ["Not A Real City", None]
+    for city, wind, weather in itertools.product(cities, [*WindDirectionEnum, None], [*WeatherConditionEnum, None]):
+        data = random_request()
+        data.city, data.wind_direction, data.weather_condition = city, wind, weather
+        yield data
+    for field in NUMERIC_FIELDS:
+        data = random_request()
+        setattr(data, field, None)
+        yield data
+    data = random_request()
+    for field in NUMERIC_FIELDS + ("city", "wind_direction", "weather_condition", "civil_twilight"):
+        setattr(data, field, None)
+    yield data
+
+
+def check_parity(model, scaler, binary_encoder, encoder: CompiledFeatureEncoder) -> int:
+    """Number of requests checked; raises AssertionError on the first one the two paths disagree on"""
+    checked = 0
+    for data in parity_requests(binary_encoder):
+        legacy = encode_request_frame(data, scaler, binary_encoder)[encoder.columns]
+        compiled = encoder.encode_batch([data])
+        expected = legacy.to_numpy(dtype=np.float32)
+        label = f"{data.city}/{data.wind_direction}/{data.weather_condition}"
+        assert np.array_equal(expected, compiled, equal_nan=True), f"features differ for {label}"
+        assert np.array_equal(model.predict_proba(legacy), predict_proba(model, compiled)), \
+            f"predict_proba differs for {label}"
+        checked += 1
+    return checked
+
+
+def check_forest_parity(model, flat: FlatForest, X: np.ndarray) -> None:
+    """
+    Raises AssertionError unless the FlatForest gives the exact sklearn probabilities on X.
+    sklearn adds up the trees in the order its threads finish when n_jobs > 1, so it is compared
+    with one job, which adds them in tree order as FlatForest does.
+    """
+    n_jobs = model.n_jobs
+    model.n_jobs = 1
+    try:
+        assert np.array_equal(predict_proba(model, X), flat.predict_proba(X)), "predict_proba differs"
+    finally:
+        model.n_jobs = n_jobs
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    model, scaler, binary_encoder = fit_synthetic_models()
+    encoder = CompiledFeatureEncoder(list(model.feature_names_in_), scaler, binary_encoder)
+    print(f"features: {check_parity(model, scaler, binary_encoder, encoder)} requests identical")
+
+    X = encoder.encode_batch([random_request() for _ in range(TRAINING_ROWS)]
+                             + list(parity_requests(binary_encoder)))
+    check_forest_parity(model, FlatForest.from_sklearn(model), X)
+    print(f"forest: predict_proba identical on {len(X)} rows")
@@ -0,0 +1,75 @@
+"""
+Throughput of batched severity prediction.
+
+Loads the trained models from ../models, encodes random PredictAccidentRequest rows
+with the compiled feature encoder and runs a single predict_proba per batch, reporting
+rows/sec for each batch size.
+
+Usage (from fastApi_DSS/src, so the relative models path resolves):
+    python ../benchmarks/predict_batch.py --sizes 1 10 100 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import joblib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from database import PredictAccidentRequest, WeatherConditionEnum, WindDirectionEnum  # noqa: E402
+from features import CompiledFeatureEncoder  # noqa: E402
+
+CITIES = ["Los Angeles", "Miami", "Houston", "Charlotte", "Dallas", "Orlando", "Austin", "Raleigh",
+          "Atlanta", "Sacramento", "Springfield", "Not A Real City"]
+
+
+def random_request() -> PredictAccidentRequest:
+    return PredictAccidentRequest(
+        start_time=datetime(2016, 1, 1) + timedelta(minutes=random.randint(0, 60 * 24 * 365 * 7)),
+        start_lat=random.uniform(25, 49),
+        start_lng=random.uniform(-124, -67),
+        distance_mi=random.uniform(0, 10),
+        city=random.choice(CITIES),
+        temperature_f=random.uniform(-10, 110),
+        wind_chill_f=random.uniform(-10, 110),
+        humidity_percent=random.uniform(0, 100),
+        pressure_in=random.uniform(28, 31),
+        visibility_mi=random.uniform(0, 10),
+        wind_direction=random.choice(list(WindDirectionEnum)),
+        wind_speed_mph=random.uniform(0, 40),
+        precipitation_in=random.uniform(0, 1),
+        weather_condition=random.choice(list(WeatherConditionEnum)),
+        civil_twilight=random.choice(["Day", "Night"]),
+    )
+
+
+def run(size: int, total_rows: int, model, encoder: CompiledFeatureEncoder) -> None:
+    rows = [random_request() for _ in range(size)]
+    batches = max(1, total_rows // size)
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        model.predict_proba(encoder.encode_batch(rows))
+    elapsed = time.perf_counter() - start
+
+    print(f"batch={size:6d}  batches={batches:5d}  {batches * size / elapsed:10.1f} rows/s  "
+          f"{elapsed / batches * 1000:9.2f} ms/batch")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", default="../models")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--rows", type=int, default=20000, help="rows scored per batch size")
+    args = parser.parse_args()
+
+    random.seed(42)
+    model = joblib.load(os.path.join(args.models, "random_forest_model.joblib"))
+    scaler = joblib.load(os.path.join(args.models, "scaler.joblib"))
+    binary_encoder = joblib.load(os.path.join(args.models, "binary_encoder.joblib"))
+    encoder = CompiledFeatureEncoder(list(model.feature_names_in_), scaler, binary_encoder)
+
+    for n in args.sizes:
+        run(n, args.rows, model, encoder)
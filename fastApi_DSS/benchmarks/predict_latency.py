@@ -0,0 +1,61 @@
+"""
+Single-request latency of /predict: the previous pandas encoding (features.encode_request_frame)
+against the compiled feature encoder, followed by the same forest.predict call.
+
+Before timing, runs parity.check_parity on the trained models: both encodings must give the
+identical float32 feature matrix and the same probabilities for every training city crossed with
+every wind direction and weather condition, plus unknown and missing cities and missing fields.
+
+Usage (from fastApi_DSS/src, so the relative models path resolves):
+    python ../benchmarks/predict_latency.py --requests 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from features import CompiledFeatureEncoder, encode_request_frame  # noqa: E402
+from parity import check_parity  # noqa: E402
+from predict_batch import random_request  # noqa: E402
+
+
+def percentiles(samples) -> str:
+    p50, p99 = np.percentile(np.array(samples) * 1000, [50, 99])
+    return f"p50={p50:7.3f} ms  p99={p99:7.3f} ms"
+
+
+def time_requests(requests, predict) -> list:
+    samples = []
+    for data in requests:
+        start = time.perf_counter()
+        predict(data)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", default="../models")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--skip-parity", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(42)
+    model = joblib.load(os.path.join(args.models, "random_forest_model.joblib"))
+    scaler = joblib.load(os.path.join(args.models, "scaler.joblib"))
+    binary_encoder = joblib.load(os.path.join(args.models, "binary_encoder.joblib"))
+    encoder = CompiledFeatureEncoder(list(model.feature_names_in_), scaler, binary_encoder)
+
+    if not args.skip_parity:
+        print(f"parity: {check_parity(model, scaler, binary_encoder, encoder)} requests identical")
+
+    requests = [random_request() for _ in range(args.requests)]
+    before = time_requests(requests, lambda data: model.predict(encode_request_frame(data, scaler, binary_encoder)))
+    after = time_requests(requests, lambda data: model.predict(encoder.encode(data)))
+    print(f"before (pandas)   {percentiles(before)}")
+    print(f"after  (compiled) {percentiles(after)}")
@@ -0,0 +1,55 @@
+"""
+Load benchmark for POST /predict.
+
+Runs N concurrent clients that each send single-row prediction requests and reports
+requests/sec and latency percentiles per concurrency level, followed by the
+micro-batcher metrics from GET /predict/metrics.
+
+Usage (with the API running on localhost:8000):
+    python predict_load.py --clients 1 8 32 128 --requests 200
+"""
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from predict_batch import random_request
+
+
+def client(base_url: str, requests_per_client: int) -> list:
+    session = requests.Session()
+    latencies = []
+    for _ in range(requests_per_client):
+        body = random_request().model_dump_json()
+        start = time.perf_counter()
+        response = session.post(base_url + "/predict", data=body, headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(base_url: str, clients: int, requests_per_client: int) -> None:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [t for result in pool.map(lambda _: client(base_url, requests_per_client), range(clients))
+                     for t in result]
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"clients={clients:4d}  requests={len(latencies):6d}  throughput={len(latencies) / elapsed:8.1f} req/s  "
+          f"p50={quantiles[49] * 1000:7.2f}ms  p99={quantiles[98] * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=200, help="requests sent by each client")
+    args = parser.parse_args()
+
+    for n in args.clients:
+        run(args.url, n, args.requests)
+    print(json.dumps(requests.get(args.url + "/predict/metrics").json(), indent=2))
@@ -0,0 +1,102 @@
+"""
+Throughput of the twilight flags computation (src/twilight.py) on historical-sized incident sets.
+
+Generates N synthetic incidents in US cities (city sizes follow a Zipf law, as accidents do) over
+2016-2023 and compares:
+  astral    one astral.sun() call per incident, as the report form did (timed on a sample)
+  exact     the vectorized NumPy boundaries for every incident
+  memoized  the vectorized boundaries once per city-day
+  fill      fill_missing_twilight() on a DuckDB staged_incidents table, as in the ETL
+
+Usage:
+    python twilight_fill.py --sizes 10000 100000 1000000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import timezone
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from twilight import daylight_flags, fill_missing_twilight  # noqa: E402
+
+START = np.datetime64("2016-01-01T00:00:00")
+SECONDS = 8 * 365 * 86400
+
+
+def synthetic_incidents(n: int, cities: int, rng: np.random.Generator):
+    city_lat = rng.uniform(25, 49, cities)
+    city_lng = rng.uniform(-124, -67, cities)
+    city = np.minimum(rng.zipf(1.3, n) - 1, cities - 1)
+    # Within a few hundred metres of the city's point
+    lat = city_lat[city] + rng.uniform(-0.003, 0.003, n)
+    lng = city_lng[city] + rng.uniform(-0.003, 0.003, n)
+    times = START + rng.integers(0, SECONDS, n).astype("timedelta64[s]")
+    return lat, lng, times
+
+
+def astral_rows_per_second(lat, lng, times) -> float:
+    from astral import Observer
+    from astral.sun import sun
+
+    start = time.perf_counter()
+    for la, ln, t in zip(lat, lng, times.astype("datetime64[s]").tolist()):
+        at = t.replace(tzinfo=timezone.utc)
+        try:
+            s = sun(Observer(la, ln), date=at.date())
+        except ValueError:
+            continue
+        ("Day" if s["sunrise"] <= at <= s["sunset"] else "Night",
+         "Day" if s["dawn"] <= at <= s["dusk"] else "Night")
+    return len(lat) / (time.perf_counter() - start)
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def fill_seconds(lat, lng, times) -> float:
+    conn = duckdb.connect()
+    staged = pd.DataFrame({"start_lat": lat, "start_lng": lng, "start_time": times})
+    conn.execute("""
+        CREATE TEMP TABLE staged_incidents AS
+        SELECT start_lat, start_lng, start_time,
+               CAST(NULL AS VARCHAR) AS sunrise_sunset, CAST(NULL AS VARCHAR) AS civil_twilight,
+               CAST(NULL AS VARCHAR) AS nautical_twilight, CAST(NULL AS VARCHAR) AS astronomical_twilight
+        FROM staged
+    """)
+    _, seconds = timed(lambda: fill_missing_twilight(conn, "staged_incidents", "UTC", logging.getLogger(__name__)))
+    missing = conn.execute("SELECT count(*) FROM staged_incidents WHERE nautical_twilight IS NULL").fetchone()[0]
+    assert missing == 0, f"{missing} incidents left without flags"
+    conn.close()
+    return seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--cities", type=int, default=20000)
+    parser.add_argument("--astral-rows", type=int, default=20000, help="sample timed with astral")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for size in args.sizes:
+        lat, lng, times = synthetic_incidents(size, args.cities, rng)
+        sample = min(size, args.astral_rows)
+        astral = astral_rows_per_second(lat[:sample], lng[:sample], times[:sample])
+
+        exact, exact_seconds = timed(lambda: daylight_flags(lat, lng, times, memoize=False))
+        memoized, memoized_seconds = timed(lambda: daylight_flags(lat, lng, times))
+        differ = sum(int((exact[column] != memoized[column]).sum()) for column in exact)
+        fill = fill_seconds(lat, lng, times)
+
+        print(f"rows={size:8d}  astral={astral:10.0f} rows/s  "
+              f"exact={size / exact_seconds:10.0f} rows/s  memoized={size / memoized_seconds:10.0f} rows/s  "
+              f"fill={size / fill:10.0f} rows/s ({fill:.2f}s)  flags differing exact/memoized={differ}")
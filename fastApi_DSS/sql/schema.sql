@@ -71,4 +71,7 @@ BEFORE UPDATE ON traffic_incidents
 FOR EACH ROW
 EXECUTE FUNCTION update_updated_at_column();
 
-CREATE INDEX idx_end_time ON traffic_incidents(end_time);
\ No newline at end of file
+CREATE INDEX idx_end_time ON traffic_incidents(end_time);
+
+-- The ETL extracts incidents by created_at high-water mark
+CREATE INDEX idx_created_at ON traffic_incidents(created_at);
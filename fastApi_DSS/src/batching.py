@@ -0,0 +1,159 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+@dataclass
+class _PendingRows:
+    rows: List[Any]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction calls into one model evaluation.
+
+    Handlers submit their rows and await the result. A single background task
+    collects whatever arrives within `max_wait_ms` of the first queued row (or until
+    `max_rows` rows are collected), runs `predict` once on a worker thread and hands each
+    caller its slice of the output. While a batch is being scored new rows keep queueing,
+    so under load batches grow on their own without adding latency.
+    """
+
+    def __init__(self, predict: Callable[[List[Any]], Sequence[Any]],
+                 max_wait_ms: float = 3.0, max_rows: int = 256, max_queue: int = 1024):
+        self.predict = predict
+        self.max_wait = max_wait_ms / 1000
+        self.max_rows = max_rows
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reset_metrics()
+
+    def configure(self, max_wait_ms: float, max_rows: int, max_queue: int) -> None:
+        self.max_wait = max_wait_ms / 1000
+        self.max_rows = max_rows
+        self.max_queue = max_queue
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # Nothing will score the leftovers any more
+        while self._queue is not None and not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Prediction batcher stopped"))
+        self._task = None
+
+    async def submit(self, rows: Sequence[Any]) -> List[Any]:
+        """
+        Queue rows for the next batch and wait for their predictions.
+        Raises asyncio.QueueFull when max_queue submissions are already waiting.
+        """
+        if self._task is None:
+            raise RuntimeError("Prediction batcher is not running")
+        pending = _PendingRows(list(rows), asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(pending)
+        self._submitted += 1
+        return await pending.future
+
+    async def _collect(self) -> List[_PendingRows]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        rows = len(batch[0].rows)
+        deadline = loop.time() + self.max_wait
+
+        while rows < self.max_rows:
+            try:
+                pending = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(pending)
+            rows += len(pending.rows)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            # Callers that went away (client disconnect) are not worth scoring
+            batch = [pending for pending in batch if not pending.future.done()]
+            if batch:
+                await self._dispatch(batch)
+
+    async def _dispatch(self, batch: List[_PendingRows]) -> None:
+        started = time.perf_counter()
+        rows = [row for pending in batch for row in pending.rows]
+        try:
+            results = await asyncio.to_thread(self.predict, rows)
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            self._failed_batches += 1
+            return
+
+        offset = 0
+        for pending in batch:
+            n = len(pending.rows)
+            if not pending.future.done():
+                pending.future.set_result(list(results[offset:offset + n]))
+            offset += n
+
+        self._record(batch, len(rows), started)
+
+    def _record(self, batch: List[_PendingRows], rows: int, started: float) -> None:
+        finished = time.perf_counter()
+        wait = max(started - pending.enqueued_at for pending in batch)
+        self._batches += 1
+        self._scored += len(batch)
+        self._rows += rows
+        self._max_batch_rows = max(self._max_batch_rows, rows)
+        self._wait_total += sum(started - pending.enqueued_at for pending in batch)
+        self._max_wait = max(self._max_wait, wait)
+        self._predict_total += finished - started
+
+    def _reset_metrics(self) -> None:
+        self._submitted = 0
+        self._batches = 0
+        self._scored = 0
+        self._failed_batches = 0
+        self._rows = 0
+        self._max_batch_rows = 0
+        self._wait_total = 0.0
+        self._max_wait = 0.0
+        self._predict_total = 0.0
+
+    def metrics(self) -> Dict[str, Any]:
+        batches = self._batches or 1
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch_rows": self.max_rows,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "submitted": self._submitted,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "rows": self._rows,
+            "mean_batch_rows": self._rows / batches,
+            "largest_batch_rows": self._max_batch_rows,
+            "mean_queue_wait_ms": self._wait_total / max(self._scored, 1) * 1000,
+            "max_queue_wait_ms": self._max_wait * 1000,
+            "mean_predict_ms": self._predict_total / batches * 1000,
+        }
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """
+    LRU cache of serialized endpoint responses, bounded by the total size of the cached payloads.
+    Entries are keyed by the warehouse data version, so bumping the version after an ETL load
+    invalidates every cached response and every ETag handed out to clients.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_age: int = 0):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        # The epoch keeps versions unique across restarts, so stale ETags never match
+        self._epoch = int(time.time())
+        self._version = 0
+
+    @property
+    def data_version(self) -> str:
+        return f"{self._epoch}.{self._version}"
+
+    @property
+    def cache_control(self) -> str:
+        return f"max-age={self.max_age}, must-revalidate"
+
+    def configure(self, max_bytes: int, max_age: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._evict()
+
+    def bump_version(self) -> str:
+        """Called after every successful warehouse load"""
+        self._version += 1
+        self.clear()
+        return self.data_version
+
+    def make_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """Normalize the request parameters so equivalent requests share a cache entry"""
+        normalized = {
+            name: value.strip() if isinstance(value, str) else value
+            for name, value in params.items()
+            if value is not None and value != ""
+        }
+        return f"{self.data_version}|{endpoint}|{json.dumps(normalized, sort_keys=True, default=str)}"
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = body
+        self._size += len(body)
+        self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            _, body = self._entries.popitem(last=False)
+            self._size -= len(body)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match request header against the current ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" refer to the same representation
+    return "*" in candidates or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
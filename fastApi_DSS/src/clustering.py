@@ -0,0 +1,149 @@
+import sys
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+
+# Physical order of the accident table; the trailing Accident_ID makes the order deterministic
+CLUSTER_ORDER = "State, Start_Time, Accident_ID"
+
+# Rows per DuckDB row group, the unit its min/max statistics (zone maps) are kept for
+ROW_GROUP_SIZE = 122880
+
+
+def has_location_columns(conn: duckdb.DuckDBPyConnection) -> bool:
+    existing = {row[0] for row in conn.execute(
+        "SELECT column_name FROM duckdb_columns() WHERE table_name = 'accident'").fetchall()}
+    return {"State", "City"} <= existing
+
+
+def require_location_columns(conn: duckdb.DuckDBPyConnection) -> None:
+    """Fail unless the accident table carries State and City; checked at startup and before each ETL run"""
+    if not has_location_columns(conn):
+        raise RuntimeError("The accident table has no State/City columns, run `python clustering.py <duckdb_path>` "
+                           "once with the backend stopped to add and backfill them")
+
+
+def ensure_location_columns(conn: duckdb.DuckDBPyConnection, logger) -> None:
+    """
+    Copy State and City from the location dimension onto the accident table, so state/city
+    filters can be applied (and pruned) on the fact table without a join. Rewrites the whole table,
+    so it is only run by this module's command line; the ETL fills both columns for the accidents it loads.
+    """
+    if has_location_columns(conn):
+        return
+
+    start = time.perf_counter()
+    conn.execute("ALTER TABLE accident ADD COLUMN IF NOT EXISTS State CHAR(2)")
+    conn.execute("ALTER TABLE accident ADD COLUMN IF NOT EXISTS City VARCHAR")
+    conn.execute("""
+        UPDATE accident SET State = l.State, City = l.City
+        FROM location l
+        WHERE accident.Location_ID = l.Location_ID;
+    """)
+    logger.info(f"Denormalized State and City onto accident in {time.perf_counter() - start:.1f}s")
+
+
+def zone_map_report(conn: duckdb.DuckDBPyConnection, probes: List[Tuple[str, Optional[str], Optional[str], Optional[str]]]) -> List[Dict[str, Any]]:
+    """
+    How many row groups of the accident table each (name, state, from, to) probe can skip:
+    groups whose State or Start_Time min/max, the statistics DuckDB prunes scans with, cannot
+    match `State = state` (when given) and `Start_Time >= from AND Start_Time < to` (when given).
+    """
+    report = []
+    for name, state, date_from, date_to in probes:
+        total, skipped = conn.execute(f"""
+            WITH zones AS (
+                SELECT
+                    rowid // {ROW_GROUP_SIZE} AS row_group,
+                    min(State) AS min_state, max(State) AS max_state,
+                    min(Start_Time) AS min_time, max(Start_Time) AS max_time
+                FROM accident
+                GROUP BY row_group
+            )
+            SELECT
+                count(*),
+                count(*) FILTER (WHERE
+                    (CAST(? AS VARCHAR) IS NOT NULL
+                        AND (min_state IS NULL OR NOT (? BETWEEN min_state AND max_state)))
+                    OR (CAST(? AS TIMESTAMP) IS NOT NULL AND (max_time IS NULL OR max_time < ?))
+                    OR (CAST(? AS TIMESTAMP) IS NOT NULL AND (min_time IS NULL OR min_time >= ?)))
+            FROM zones;
+        """, [state, state, date_from, date_from, date_to, date_to]).fetchone()
+        report.append({"probe": name, "row_groups": total, "skipped": skipped})
+    return report
+
+
+def default_probes(conn: duckdb.DuckDBPyConnection) -> List[Tuple[str, Optional[str], Optional[str], Optional[str]]]:
+    """State, month and state + month filters like the dashboard's, on the busiest state and the latest month"""
+    state, month = conn.execute("""
+        SELECT
+            (SELECT State FROM accident WHERE State IS NOT NULL GROUP BY State ORDER BY count(*) DESC LIMIT 1),
+            (SELECT date_trunc('month', max(Start_Time)) FROM accident);
+    """).fetchone()
+    if month is None:
+        return []
+    month_from = month.strftime("%Y-%m-%d")
+    month_to = (month + timedelta(days=32)).strftime("%Y-%m-01")
+    return [
+        (f"State = '{state}'", state, None, None),
+        (f"month {month_from[:7]}", None, month_from, month_to),
+        (f"State = '{state}', month {month_from[:7]}", state, month_from, month_to),
+    ]
+
+
+def cluster_accidents(conn: duckdb.DuckDBPyConnection, logger) -> Dict[str, Any]:
+    """
+    Rewrite the accident table ordered by CLUSTER_ORDER, so each row group covers few states and a
+    short time span and the row group statistics let state- and date-filtered scans skip most of it.
+    Returns the zone map report before and after the rewrite.
+    """
+    ensure_location_columns(conn, logger)
+    probes = default_probes(conn)
+    before = zone_map_report(conn, probes)
+
+    start = time.perf_counter()
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        # Recreated from its own definition, so constraints and the added columns are kept,
+        # and its explicit indexes are created again once the rows are back
+        ddl = conn.execute(
+            "SELECT sql FROM duckdb_tables() WHERE table_name = 'accident' AND schema_name = current_schema()"
+        ).fetchone()[0]
+        indexes = [row[0] for row in conn.execute(
+            "SELECT sql FROM duckdb_indexes() WHERE table_name = 'accident' AND schema_name = current_schema()"
+            " AND sql IS NOT NULL"
+        ).fetchall()]
+        conn.execute(f"CREATE TEMP TABLE accident_clustered AS SELECT * FROM accident ORDER BY {CLUSTER_ORDER}")
+        conn.execute("DROP TABLE accident")
+        conn.execute(ddl)
+        conn.execute(f"INSERT INTO accident SELECT * FROM accident_clustered ORDER BY {CLUSTER_ORDER}")
+        for index_ddl in indexes:
+            conn.execute(index_ddl)
+        conn.execute("DROP TABLE accident_clustered")
+        conn.execute("COMMIT")
+    except Exception as e:
+        logger.error(f"Clustering accident failed: {str(e)}")
+        conn.execute("ROLLBACK")
+        raise
+    # Write the new row groups and their statistics to the database file
+    conn.execute("CHECKPOINT")
+    seconds = time.perf_counter() - start
+
+    after = zone_map_report(conn, probes)
+    logger.info(f"Clustered accident by ({CLUSTER_ORDER}) in {seconds:.1f}s, {len(indexes)} indexes rebuilt")
+    return {"seconds": seconds, "before": before, "after": after}
+
+
+if __name__ == "__main__":
+    # python clustering.py <duckdb_path>, with the backend stopped (DuckDB allows one writing process)
+    import logging
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    connection = duckdb.connect(sys.argv[1])
+    result = cluster_accidents(connection, logging.getLogger("clustering"))
+    for old, new in zip(result["before"], result["after"]):
+        print(f"{old['probe']:<32} skipped {old['skipped']:>5} / {old['row_groups']} row groups before, "
+              f"{new['skipped']:>5} / {new['row_groups']} after")
+    connection.close()
@@ -0,0 +1,186 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+
+FLAT_FOREST_DIR = "random_forest_flat"
+
+# From scikit-learn 1.4 tree.value holds the class fractions and DecisionTreeClassifier.predict_proba
+# returns them as they are; before, it held counts and predict_proba normalized them
+NORMALIZE_LEAF_VALUES = tuple(int(part) for part in sklearn.__version__.split(".")[:2]) < (1, 4)
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous arrays.
+
+    All nodes of all trees live in one set of arrays indexed by a global node id. Leaves
+    point to themselves, so a batch is evaluated by moving every (row, tree) pair one
+    level down per step for max_depth steps, without any per-node Python code.
+    Leaf values are stored already normalized, and per-tree probabilities are summed
+    in tree order and divided by the number of trees, which is exactly what
+    RandomForestClassifier.predict_proba does with n_jobs=1 (with more jobs sklearn adds the
+    trees in the order its threads finish, which can change the last bits).
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots",
+              "classes", "feature_names")
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 missing_left: np.ndarray, value: np.ndarray, roots: np.ndarray, classes: np.ndarray,
+                 feature_names: np.ndarray, max_depth: int, n_threads: Optional[int] = None,
+                 chunk_rows: int = 2048):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = len(feature_names)
+        self.max_depth = max_depth
+        self.n_threads = n_threads or min(4, os.cpu_count() or 1)
+        self.chunk_rows = chunk_rows
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_sklearn(cls, model: RandomForestClassifier, **kwargs) -> "FlatForest":
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        n_classes = len(model.classes_)
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        feature, threshold, left, right, missing_left, value = [], [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count, dtype=np.int32) + offset
+            feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            threshold.append(tree.threshold.astype(np.float64))
+            left.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+            right.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+            # Trees fitted before sklearn 1.3 have no missing-value routing: NaN fails `<=` and goes right
+            missing = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool))
+
+            # Same values as DecisionTreeClassifier.predict_proba of the installed scikit-learn, per node
+            proba = tree.value[:, 0, :n_classes].astype(np.float64)
+            if NORMALIZE_LEAF_VALUES:
+                normalizer = proba.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                proba = proba / normalizer
+            value.append(proba)
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            missing_left=np.concatenate(missing_left),
+            value=np.ascontiguousarray(np.concatenate(value)),
+            roots=offsets[:-1].astype(np.int32),
+            classes=np.asarray(model.classes_),
+            feature_names=np.asarray(model.feature_names_in_, dtype=str),
+            max_depth=max(tree.max_depth for tree in trees),
+            **kwargs,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ("feature", "threshold", "left", "right",
+                                                          "missing_left", "value", "roots"))
+
+    def save(self, path: str) -> None:
+        """
+        Write one uncompressed .npy file per array, so load() can memory-map them and every
+        uvicorn worker on the host shares the same pages through the OS page cache.
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in ("feature", "threshold", "left", "right",
+                                                         "missing_left", "value", "roots")}
+        arrays.update(classes=self.classes_, feature_names=self.feature_names_in_)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        with open(os.path.join(path, "forest.json"), "w") as f:
+            json.dump({"max_depth": int(self.max_depth), "trees": self.n_trees}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, **kwargs) -> "FlatForest":
+        with open(os.path.join(path, "forest.json")) as f:
+            meta = json.load(f)
+        mmap_mode = "r" if mmap else None
+        # asarray drops the memmap subclass but keeps the read-only file mapping as the buffer
+        arrays = {name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode,
+                                           allow_pickle=False))
+                  for name in cls.ARRAYS}
+        return cls(**arrays, max_depth=meta["max_depth"], **kwargs)
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Global leaf id reached by every (row, tree) pair"""
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        rows = np.arange(len(X))[:, np.newaxis]
+        for _ in range(self.max_depth):
+            values = X[rows, self.feature[nodes]]
+            # float32 feature vs float64 threshold, compared in float64 like the sklearn tree
+            go_left = np.where(np.isnan(values), self.missing_left[nodes], values <= self.threshold[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def _predict_proba_chunk(self, X: np.ndarray) -> np.ndarray:
+        leaves = self._leaves(X)
+        proba = np.zeros((len(X), len(self.classes_)), dtype=np.float64)
+        for t in range(self.n_trees):
+            proba += self.value[leaves[:, t]]
+        proba /= self.n_trees
+        return proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        if len(X) <= self.chunk_rows or self.n_threads == 1:
+            return self._predict_proba_chunk(X)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_threads, thread_name_prefix="flat-forest")
+        chunks = [X[i:i + self.chunk_rows] for i in range(0, len(X), self.chunk_rows)]
+        return np.concatenate(list(self._executor.map(self._predict_proba_chunk, chunks)))
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def describe(self) -> Dict[str, float]:
+        return {
+            "trees": self.n_trees,
+            "nodes": len(self.feature),
+            "max_depth": self.max_depth,
+            "megabytes": round(self.nbytes / 1024 ** 2, 1),
+        }
+
+
+def export_flat_forest(models_path: str) -> str:
+    """Flatten ../models/random_forest_model.joblib next to it, returns the written path"""
+    import joblib
+
+    start = time.perf_counter()
+    model = joblib.load(os.path.join(models_path, "random_forest_model.joblib"))
+    forest = FlatForest.from_sklearn(model)
+    path = os.path.join(models_path, FLAT_FOREST_DIR)
+    forest.save(path)
+    print(f"Exported {forest.describe()} to {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+if __name__ == "__main__":
+    # python compiled_forest.py [models_path]
+    export_flat_forest(sys.argv[1] if len(sys.argv) > 1 else "../models")
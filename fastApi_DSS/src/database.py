@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 from sqlalchemy import (
@@ -302,4 +302,86 @@ class PredictAccidentRequest(BaseModel):
                     "civil_twilight": "Day"
                 }
             ]
-        }
\ No newline at end of file
+        }
+
+
+class PredictBatchResponse(BaseModel):
+    """
+    Predictions for a batch of PredictAccidentRequest rows, in request order
+    """
+    classes: List[int]
+    severities: List[int]
+    probabilities: List[List[float]] = Field(description="Class probabilities per row, ordered like classes")
+
+
+class GeocodeRequest(BaseModel):
+    """
+    An address as entered on the report form
+    """
+    street: Optional[str] = Field(None, max_length=255)
+    city: str = Field(..., max_length=100)
+    county: Optional[str] = Field(None, max_length=100)
+    state: USStateEnum
+
+    class Config:
+        use_enum_values = True
+
+
+class GeocodeResponse(BaseModel):
+    """
+    Coordinates of an address and where they came from: "warehouse" (accidents on the same street),
+    "city" (city centroid), "remote" (Nominatim) or "none" when nothing matched
+    """
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    source: str
+    cached: bool = False
+
+
+class ReportRequest(BaseModel):
+    """
+    The accident report form as entered by the user; POST /report adds the location,
+    weather and daylight before inserting and/or scoring it
+    """
+    street: Optional[str] = Field(None, max_length=255)
+    city: str = Field(..., max_length=100)
+    county: Optional[str] = Field(None, max_length=100)
+    state: USStateEnum
+    severity: Optional[str] = Field(None)
+    description: Optional[str] = Field(None, max_length=1000)
+    start_time: Optional[datetime] = Field(None, description="Defaults to the time the report is received")
+    duration_minutes: int = Field(30, ge=1)
+
+    amenity: bool = False
+    bump: bool = False
+    crossing: bool = False
+    give_way: bool = False
+    junction: bool = False
+    no_exit: bool = False
+    railway: bool = False
+    roundabout: bool = False
+    station: bool = False
+    stop: bool = False
+    traffic_calming: bool = False
+    traffic_signal: bool = False
+    turning_loop: bool = False
+
+    # What to do with the enriched report
+    insert: bool = True
+    predict: bool = False
+
+    class Config:
+        use_enum_values = True
+
+
+class ReportResponse(BaseModel):
+    """
+    The enriched report, whether it was inserted, its predicted severity when asked for
+    (or why it could not be predicted), and how long each enrichment stage took
+    """
+    incident: TrafficIncidentCreate
+    inserted: bool = False
+    predicted_severity: Optional[int] = None
+    prediction_error: Optional[str] = None
+    geocode_source: str
+    timings_ms: Dict[str, float]
@@ -0,0 +1,204 @@
+from typing import Dict, List, Sequence
+
+import category_encoders
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler
+
+from database import PredictAccidentRequest, WeatherConditionEnum, WindDirectionEnum
+
+# Features scaled by the MinMaxScaler, in the order it was fitted on (see DW_DSS/scripts/train_model.ipynb)
+SCALED_FEATURES = ['Temperature(F)', 'Distance(mi)', 'Humidity(%)', 'Pressure(in)', 'Visibility(mi)',
+                   'Wind_Speed(mph)', 'Precipitation(in)', 'Start_Lng', 'Start_Lat',
+                   'Year', 'Month', 'Weekday', 'Day', 'Hour', 'Minute']
+
+
+
+def predict_proba(model, X: np.ndarray) -> np.ndarray:
+    """
+    model.predict_proba(X) for compiled feature rows. The sklearn forest was fitted on a DataFrame and
+    warns about a plain array, so it gets the rows under its feature names; FlatForest takes the array.
+    """
+    if isinstance(model, RandomForestClassifier):
+        X = pd.DataFrame(X, columns=model.feature_names_in_, copy=False)
+    return model.predict_proba(X)
+
+
+def raw_scaled_features(rows: Sequence[PredictAccidentRequest]) -> np.ndarray:
+    """Unscaled values of SCALED_FEATURES, one row per request. Missing values become NaN."""
+    return np.array([
+        [row.temperature_f, row.distance_mi, row.humidity_percent, row.pressure_in, row.visibility_mi,
+         row.wind_speed_mph, row.precipitation_in, row.start_lng, row.start_lat,
+         row.start_time.year, row.start_time.month, row.start_time.weekday(), row.start_time.day,
+         row.start_time.hour, row.start_time.minute]
+        for row in rows
+    ], dtype=np.float64).reshape(len(rows), len(SCALED_FEATURES))
+
+
+def min_max_scale(raw: np.ndarray, scaler: MinMaxScaler) -> np.ndarray:
+    """Same arithmetic as MinMaxScaler.transform, without its input validation"""
+    scaled = raw * scaler.scale_
+    scaled += scaler.min_
+    if getattr(scaler, "clip", False):
+        np.clip(scaled, scaler.feature_range[0], scaler.feature_range[1], out=scaled)
+    return scaled
+
+
+def encode_request_frame(data: PredictAccidentRequest, scaler: MinMaxScaler,
+                         binary_encoder: category_encoders.BinaryEncoder) -> pd.DataFrame:
+    """
+    Reference pandas encoding of a single request, as /predict did before the compiled encoder.
+    Kept to check the compiled encoder against (benchmarks/predict_latency.py).
+    """
+    basic_info = pd.DataFrame({
+        "Temperature(F)": [data.temperature_f],
+        "Distance(mi)": [data.distance_mi],
+        "Humidity(%)": [data.humidity_percent],
+        "Pressure(in)": [data.pressure_in],
+        "Visibility(mi)": [data.visibility_mi],
+        "Wind_Speed(mph)": [data.wind_speed_mph],
+        "Precipitation(in)": [data.precipitation_in],
+        "Start_Lng": [data.start_lng],
+        "Start_Lat": [data.start_lat],
+    })
+    time_ = pd.DataFrame({
+        "Year": [data.start_time.year],
+        "Month": [data.start_time.month],
+        "Weekday": [data.start_time.weekday()],
+        "Day": [data.start_time.day],
+        "Hour": [data.start_time.hour],
+        "Minute": [data.start_time.minute],
+    })
+    basic_and_time = pd.concat([basic_info, time_], axis=1)
+    basic_and_time[SCALED_FEATURES] = scaler.transform(basic_and_time[SCALED_FEATURES])
+
+    basic_info = basic_and_time[['Start_Lat', 'Start_Lng', 'Distance(mi)', 'Temperature(F)', 'Humidity(%)',
+                                 'Pressure(in)', 'Visibility(mi)', 'Wind_Speed(mph)', 'Precipitation(in)']]
+    time_ = basic_and_time.iloc[:, -6:]
+
+    road = pd.DataFrame({
+        "Amenity": [0],
+        "Bump": [0],
+        "Crossing": [0],
+        "Give_Way": [0],
+        "Junction": [0],
+        "No_Exit": [0],
+        "Railway": [0],
+        "Roundabout": [0],
+        "Station": [0],
+        "Stop": [0],
+        "Traffic_Calming": [0],
+        "Traffic_Signal": [0]
+    })
+
+    wind = pd.DataFrame({
+        "Wind_Direction_E": [0],
+        "Wind_Direction_N": [0],
+        "Wind_Direction_NE": [0],
+        "Wind_Direction_NW": [0],
+        "Wind_Direction_S": [0],
+        "Wind_Direction_SE": [0],
+        "Wind_Direction_SW": [0],
+        "Wind_Direction_Variable": [0],
+        "Wind_Direction_W": [0]
+    })
+
+    for col in wind.columns:
+        if data.wind_direction == col.split('_')[-1]:
+            wind[col] = [1]
+
+    weather = pd.DataFrame({
+        "Weather_Condition_Cloudy": [0],
+        "Weather_Condition_Fog": [0],
+        "Weather_Condition_Hail": [0],
+        "Weather_Condition_Rain": [0],
+        "Weather_Condition_Sand": [0],
+        "Weather_Condition_Smoke": [0],
+        "Weather_Condition_Snow": [0],
+        "Weather_Condition_Thunderstorm": [0],
+        "Weather_Condition_Tornado": [0],
+        "Weather_Condition_Windy": [0]
+    })
+    for col in weather.columns:
+        if data.weather_condition == col.split('_')[-1]:
+            weather[col] = [1]
+
+    twilight = pd.DataFrame({
+        "Civil_Twilight_Night": [1 if data.civil_twilight == "Night" else 0]
+    })
+
+    city = pd.DataFrame({
+        "City": [data.city]
+    })
+    city = binary_encoder.transform(city['City'])
+
+    X = pd.concat([basic_info, road, time_, wind, weather, twilight, city], axis=1)
+    return X
+
+
+class CompiledFeatureEncoder:
+    """
+    Feature pipeline compiled once from the fitted scaler, the city BinaryEncoder and the
+    one-hot column lists. Requests are turned into float32 rows with dictionary lookups and
+    array arithmetic, giving the same matrix as encode_request_frame without any DataFrame.
+    """
+
+    def __init__(self, columns: List[str], scaler: MinMaxScaler,
+                 binary_encoder: category_encoders.BinaryEncoder):
+        self.columns = list(columns)
+        index = {name: i for i, name in enumerate(self.columns)}
+
+        self._scaled_index = np.array([index[name] for name in SCALED_FEATURES])
+        self._scaler = scaler
+
+        # One-hot columns; the dropped first category has no column and stays all-zero
+        self._wind_index: Dict[str, int] = {
+            d.value: index[f"Wind_Direction_{d.value}"] for d in WindDirectionEnum if f"Wind_Direction_{d.value}" in index
+        }
+        self._weather_index: Dict[str, int] = {
+            w.value: index[f"Weather_Condition_{w.value}"] for w in WeatherConditionEnum
+            if f"Weather_Condition_{w.value}" in index
+        }
+        self._night_index = index["Civil_Twilight_Night"]
+
+        # Binary code of every city seen in training, plus the codes for unknown and missing cities
+        cities = self._known_cities(binary_encoder)
+        city_codes = binary_encoder.transform(pd.Series(cities, name="City"))
+        self._city_index = np.array([index[name] for name in city_codes.columns])
+        self._city_codes: Dict[str, np.ndarray] = dict(zip(cities, city_codes.to_numpy(dtype=np.float64)))
+        self._unknown_city = binary_encoder.transform(
+            pd.Series(["\0unknown city"], name="City")).to_numpy(dtype=np.float64)[0]
+        self._missing_city = binary_encoder.transform(
+            pd.Series([None], name="City")).to_numpy(dtype=np.float64)[0]
+
+    @staticmethod
+    def _known_cities(binary_encoder: category_encoders.BinaryEncoder) -> List[str]:
+        mapping = binary_encoder.ordinal_encoder.mapping[0]["mapping"]
+        return [city for city in mapping.index if isinstance(city, str)]
+
+    def _city_code(self, city) -> np.ndarray:
+        if city is None:
+            return self._missing_city
+        return self._city_codes.get(city, self._unknown_city)
+
+    def encode_batch(self, rows: Sequence[PredictAccidentRequest]) -> np.ndarray:
+        """Encode many requests into one float32 matrix in training column order"""
+        X = np.zeros((len(rows), len(self.columns)), dtype=np.float64)
+        X[:, self._scaled_index] = min_max_scale(raw_scaled_features(rows), self._scaler)
+        for i, row in enumerate(rows):
+            wind = self._wind_index.get(row.wind_direction)
+            if wind is not None:
+                X[i, wind] = 1
+            weather = self._weather_index.get(row.weather_condition)
+            if weather is not None:
+                X[i, weather] = 1
+            if row.civil_twilight == "Night":
+                X[i, self._night_index] = 1
+            X[i, self._city_index] = self._city_code(row.city)
+        # The forest evaluates float32 features; casting once here matches its own conversion
+        return X.astype(np.float32)
+
+    def encode(self, row: PredictAccidentRequest) -> np.ndarray:
+        """Encode a single request into a (1, n_features) float32 row"""
+        return self.encode_batch([row])
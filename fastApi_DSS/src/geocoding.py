@@ -0,0 +1,236 @@
+import asyncio
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import duckdb
+
+# Nominatim's usage policy allows one request per second
+REMOTE_MIN_INTERVAL = 1.0
+
+# Street centroids of the warehouse: accidents on the same street, city and state,
+# read from the coordinate sums of street_rollup (src/rollups.py) instead of the accident table
+STREET_QUERY = """
+    SELECT q.idx, SUM(s.lat_sum) / SUM(s.count) AS lat, SUM(s.lng_sum) / SUM(s.count) AS lng
+    FROM (VALUES {values}) q(idx, street, city, state)
+    JOIN street_rollup s ON s.Street = q.street AND s.City = q.city AND s.State = q.state
+    GROUP BY q.idx
+"""
+STREET_QUERY_CHUNK = 500
+
+
+@dataclass
+class Address:
+    street: Optional[str]
+    city: str
+    county: Optional[str]
+    state: str
+
+    @property
+    def key(self) -> str:
+        return "|".join((part or "").strip().lower() for part in (self.street, self.city, self.county, self.state))
+
+
+@dataclass
+class GeocodeResult:
+    lat: Optional[float]
+    lng: Optional[float]
+    source: str
+    cached: bool = False
+
+    @property
+    def found(self) -> bool:
+        return self.lat is not None
+
+
+class GeocodeCache:
+    """Persistent address -> coordinates cache in SQLite; misses are kept for a shorter time than hits"""
+
+    def __init__(self, path: str, ttl_seconds: float, miss_ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS geocode (
+                    key TEXT PRIMARY KEY, lat REAL, lng REAL, source TEXT, stored_at REAL
+                )
+            """)
+        return self._conn
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, GeocodeResult]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(keys), 500):
+                chunk = list(keys[i:i + 500])
+                rows = conn.execute(
+                    f"SELECT key, lat, lng, source, stored_at FROM geocode WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                for key, lat, lng, source, stored_at in rows:
+                    ttl = self.ttl_seconds if lat is not None else self.miss_ttl_seconds
+                    if now - stored_at < ttl:
+                        found[key] = GeocodeResult(lat, lng, source, cached=True)
+        return found
+
+    def put_many(self, results: Dict[str, GeocodeResult]) -> None:
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)",
+                [(key, r.lat, r.lng, r.source, now) for key, r in results.items()])
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class Geocoder:
+    """
+    Resolves report addresses without a network round trip whenever possible:
+    the on-disk cache, then the average position of warehouse accidents on the same street,
+    then the city centroid from uscities.csv, and only then Nominatim (rate limited).
+    """
+
+    def __init__(self, cache_path: str = "../geocode_cache.sqlite", cities_csv: str = "../../FE/uscities.csv",
+                 ttl_seconds: float = 30 * 86400, miss_ttl_seconds: float = 86400, remote: bool = True,
+                 user_agent: str = "dw-project-geocoder"):
+        self.cities_csv = cities_csv
+        self.remote = remote
+        self.user_agent = user_agent
+        self.cache = GeocodeCache(cache_path, ttl_seconds, miss_ttl_seconds)
+        self.logger = logging.getLogger(__name__)
+        self._centroids: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None
+        self._remote_client = None
+        self._remote_lock = asyncio.Lock()
+        self._last_remote = 0.0
+        self.stats = {"requests": 0, "cache": 0, "warehouse": 0, "city": 0, "remote": 0, "none": 0, "deferred": 0}
+
+    def configure(self, cache_path: str, cities_csv: str, ttl_seconds: float, remote: bool) -> None:
+        self.cache.close()
+        self.cache = GeocodeCache(cache_path, ttl_seconds, self.cache.miss_ttl_seconds)
+        self.cities_csv = cities_csv
+        self.remote = remote
+        self._centroids = None
+
+    def centroids(self) -> Dict[Tuple[str, str], Tuple[float, float]]:
+        """(state_id, lowercase city) -> (lat, lng), read once"""
+        if self._centroids is None:
+            centroids = {}
+            if os.path.exists(self.cities_csv):
+                with open(self.cities_csv, newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        centroids.setdefault((row["state_id"], row["city"].strip().lower()),
+                                             (float(row["lat"]), float(row["lng"])))
+            else:
+                self.logger.warning(f"{self.cities_csv} not found, city centroids are unavailable")
+            self._centroids = centroids
+        return self._centroids
+
+    async def _from_warehouse(self, db, addresses: Dict[str, Address]) -> Dict[str, GeocodeResult]:
+        items = [(key, a) for key, a in addresses.items() if a.street]
+        found = {}
+        for i in range(0, len(items), STREET_QUERY_CHUNK):
+            chunk = items[i:i + STREET_QUERY_CHUNK]
+            parameters = []
+            for idx, (_, address) in enumerate(chunk):
+                parameters += [idx, address.street.strip(), address.city.strip(), address.state]
+            try:
+                res = await db.execute_df(
+                    STREET_QUERY.format(values=", ".join(["(?, ?, ?, ?)"] * len(chunk))), parameters)
+            except duckdb.CatalogException:
+                # street_rollup is built by the next ETL run; until then the other sources answer
+                self.logger.warning("street_rollup is not built yet, skipping warehouse street positions")
+                return found
+            for idx, lat, lng in zip(res["idx"], res["lat"], res["lng"]):
+                found[chunk[int(idx)][0]] = GeocodeResult(float(lat), float(lng), "warehouse")
+        return found
+
+    def _geocode_remote(self, address: Address) -> GeocodeResult:
+        if self._remote_client is None:
+            from geopy.geocoders import Nominatim
+            self._remote_client = Nominatim(user_agent=self.user_agent, timeout=5)
+        query = ", ".join(part for part in (address.street, address.city, address.county, address.state, "USA") if part)
+        location = self._remote_client.geocode(query)
+        if location is None:
+            return GeocodeResult(None, None, "none")
+        return GeocodeResult(location.latitude, location.longitude, "remote")
+
+    async def _from_remote(self, address: Address) -> GeocodeResult:
+        async with self._remote_lock:
+            wait = REMOTE_MIN_INTERVAL - (time.monotonic() - self._last_remote)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await asyncio.to_thread(self._geocode_remote, address)
+            except Exception as e:
+                self.logger.warning(f"Remote geocoding failed: {str(e)}")
+                return GeocodeResult(None, None, "none")
+            finally:
+                self._last_remote = time.monotonic()
+
+    async def geocode_many(self, db, addresses: Sequence[Address],
+                           max_remote: Optional[int] = None) -> List[GeocodeResult]:
+        """
+        Geocode addresses in order; duplicates are resolved once. `db` is a WarehouseCursor.
+        At most `max_remote` addresses go to Nominatim; the ones over the cap come back with
+        source "none" and are not cached, so the caller can send them again later.
+        """
+        self.stats["requests"] += len(addresses)
+        pending = {address.key: address for address in addresses}
+        results = await asyncio.to_thread(self.cache.get_many, list(pending))
+        self.stats["cache"] += len(results)
+        for key in results:
+            del pending[key]
+
+        resolved = {}
+        if pending:
+            resolved.update(await self._from_warehouse(db, pending))
+            for key in resolved:
+                del pending[key]
+        # Nothing below reads the warehouse and remote lookups take a second each; it reopens on next use
+        db.close()
+
+        centroids = await asyncio.to_thread(self.centroids)
+        for key, address in list(pending.items()):
+            centroid = centroids.get((address.state, address.city.strip().lower()))
+            if centroid is not None:
+                resolved[key] = GeocodeResult(centroid[0], centroid[1], "city")
+                del pending[key]
+
+        deferred = {}
+        for i, (key, address) in enumerate(pending.items()):
+            if not self.remote:
+                resolved[key] = GeocodeResult(None, None, "none")
+            elif max_remote is not None and i >= max_remote:
+                deferred[key] = GeocodeResult(None, None, "none")
+            else:
+                resolved[key] = await self._from_remote(address)
+
+        for result in resolved.values():
+            self.stats[result.source] += 1
+        self.stats["deferred"] += len(deferred)
+        await asyncio.to_thread(self.cache.put_many, resolved)
+        results.update(resolved)
+        results.update(deferred)
+        return [results[address.key] for address in addresses]
+
+    async def geocode(self, db, address: Address) -> GeocodeResult:
+        return (await self.geocode_many(db, [address]))[0]
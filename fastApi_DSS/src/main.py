@@ -1,23 +1,42 @@
 import asyncio
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from datetime import datetime, time, timedelta
-from typing import Optional, Annotated, Dict
+from functools import lru_cache
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+from typing import Optional, Annotated, Dict, AsyncIterator, Any, Awaitable, Callable, List
 
-import category_encoders
 import duckdb
+import numpy as np
 import pandas as pd
 import pytz
 from fastapi import FastAPI, HTTPException, Depends
-from fastapi import Response
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.params import Query
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import MinMaxScaler
 
+from batching import MicroBatcher
+from cache import ResultCache, etag_matches
+from clustering import require_location_columns
 from orchestrator import DuckDBPostgresETL
+from rollups import rollups_built
+from stats import compute_stats, fetch_live_counts, read_high_water
+from tiles import MAX_LATITUDE, bbox_tiles, pyramid_level
+from streaming import RecordBatchEncoder, decode_cursor, keyset_page
 from database import TrafficIncidentCreate, TrafficIncident
-from database import PredictAccidentRequest
+from database import PredictAccidentRequest, PredictBatchResponse
+from database import GeocodeRequest, GeocodeResponse
+from database import ReportRequest, ReportResponse
+from geocoding import Address, Geocoder
+from weather import WeatherService, make_provider
+from report import ReportEnricher
+from features import predict_proba
+from model_registry import ModelRegistry, ModelVersion
 
 
 class AppConfig(BaseSettings):
@@ -31,6 +50,57 @@ class AppConfig(BaseSettings):
     POSTGRES_PASSWORD: str
     ETL_RUN_TIME: str
     ETL_TIMEZONE: str
+    ETL_WATERMARK_LAG_SECONDS: int = 300
+
+    # Warehouse query pool: concurrent DuckDB queries and how many more may wait for a worker
+    WAREHOUSE_MAX_WORKERS: int = 4
+    WAREHOUSE_MAX_QUEUE: int = 32
+
+    # Chart/stats result cache, invalidated after every ETL load
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_CACHE_MAX_AGE: int = 0  # seconds clients may reuse a response before revalidating
+
+    # Streamed map charts (/chart/3, /chart/4): rows per response and rows per record batch
+    CHART_MAX_ROWS: int = 1_000_000
+    CHART_STREAM_BATCH_ROWS: int = 65536
+
+    # KPIs of today and yesterday add the incidents in PostgreSQL the ETL has not loaded yet,
+    # cached for this many seconds
+    STATS_LIVE: bool = True
+    STATS_LIVE_TTL_SECONDS: int = 30
+
+    # Report geocoding: on-disk cache, city centroids and whether Nominatim is the last resort
+    GEOCODE_CACHE_PATH: str = "../geocode_cache.sqlite"
+    GEOCODE_CACHE_TTL_SECONDS: int = 30 * 86400
+    GEOCODE_CITIES_CSV: str = "../../FE/uscities.csv"
+    GEOCODE_REMOTE: bool = True
+    GEOCODE_MAX_BATCH_SIZE: int = 10000
+    GEOCODE_BATCH_MAX_REMOTE: int = 10
+
+    # Report weather: "openweather", or "fixture" to serve WEATHER_FIXTURE_PATH without network access;
+    # unset, OpenWeather when OPENWEATHER_API_KEY is given (in the environment, never in .env), else the fixture.
+    # Lookups are cached per ~1 km and 10 minutes.
+    WEATHER_PROVIDER: str = ""
+    OPENWEATHER_API_KEY: str = ""
+    WEATHER_FIXTURE_PATH: str = "../weather_fixture.json"
+    WEATHER_CACHE_TTL_SECONDS: int = 600
+
+    PREDICT_MAX_BATCH_SIZE: int = 10000
+    # Load the models during startup instead of on the first /predict request
+    PREDICT_EAGER_LOAD: bool = True
+
+    # Model registry: reload retrained artifacts from MODELS_PATH without a restart
+    MODELS_PATH: str = "../models"
+    MODEL_WATCH: bool = True
+    MODEL_POLL_SECONDS: float = 5.0  # only used when watchfiles is not installed
+    # Fraction of /predict batches also scored by a newly loaded version before it is promoted;
+    # 0 swaps new versions in as soon as they are loaded
+    MODEL_SHADOW_SAMPLE_RATE: float = 0.0
+
+    # /predict micro-batching: concurrent requests arriving within the window are scored together
+    PREDICT_BATCH_WINDOW_MS: float = 3.0
+    PREDICT_BATCH_MAX_ROWS: int = 256
+    PREDICT_BATCH_MAX_QUEUE: int = 1024
 
     model_config = SettingsConfigDict(
         env_file="../.env",
@@ -47,6 +117,19 @@ class AppConfig(BaseSettings):
             "user": self.POSTGRES_USER,
             "password": self.POSTGRES_PASSWORD,
         }
+
+
+@lru_cache
+def get_settings() -> AppConfig:
+    return AppConfig()
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow responses are optional, charts fall back to JSON
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 
@@ -83,8 +166,59 @@ class DatabaseConnection:
                 db.close()
 
 
+class WarehouseCursor:
+    """
+    Per-request DuckDB cursor.
+    Queries are executed on the warehouse thread pool so they never block the event loop.
+    """
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection):
+        self._conn = conn
+        self._cursor: Optional[duckdb.DuckDBPyConnection] = None
+
+    async def execute_df(self, query: str, parameters: Optional[list] = None) -> pd.DataFrame:
+        return await WarehouseConnection.run(self._run_df, query, parameters)
+
+    def _get_cursor(self) -> duckdb.DuckDBPyConnection:
+        # Opened on first use, so requests answered from the result cache never touch DuckDB
+        if self._cursor is None:
+            self._cursor = self._conn.cursor()
+        return self._cursor
+
+    def _run_df(self, query: str, parameters: Optional[list]) -> pd.DataFrame:
+        return self._get_cursor().execute(query, parameters).df()
+
+    async def execute_arrow(self, query: str, parameters: Optional[list] = None) -> bytes:
+        """Result serialized as an Arrow IPC stream, straight from DuckDB's record batches"""
+        return await WarehouseConnection.run(self._run_arrow, query, parameters)
+
+    def _run_arrow(self, query: str, parameters: Optional[list]) -> bytes:
+        reader = self._get_cursor().execute(query, parameters).fetch_record_batch()
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+
+    async def fetch_record_batches(self, query: str, parameters: Optional[list],
+                                   rows_per_batch: int) -> "pa.RecordBatchReader":
+        """Execute a query and return a reader that produces its result one record batch at a time"""
+        return await WarehouseConnection.run(self._run_record_batches, query, parameters, rows_per_batch)
+
+    def _run_record_batches(self, query: str, parameters: Optional[list], rows_per_batch: int):
+        return self._get_cursor().execute(query, parameters).fetch_record_batch(rows_per_batch)
+
+    def close(self) -> None:
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+
 class WarehouseConnection:
     _instance: Optional[duckdb.DuckDBPyConnection] = None
+    _executor: Optional[ThreadPoolExecutor] = None
+    _max_pending: int = 0
+    _pending: int = 0
 
     @classmethod
     def get_connection(cls) -> duckdb.DuckDBPyConnection:
@@ -96,13 +230,19 @@ class WarehouseConnection:
         return cls._instance
 
     @classmethod
-    def initialize(cls, path: str) -> None:
+    def initialize(cls, path: str, max_workers: int = 4, max_queue: int = 32) -> None:
         if cls._instance is not None:
             cls.close()
         cls._instance = duckdb.connect(path)
+        cls._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warehouse")
+        cls._max_pending = max_workers + max_queue
+        cls._pending = 0
 
     @classmethod
     def close(cls) -> None:
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
         if cls._instance is not None:
             cls._instance.close()
             cls._instance = None
@@ -111,16 +251,208 @@ class WarehouseConnection:
     def is_initialized(cls) -> bool:
         return cls._instance is not None
 
+    @classmethod
+    def is_saturated(cls) -> bool:
+        return cls._pending >= cls._max_pending
 
-async def get_dw() -> duckdb.DuckDBPyConnection:
-    """Dependency for getting database connection"""
-    conn = WarehouseConnection.get_connection()
-    if not conn:
+    @classmethod
+    def pool_state(cls) -> Dict[str, Any]:
+        return {"pending": cls._pending, "max_pending": cls._max_pending, "saturated": cls.is_saturated()}
+
+    @classmethod
+    def cursor(cls) -> WarehouseCursor:
+        """Open a new cursor on the shared database; each cursor can run on its own thread"""
+        return WarehouseCursor(cls.get_connection())
+
+    @classmethod
+    async def run(cls, func, *args):
+        """Run a blocking warehouse call on the thread pool"""
+        cls._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(cls._executor, func, *args)
+        finally:
+            cls._pending -= 1
+
+
+def ensure_warehouse_capacity() -> None:
+    if WarehouseConnection.is_saturated():
         raise HTTPException(
-            status_code=500,
-            detail="Database connection is not available"
+            status_code=503,
+            detail="Warehouse is busy, please retry later"
+        )
+
+
+_rollups_ready = False
+
+
+def rollups_ready() -> bool:
+    """Whether the chart rollups exist; looked up again until they do, since another process builds them"""
+    global _rollups_ready
+    if not _rollups_ready:
+        cursor = WarehouseConnection.get_connection().cursor()
+        try:
+            _rollups_ready = rollups_built(cursor)
+        finally:
+            cursor.close()
+    return _rollups_ready
+
+
+def ensure_rollups_built() -> None:
+    if not rollups_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Chart rollups are not built yet, please retry after the next ETL run"
         )
-    return conn
+
+
+async def get_dw() -> AsyncIterator[WarehouseCursor]:
+    """Dependency for getting a per-request warehouse cursor"""
+    ensure_warehouse_capacity()
+    cursor = WarehouseConnection.cursor()
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+result_cache = ResultCache()
+model_registry = ModelRegistry()
+geocoder = Geocoder()
+weather_service = WeatherService()
+report_enricher = ReportEnricher(geocoder, weather_service)
+
+
+def cache_headers(key: str) -> Dict[str, str]:
+    return {"ETag": result_cache.etag(key), "Cache-Control": result_cache.cache_control, "Vary": "Accept"}
+
+
+async def cached_response(request: Request, params: Dict[str, Any],
+                          compute: Callable[[], Awaitable[bytes]],
+                          media_type: str = "application/json") -> Response:
+    """
+    Serve a response from the result cache, computing it on a miss.
+    Clients presenting a matching ETag get 304 Not Modified.
+    """
+    key = result_cache.make_key(request.url.path, {**params, "format": media_type})
+    headers = cache_headers(key)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    body = result_cache.get(key)
+    if body is None:
+        body = await compute()
+        result_cache.put(key, body)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def wants_arrow(request: Request) -> bool:
+    """Content negotiation for chart data: Arrow IPC when the client asks for it and pyarrow is installed"""
+    return pa is not None and ARROW_STREAM in request.headers.get("accept", "")
+
+
+async def cached_records(request: Request, db: WarehouseCursor, query: str,
+                         state: Optional[str], city: Optional[str]) -> Response:
+    """
+    Run a chart query filtered by (state, city) and return its rows as cached JSON records,
+    or as an Arrow IPC stream for clients that accept application/vnd.apache.arrow.stream
+    """
+    return await cached_query(request, db, query, [state, state, city, city], {"state": state, "city": city})
+
+
+async def cached_query(request: Request, db: WarehouseCursor, query: str,
+                       parameters: list, cache_params: Dict[str, Any]) -> Response:
+    """cached_records for any query; `cache_params` must identify the parameters in the cache key"""
+    if wants_arrow(request):
+        async def compute_arrow() -> bytes:
+            return await db.execute_arrow(query, parameters)
+
+        return await cached_response(request, cache_params, compute_arrow, ARROW_STREAM)
+
+    async def compute() -> bytes:
+        res = await db.execute_df(query, parameters)
+        return res.to_json(orient="records").encode()
+
+    return await cached_response(request, cache_params, compute)
+
+
+async def streamed_records(request: Request, query: str, keys: List[str], parameters: list,
+                           cache_params: Dict[str, Any], limit: Optional[int], page_cursor: Optional[str]) -> Response:
+    """
+    Stream a large chart result in record batches instead of building one DataFrame and JSON string.
+    Rows come ordered by `keys` and capped at CHART_MAX_ROWS. Passing `limit` or `cursor` switches
+    to pages of {"rows": [...], "next_cursor": ...}; paginated responses are always JSON.
+    `cache_params` must identify `parameters` in the cache key.
+    """
+    settings = get_settings()
+    paginate = limit is not None or page_cursor is not None
+    if pa is None:
+        # DuckDB produces record batches through pyarrow; without it the result is built in one piece
+        if paginate:
+            raise HTTPException(
+                status_code=501,
+                detail="Pagination requires pyarrow on the server"
+            )
+        ensure_warehouse_capacity()
+        db = WarehouseConnection.cursor()
+        try:
+            return await cached_query(request, db, query, parameters, cache_params)
+        finally:
+            db.close()
+
+    page_limit = min(limit or settings.CHART_MAX_ROWS, settings.CHART_MAX_ROWS)
+    arrow = wants_arrow(request) and not paginate
+    media_type = ARROW_STREAM if arrow else "application/json"
+    try:
+        after = decode_cursor(page_cursor) if page_cursor else None
+        sql, page_parameters = keyset_page(query, parameters, keys, after, page_limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    key = result_cache.make_key(request.url.path, {
+        **cache_params, "format": media_type, "limit": page_limit, "cursor": page_cursor, "paginate": paginate})
+    headers = {**cache_headers(key), "X-Row-Cap": str(page_limit)}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    body = result_cache.get(key)
+    if body is not None:
+        return Response(body, media_type=media_type, headers=headers)
+
+    ensure_warehouse_capacity()
+    cursor = WarehouseConnection.cursor()
+    try:
+        # Executed before responding, so query errors still turn into an error status
+        reader = await cursor.fetch_record_batches(sql, page_parameters, settings.CHART_STREAM_BATCH_ROWS)
+    except Exception:
+        cursor.close()
+        raise
+    encoder = RecordBatchEncoder(reader, keys, page_limit, arrow=arrow, envelope=paginate)
+    return StreamingResponse(stream_chunks(cursor, encoder, key), media_type=media_type, headers=headers)
+
+
+async def stream_chunks(cursor: WarehouseCursor, encoder: RecordBatchEncoder, cache_key: str) -> AsyncIterator[bytes]:
+    """Send encoded batches as DuckDB produces them; results small enough are also kept in the result cache"""
+    kept: Optional[List[bytes]] = []
+    kept_bytes = 0
+    try:
+        chunk = encoder.header()
+        while chunk is not None:
+            yield chunk
+            if kept is not None:
+                kept.append(chunk)
+                kept_bytes += len(chunk)
+                if kept_bytes > result_cache.max_bytes // 8:
+                    kept = None
+            chunk = await WarehouseConnection.run(encoder.next_chunk)
+        footer = encoder.footer()
+        yield footer
+        if kept is not None:
+            result_cache.put(cache_key, b"".join(kept) + footer)
+    finally:
+        cursor.close()
 
 
 # Configure logging
@@ -135,14 +467,17 @@ logging.basicConfig(
 
 
 class ETLManager:
-    def __init__(self, settings: AppConfig):
+    def __init__(self, settings: AppConfig, cache: ResultCache):
         self.settings = settings
+        self.cache = cache
         self.etl_task: Optional[asyncio.Task] = None
         self.logger = logging.getLogger(__name__)
         self.etl = DuckDBPostgresETL(
             settings.DUCKDB_PATH,
             settings.postgres_config,
-            self.logger)
+            self.logger,
+            watermark_lag_seconds=settings.ETL_WATERMARK_LAG_SECONDS,
+            timezone=settings.ETL_TIMEZONE)
 
         # Parse ETL run time
         run_time = datetime.strptime(settings.ETL_RUN_TIME, "%H:%M").time()
@@ -168,8 +503,11 @@ class ETLManager:
             try:
                 # self.etl.setup_connection()
                 await self.schedule_next_run()
-                # Run ETL process
-                self.etl.run_daily_etl()
+                # Run ETL process off the event loop, catching up on missed days can take a while
+                await asyncio.to_thread(self.etl.run_daily_etl)
+                # New data is visible, drop cached chart responses and their ETags
+                version = self.cache.bump_version()
+                self.logger.info(f"Warehouse data version is now {version}")
             except Exception as e:
                 self.logger.error(f"Error in ETL loop: {str(e)}")
                 if self.settings.DEBUG:
@@ -193,17 +531,51 @@ class ETLManager:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    settings = AppConfig()
+    settings = get_settings()
     etl_manager = None
     try:
         # Ensure DuckDB connection is only initialized once
         if not WarehouseConnection.is_initialized():
-            WarehouseConnection.initialize(settings.DUCKDB_PATH)
+            WarehouseConnection.initialize(
+                settings.DUCKDB_PATH,
+                max_workers=settings.WAREHOUSE_MAX_WORKERS,
+                max_queue=settings.WAREHOUSE_MAX_QUEUE)
         print(f"Connected to DuckDB at {settings.DUCKDB_PATH}")
         print(f"Debug mode: {settings.DEBUG}")
 
+        result_cache.configure(settings.RESULT_CACHE_MAX_BYTES, settings.RESULT_CACHE_MAX_AGE)
+
+        # State and City live on the accident table; warehouses built before that are migrated by clustering.py
+        require_location_columns(WarehouseConnection.get_connection())
+        # The rollups are built by the ETL (or rollups.py), not here: from the full history that takes minutes
+        if not rollups_ready():
+            logging.getLogger(__name__).warning(
+                "Chart rollups are not built yet, charts answer 503 until the next ETL run "
+                "or `python rollups.py <duckdb_path>` builds them")
+
+        model_registry.configure(settings.MODELS_PATH, settings.MODEL_SHADOW_SAMPLE_RATE, settings.MODEL_POLL_SECONDS)
+        if settings.PREDICT_EAGER_LOAD:
+            try:
+                await warm_up_models(PredictAccidentRequest(start_time=datetime.now()))
+            except Exception as e:
+                # Charts and reports do not need the models; /predict loads them lazily and reports its own error
+                logging.getLogger(__name__).error(
+                    f"Loading models from {settings.MODELS_PATH} failed, /predict will retry on use: {str(e)}")
+        if settings.MODEL_WATCH:
+            model_registry.start()
+
+        predict_batcher.configure(
+            settings.PREDICT_BATCH_WINDOW_MS, settings.PREDICT_BATCH_MAX_ROWS, settings.PREDICT_BATCH_MAX_QUEUE)
+        predict_batcher.start()
+
+        geocoder.configure(settings.GEOCODE_CACHE_PATH, settings.GEOCODE_CITIES_CSV,
+                           settings.GEOCODE_CACHE_TTL_SECONDS, settings.GEOCODE_REMOTE)
+        weather_service.configure(
+            make_provider(settings.WEATHER_PROVIDER, settings.OPENWEATHER_API_KEY, settings.WEATHER_FIXTURE_PATH),
+            settings.WEATHER_CACHE_TTL_SECONDS)
+
         # Initialize and start ETL manager
-        etl_manager = ETLManager(settings)
+        etl_manager = ETLManager(settings, result_cache)
         etl_manager.start()
 
         # Initialize database connection
@@ -218,6 +590,10 @@ async def lifespan(app: FastAPI):
     finally:
         if etl_manager:
             etl_manager.stop()
+        await predict_batcher.stop()
+        await model_registry.stop()
+        geocoder.cache.close()
+        weather_service.configure(None, settings.WEATHER_CACHE_TTL_SECONDS)
         WarehouseConnection.close()
         print("Closed DuckDB connection")
 
@@ -234,60 +610,137 @@ app = FastAPI(
         redoc_url="/api/redoc",
         lifespan=lifespan,
     )
+# Chart payloads are large and repetitive JSON, compress them for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
-# noinspection SqlDialectInspection
 @app.get("/health")
-async def health_check(db: duckdb.DuckDBPyConnection = Depends(get_dw)):
-    """Health check endpoint that verifies database connection"""
-    try:
-        # Simple query to verify database connection
-        # res = db.execute("SELECT max(accident_id) FROM accident").df()
-        # return Response(res.to_json(orient="records"), media_type="application/json")
-        db.execute("SELECT 1").df()
-        # db.execute("""
-        #         DELETE FROM accident WHERE accident_id >= 7728400;
-        # """)
-        # db.execute("""
-        # CREATE OR REPLACE SEQUENCE seq_environment_id START 349;
-        # CREATE OR REPLACE SEQUENCE seq_location_id START 624778;
-        # CREATE OR REPLACE SEQUENCE seq_weather_id START 13;
-        # CREATE OR REPLACE SEQUENCE seq_accident_id START 7728400;
-        # CREATE OR REPLACE SEQUENCE seq_twilight_id START 12;
-        # CREATE OR REPLACE SEQUENCE seq_wind_id START 12;
-        # """)
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
+async def health_check():
+    """
+    Health check endpoint reporting the warehouse connection and query pool.
+    Answered without touching the pool, so it stays responsive while chart queries are queued.
+    """
+    if not WarehouseConnection.is_initialized():
         raise HTTPException(
             status_code=503,
-            detail=f"Database health check failed: {str(e)}"
+            detail="Database health check failed: warehouse is not connected"
         )
+    return {"status": "healthy", "database": "connected", "warehouse": WarehouseConnection.pool_state()}
+
+
+# Chart datasets, each filtered by (state, city) with the parameters [state, state, city, city]
+CHART_QUERIES = {
+    "1": """
+        SELECT 
+            strftime(Month_Start, '%Y-%m') as month, Severity, CAST(SUM(count) AS BIGINT) as count
+        FROM monthly_severity_rollup
+        WHERE (? IS NULL OR State = ?) AND (? IS NULL OR City = ?)
+        GROUP BY month, Severity
+    """,
+    "2": """
+        SELECT strftime(Month_Start, '%Y-%m') as month, Weather_Condition, Severity, CAST(SUM(count) AS BIGINT) as count
+        FROM monthly_weather_rollup
+        WHERE (? IS NULL OR State = ?) AND (? IS NULL OR City = ?)
+        GROUP BY month, Weather_Condition, Severity
+    """,
+    "3": """
+        SELECT 
+            strftime(Month_Start, '%Y-%m') as month,
+            -- grid is rounded to 2 decimal places when the rollup is built
+            CAST(grid_lat AS DOUBLE) as grid_lat, 
+            CAST(grid_lng AS DOUBLE) as grid_lng, 
+            CAST(SUM(count) AS BIGINT) as accident_count
+        FROM monthly_density_rollup
+        WHERE (? IS NULL OR State = ?) AND (? IS NULL OR City = ?)
+        GROUP BY month, grid_lat, grid_lng
+    """,
+    "4": """
+        SELECT 
+            strftime(Month_Start, '%Y-%m') as month,
+            CAST(grid_lat AS DOUBLE) as grid_lat, 
+            CAST(grid_lng AS DOUBLE) as grid_lng, 
+            Severity,
+            CAST(SUM(count) AS BIGINT) as accident_count
+        FROM monthly_grid_severity_rollup
+        WHERE (? IS NULL OR State = ?) AND (? IS NULL OR City = ?)
+        GROUP BY month, grid_lat, grid_lng, Severity
+    """,
+    "5": """
+        SELECT 
+            date_part('year', a.Start_Time) AS year, 
+            a.Severity,
+            COUNT(CASE WHEN e.Amenity THEN 1 END) AS Amenity, 
+            COUNT(CASE WHEN e.Bump THEN 1 END) AS Bump, 
+            COUNT(CASE WHEN e.Crossing THEN 1 END) AS Crossing, 
+            COUNT(CASE WHEN e.Give_Way THEN 1 END) AS Give_Way, 
+            COUNT(CASE WHEN e.Junction THEN 1 END) AS Junction, 
+            COUNT(CASE WHEN e.No_Exit THEN 1 END) AS No_Exit, 
+            COUNT(CASE WHEN e.Railway THEN 1 END) AS Railway, 
+            COUNT(CASE WHEN e.Roundabout THEN 1 END) AS Roundabout, 
+            COUNT(CASE WHEN e.Station THEN 1 END) AS Station, 
+            COUNT(CASE WHEN e.Stop THEN 1 END) AS Stop, 
+            COUNT(CASE WHEN e.Traffic_Calming THEN 1 END) AS Traffic_Calming, 
+            COUNT(CASE WHEN e.Traffic_Signal THEN 1 END) AS Traffic_Signal, 
+            COUNT(CASE WHEN e.Turning_Loop THEN 1 END) AS Turning_Loop
+        FROM accident a 
+        JOIN environment e ON a.Environment_ID = e.Environment_ID 
+        WHERE (? IS NULL OR a.State = ?) AND (? IS NULL OR a.City = ?)
+        GROUP BY year, a.Severity
+        ORDER BY year, a.Severity;
+    """,
+    "6": """
+        SELECT CAST(Hour AS BIGINT) as hour, date_part('year', Month_Start) as year, Severity, CAST(SUM(count) AS BIGINT) as count
+        FROM monthly_hour_rollup
+        WHERE (? IS NULL OR State = ?) AND (? IS NULL OR City = ?) 
+        GROUP BY hour, year, Severity 
+        ORDER BY year, hour, Severity
+    """,
+}
+
+
+# Tiles of one pyramid level inside a tile range, with the accident centroid of each tile.
+# {severity} is either empty (density map) or ", Severity" (severity map).
+TILE_QUERY = """
+    SELECT
+        strftime(Month_Start, '%Y-%m') as month,
+        Tile_X as tile_x,
+        Tile_Y as tile_y,
+        SUM(lat_sum) / SUM(count) as grid_lat,
+        SUM(lng_sum) / SUM(count) as grid_lng{severity},
+        CAST(SUM(count) AS BIGINT) as accident_count
+    FROM monthly_tile_rollup
+    WHERE Zoom = ? AND Tile_X BETWEEN ? AND ? AND Tile_Y BETWEEN ? AND ?
+        AND (? IS NULL OR State = ?) AND (? IS NULL OR City = ?)
+    GROUP BY month, Tile_X, Tile_Y{severity}
+"""
+
+
+# Sort keys of the streamed charts, used for keyset pagination
+CHART_KEYS = {
+    "3": ["month", "grid_lat", "grid_lng"],
+    "4": ["month", "grid_lat", "grid_lng", "Severity"],
+    "tiles": ["month", "tile_x", "tile_y"],
+}
 
 
 # noinspection SqlDialectInspection
 @app.get("/chart/1")
-async def get_chart_data_1(state: Annotated[Optional[str], Query(alias="state")] = None,
+async def get_chart_data_1(request: Request,
+                           state: Annotated[Optional[str], Query(alias="state")] = None,
                            city: Annotated[Optional[str], Query(alias="city")] = None,
-                           db: duckdb.DuckDBPyConnection = Depends(get_dw)):
+                           db: WarehouseCursor = Depends(get_dw)):
     if city and not state:
         raise HTTPException(
             status_code=400,
             detail="State must be provided if City is specified."
         )
 
+    ensure_rollups_built()
     try:
-        res = db.execute("""
-                SELECT 
-                    strftime(date_trunc('month', a.Start_Time), '%Y-%m') as month, a.Severity, COUNT(a.Accident_ID) as count
-                FROM accident a
-                JOIN location l ON a.Location_ID = l.Location_ID
-                WHERE (? IS NULL OR l.State = ?) AND (? IS NULL OR l.City = ?)
-                GROUP BY month, a.Severity
-                """, [state, state, city, city]).df()
-        return Response(res.to_json(orient="records"), media_type="application/json")
+        return await cached_records(request, db, CHART_QUERIES["1"], state, city)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -297,25 +750,19 @@ async def get_chart_data_1(state: Annotated[Optional[str], Query(alias="state")]
 # noinspection SqlNoDataSourceInspection
 # noinspection SqlDialectInspection
 @app.get("/chart/2")
-async def get_chart_data_2(state: Annotated[Optional[str], Query(alias="state")] = None,
+async def get_chart_data_2(request: Request,
+                           state: Annotated[Optional[str], Query(alias="state")] = None,
                            city: Annotated[Optional[str], Query(alias="city")] = None,
-                           db: duckdb.DuckDBPyConnection = Depends(get_dw)):
+                           db: WarehouseCursor = Depends(get_dw)):
     if city and not state:
         raise HTTPException(
             status_code=400,
             detail="State must be provided if City is specified."
         )
 
+    ensure_rollups_built()
     try:
-        res = db.execute("""
-                SELECT strftime(date_trunc('month', a.Start_Time), '%Y-%m') as month, Weather_Condition, Severity, COUNT(a.Accident_ID) as count
-                FROM accident a
-                JOIN weather w ON a.Weather_Condition_ID = w.Weather_Condition_ID
-                JOIN location l ON a.Location_ID = l.Location_ID
-                WHERE (? IS NULL OR l.State = ?) AND (? IS NULL OR l.City = ?)
-                GROUP BY month, Weather_Condition, Severity
-                """, [state, state, city, city]).df()
-        return Response(res.to_json(orient="records"), media_type="application/json")
+        return await cached_records(request, db, CHART_QUERIES["2"], state, city)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -325,71 +772,109 @@ async def get_chart_data_2(state: Annotated[Optional[str], Query(alias="state")]
 
 # noinspection SqlDialectInspection
 @app.get("/chart/3")
-async def get_chart_data_34(state: Annotated[Optional[str], Query(alias="state")] = None,
+async def get_chart_data_34(request: Request,
+                            state: Annotated[Optional[str], Query(alias="state")] = None,
                             city: Annotated[Optional[str], Query(alias="city")] = None,
-                            db: duckdb.DuckDBPyConnection = Depends(get_dw)):
+                            limit: Annotated[Optional[int], Query(alias="limit", ge=1)] = None,
+                            page_cursor: Annotated[Optional[str], Query(alias="cursor")] = None):
     if city and not state:
         raise HTTPException(
             status_code=400,
             detail="State must be provided if City is specified."
         )
 
+    ensure_rollups_built()
     try:
-        res = db.execute("""
-                SELECT 
-                    strftime(date_trunc('month', a.Start_Time), '%Y-%m') as month,
-                    -- round to 1 decimal place for better performance on the Frontend
-                    ROUND(Start_Lat, 2) as grid_lat, 
-                    ROUND(Start_Lng, 2) as grid_lng, 
-                    COUNT(*) as accident_count
-                FROM accident a 
-                JOIN location l ON a.Location_ID = l.Location_ID
-                WHERE (? IS NULL OR l.State = ?) AND (? IS NULL OR l.City = ?)
-                GROUP BY month, grid_lat, grid_lng
-                """, [state, state, city, city]).df()
-        return Response(res.to_json(orient="records"), media_type="application/json")
+        return await streamed_records(request, CHART_QUERIES["3"], CHART_KEYS["3"], [state, state, city, city],
+                                      {"state": state, "city": city}, limit, page_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
-            status_code=00,
+            status_code=500,
             detail=f"Database error: {str(e)}"
         )
 
 # noinspection SqlDialectInspection
 @app.get("/chart/4")
-async def get_chart_data_34(state: Annotated[Optional[str], Query(alias="state")] = None,
+async def get_chart_data_34(request: Request,
+                            state: Annotated[Optional[str], Query(alias="state")] = None,
                             city: Annotated[Optional[str], Query(alias="city")] = None,
-                            db: duckdb.DuckDBPyConnection = Depends(get_dw)):
+                            limit: Annotated[Optional[int], Query(alias="limit", ge=1)] = None,
+                            page_cursor: Annotated[Optional[str], Query(alias="cursor")] = None):
     if city and not state:
         raise HTTPException(
             status_code=400,
             detail="State must be provided if City is specified."
         )
 
+    ensure_rollups_built()
     try:
-        res = db.execute("""
-                SELECT 
-                    strftime(date_trunc('month', a.Start_Time), '%Y-%m') as month,
-                    ROUND(Start_Lat, 1) as grid_lat, 
-                    ROUND(Start_Lng, 1) as grid_lng, 
-                    Severity,
-                    COUNT(*) as accident_count
-                FROM accident a 
-                JOIN location l ON a.Location_ID = l.Location_ID
-                WHERE (? IS NULL OR l.State = ?) AND (? IS NULL OR l.City = ?)
-                GROUP BY month, grid_lat, grid_lng, Severity
-                """, [state, state, city, city]).df()
-        return Response(res.to_json(orient="records"), media_type="application/json")
+        return await streamed_records(request, CHART_QUERIES["4"], CHART_KEYS["4"], [state, state, city, city],
+                                      {"state": state, "city": city}, limit, page_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
-            status_code=00,
+            status_code=500,
             detail=f"Database error: {str(e)}"
         )
 
+# noinspection SqlDialectInspection
+@app.get("/chart/tiles")
+async def get_chart_tiles(request: Request,
+                          zoom: Annotated[float, Query(alias="zoom", ge=0, le=22)],
+                          min_lat: Annotated[float, Query(alias="min_lat", ge=-90, le=90)] = -MAX_LATITUDE,
+                          min_lng: Annotated[float, Query(alias="min_lng", ge=-180, le=180)] = -180.0,
+                          max_lat: Annotated[float, Query(alias="max_lat", ge=-90, le=90)] = MAX_LATITUDE,
+                          max_lng: Annotated[float, Query(alias="max_lng", ge=-180, le=180)] = 180.0,
+                          by_severity: Annotated[bool, Query(alias="by_severity")] = False,
+                          state: Annotated[Optional[str], Query(alias="state")] = None,
+                          city: Annotated[Optional[str], Query(alias="city")] = None,
+                          limit: Annotated[Optional[int], Query(alias="limit", ge=1)] = None,
+                          page_cursor: Annotated[Optional[str], Query(alias="cursor")] = None):
+    """
+    Density (/chart/3) or severity (/chart/4) map data from the tile pyramid: accident counts per
+    month and tile for the bounding box, at the pyramid level that suits a map drawn at `zoom`
+    """
+    if city and not state:
+        raise HTTPException(
+            status_code=400,
+            detail="State must be provided if City is specified."
+        )
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(
+            status_code=400,
+            detail="Bounding box must have min_lat <= max_lat and min_lng <= max_lng."
+        )
+
+    ensure_rollups_built()
+    level = pyramid_level(zoom)
+    x_min, x_max, y_min, y_max = bbox_tiles(min_lat, min_lng, max_lat, max_lng, level)
+    query = TILE_QUERY.format(severity=", Severity" if by_severity else "")
+    keys = CHART_KEYS["tiles"] + (["Severity"] if by_severity else [])
+    try:
+        response = await streamed_records(
+            request, query, keys, [level, x_min, x_max, y_min, y_max, state, state, city, city],
+            {"level": level, "tiles": [x_min, x_max, y_min, y_max], "by_severity": by_severity,
+             "state": state, "city": city},
+            limit, page_cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}"
+        )
+    response.headers["X-Tile-Zoom"] = str(level)
+    return response
+
 # noinspection SqlDialectInspection
 @app.get("/chart/5")
-async def get_chart_data_5(state: Annotated[Optional[str], Query(alias="state")] = None,
+async def get_chart_data_5(request: Request,
+                           state: Annotated[Optional[str], Query(alias="state")] = None,
                            city: Annotated[Optional[str], Query(alias="city")] = None,
-                           db: duckdb.DuckDBPyConnection = Depends(get_dw)):
+                           db: WarehouseCursor = Depends(get_dw)):
     if city and not state:
         raise HTTPException(
             status_code=400,
@@ -397,31 +882,7 @@ async def get_chart_data_5(state: Annotated[Optional[str], Query(alias="state")]
         )
 
     try:
-        res = db.execute("""
-        SELECT 
-            date_part('year', a.Start_Time) AS year, 
-            a.Severity,
-            COUNT(CASE WHEN e.Amenity THEN 1 END) AS Amenity, 
-            COUNT(CASE WHEN e.Bump THEN 1 END) AS Bump, 
-            COUNT(CASE WHEN e.Crossing THEN 1 END) AS Crossing, 
-            COUNT(CASE WHEN e.Give_Way THEN 1 END) AS Give_Way, 
-            COUNT(CASE WHEN e.Junction THEN 1 END) AS Junction, 
-            COUNT(CASE WHEN e.No_Exit THEN 1 END) AS No_Exit, 
-            COUNT(CASE WHEN e.Railway THEN 1 END) AS Railway, 
-            COUNT(CASE WHEN e.Roundabout THEN 1 END) AS Roundabout, 
-            COUNT(CASE WHEN e.Station THEN 1 END) AS Station, 
-            COUNT(CASE WHEN e.Stop THEN 1 END) AS Stop, 
-            COUNT(CASE WHEN e.Traffic_Calming THEN 1 END) AS Traffic_Calming, 
-            COUNT(CASE WHEN e.Traffic_Signal THEN 1 END) AS Traffic_Signal, 
-            COUNT(CASE WHEN e.Turning_Loop THEN 1 END) AS Turning_Loop
-        FROM accident a 
-        JOIN environment e ON a.Environment_ID = e.Environment_ID 
-        JOIN location l ON a.Location_ID = l.Location_ID
-        WHERE (? IS NULL OR l.State = ?) AND (? IS NULL OR l.City = ?)
-        GROUP BY year, a.Severity
-        ORDER BY year, a.Severity;
-        """, [state, state, city, city]).df()
-        return Response(res.to_json(orient="records"), media_type="application/json")
+        return await cached_records(request, db, CHART_QUERIES["5"], state, city)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -430,98 +891,165 @@ async def get_chart_data_5(state: Annotated[Optional[str], Query(alias="state")]
 
 # noinspection SqlDialectInspection
 @app.get("/chart/6")
-async def get_chart_data_6(state: Annotated[Optional[str], Query(alias="state")] = None,
+async def get_chart_data_6(request: Request,
+                           state: Annotated[Optional[str], Query(alias="state")] = None,
                            city: Annotated[Optional[str], Query(alias="city")] = None,
-                           db: duckdb.DuckDBPyConnection = Depends(get_dw)):
+                           db: WarehouseCursor = Depends(get_dw)):
     if city and not state:
         raise HTTPException(
             status_code=400,
             detail="State must be provided if City is specified."
         )
+    ensure_rollups_built()
     try:
-        res = db.execute("""
-                SELECT date_part('hour', a.Start_Time) as hour, date_part('year', a.Start_Time) as year, Severity, COUNT(a.Accident_ID) as count
-                FROM accident a JOIN location l ON a.Location_ID = l.Location_ID
-                WHERE (? IS NULL OR l.State = ?) AND (? IS NULL OR l.City = ?) 
-                GROUP BY hour, year, Severity 
-                ORDER BY year, hour, Severity
-                """, [state, state, city, city]).df()
-        return Response(res.to_json(orient="records"), media_type="application/json")
+        return await cached_records(request, db, CHART_QUERIES["6"], state, city)
     except Exception as e:
         raise HTTPException(
-            status_code=00,
+            status_code=500,
             detail=f"Database error: {str(e)}"
         )
 
 
+def stats_today() -> date:
+    """Today in ETL_TIMEZONE, the zone of the incidents' start times, rather than the server's"""
+    return datetime.now(pytz.timezone(get_settings().ETL_TIMEZONE)).date()
+
+
+def stats_is_live(as_of: date) -> bool:
+    """Today's and yesterday's KPIs include the incidents the ETL has not loaded yet"""
+    return get_settings().STATS_LIVE and as_of >= stats_today() - timedelta(days=1)
+
+
+def stats_cache_params(as_of: date, state: Optional[str], city: Optional[str]) -> Dict[str, Any]:
+    params = {"as_of": as_of.isoformat(), "state": state, "city": city}
+    if stats_is_live(as_of):
+        # Live figures are recomputed every STATS_LIVE_TTL_SECONDS instead of once per ETL load
+        params["live"] = int(datetime.now().timestamp() // max(get_settings().STATS_LIVE_TTL_SECONDS, 1))
+    return params
+
+
+async def live_stats_counts(db: WarehouseCursor, as_of: date, state: Optional[str],
+                            city: Optional[str]) -> Optional[pd.DataFrame]:
+    """Counts of the incidents not loaded into the warehouse yet, None when PostgreSQL is not queried or unavailable"""
+    if not stats_is_live(as_of) or DatabaseConnection._instance is None:
+        return None
+    high_water = await read_high_water(db)
+
+    def query() -> pd.DataFrame:
+        session = DatabaseConnection.SessionLocal()
+        try:
+            return fetch_live_counts(session, as_of, high_water, state, city)
+        finally:
+            session.close()
+
+    try:
+        return await asyncio.to_thread(query)
+    except Exception as e:
+        # The KPIs still show everything the warehouse has
+        logging.getLogger(__name__).warning(f"Live incident counts unavailable: {str(e)}")
+        return None
+
+
+async def stats_for(db: WarehouseCursor, as_of: date, state: Optional[str], city: Optional[str]) -> dict:
+    live = await live_stats_counts(db, as_of, state, city)
+    return await compute_stats(db, as_of, state, city, live)
+
+
 @app.get("/chart/stats")
-async def get_stats(db: duckdb.DuckDBPyConnection = Depends(get_dw)): #CURRENT_DATE or '2016-05-25'
+async def get_stats(request: Request,
+                    as_of: Annotated[Optional[date], Query(alias="as_of")] = None,
+                    state: Annotated[Optional[str], Query(alias="state")] = None,
+                    city: Annotated[Optional[str], Query(alias="city")] = None,
+                    db: WarehouseCursor = Depends(get_dw)):
+    """KPI figures for the day `as_of` (YYYY-MM-DD, today when omitted) in the selected state/city"""
+    if city and not state:
+        raise HTTPException(
+            status_code=400,
+            detail="State must be provided if City is specified."
+        )
+    ensure_rollups_built()
+    as_of = as_of or stats_today()
+
+    async def compute() -> bytes:
+        return json.dumps(jsonable_encoder(await stats_for(db, as_of, state, city))).encode()
+
     try:
-        total_counts = db.execute("""
-            SELECT
-                COUNT(*) FILTER (WHERE date_trunc('day', Start_Time) = CAST('2016-05-25' AS DATE)) AS total_accident_today,
-                COUNT(*) FILTER (WHERE date_trunc('day', Start_Time) = CAST('2016-05-25' AS DATE) - INTERVAL '1 day') AS total_yesterday
-            FROM accident;
-        """).df()
-
-        most_accident_city_this_month = db.execute("""
-            SELECT l.City, COUNT(*) as count
-            FROM accident a     
-            JOIN location l ON a.Location_ID = l.Location_ID
-            WHERE date_trunc('month', a.Start_Time) = date_trunc('month', CAST('2016-05-25' AS DATE))
-            GROUP BY l.City
-            ORDER BY count DESC
-            LIMIT 1;
-        """).df()
-
-        least_accident_city_this_month = db.execute("""
-            SELECT l.City, COUNT(*) as count
-            FROM accident a
-            JOIN location l ON a.Location_ID = l.Location_ID
-            WHERE date_trunc('month', a.Start_Time) = date_trunc('month', CAST('2016-05-25' AS DATE))
-            GROUP BY l.City
-            ORDER BY count ASC
-            LIMIT 1;
-        """).df()
-
-        count_each_severity_today = db.execute("""
-            SELECT Severity, COUNT(*) as count
-            FROM accident
-            WHERE date_trunc('day', Start_Time) = CAST('2016-05-25' AS DATE)
-            GROUP BY Severity;
-        """).df()
-        print("total_counts:", total_counts)
-        print("\n")
-        print("most_accident_city_this_month:", most_accident_city_this_month)
-        print("\n")
-        print("least_city_accidents_this_month:", least_accident_city_this_month)
-        print("\n")
-        print("count_each_severity_today:", count_each_severity_today)
-        print("\n")
-        res = {
-            "total_accident_today": total_counts.to_dict(orient="records")[0] if not total_counts.empty else {"count": 0},
-            "most_accident_city": most_accident_city_this_month.to_dict(orient="records")[0] if not most_accident_city_this_month.empty else {"City": "No Data", "count": 0},
-            "least_accident_city": least_accident_city_this_month.to_dict(orient="records")[0] if not least_accident_city_this_month.empty else {"City": "No Data", "count": 0},
-            "count_each_severity_today": count_each_severity_today.to_dict(orient="records") if not count_each_severity_today.empty else [],
-        }
+        return await cached_response(request, stats_cache_params(as_of, state, city), compute)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(e)}"
+        )
 
-        return res
+async def chart_records(query: str, state: Optional[str], city: Optional[str]) -> str:
+    """Run one chart query on its own cursor, so several can run on the warehouse pool at once"""
+    cursor = WarehouseConnection.cursor()
+    try:
+        res = await cursor.execute_df(query, [state, state, city, city])
+        return res.to_json(orient="records")
+    finally:
+        cursor.close()
+
+
+@app.get("/dashboard")
+async def get_dashboard(request: Request,
+                        state: Annotated[Optional[str], Query(alias="state")] = None,
+                        city: Annotated[Optional[str], Query(alias="city")] = None,
+                        charts: Annotated[Optional[str], Query(alias="charts")] = None,
+                        as_of: Annotated[Optional[date], Query(alias="as_of")] = None):
+    """
+    All six chart datasets and the KPI stats in one response: {"charts": {"1": [...], ...}, "stats": {...}}.
+    `charts` (e.g. "1,2,5,6") limits the response to some charts, for clients fetching the others as Arrow.
+    `as_of` is the day of the KPI stats, today when omitted.
+    """
+    if city and not state:
+        raise HTTPException(
+            status_code=400,
+            detail="State must be provided if City is specified."
+        )
+    names = [name.strip() for name in charts.split(",")] if charts else list(CHART_QUERIES)
+    unknown = [name for name in names if name not in CHART_QUERIES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown charts: {', '.join(unknown)}"
+        )
+    ensure_rollups_built()
+    ensure_warehouse_capacity()
+    as_of = as_of or stats_today()
+
+    async def compute() -> bytes:
+        stats_cursor = WarehouseConnection.cursor()
+        try:
+            chart_data, stats = await asyncio.gather(
+                asyncio.gather(*(chart_records(CHART_QUERIES[name], state, city) for name in names)),
+                stats_for(stats_cursor, as_of, state, city),
+            )
+        finally:
+            stats_cursor.close()
+        # The chart records are already JSON, splice them in instead of parsing and re-encoding
+        charts_json = ",".join(f'"{name}":{records}' for name, records in zip(names, chart_data))
+        return f'{{"charts":{{{charts_json}}},"stats":{json.dumps(jsonable_encoder(stats))}}}'.encode()
 
+    try:
+        return await cached_response(
+            request, {**stats_cache_params(as_of, state, city), "charts": ",".join(names)}, compute)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Database error: {str(e)}"
         )
 
+
 @app.get('/count_each_table')
-async def count_table(db: duckdb.DuckDBPyConnection = Depends(get_dw)):
+async def count_table(db: WarehouseCursor = Depends(get_dw)):
     try:
-        accident = db.execute("""SELECT COUNT(*) FROM accident;""").df()
-        environment = db.execute("""SELECT COUNT(*) FROM environment;""").df()
-        location = db.execute("""SELECT COUNT(*) FROM location;""").df()
-        twilight = db.execute("""SELECT COUNT(*) FROM twilight;""").df()
-        weather = db.execute("""SELECT COUNT(*) FROM weather;""").df()
-        wind = db.execute("""SELECT COUNT(*) FROM wind;""").df()
+        accident = await db.execute_df("""SELECT COUNT(*) FROM accident;""")
+        environment = await db.execute_df("""SELECT COUNT(*) FROM environment;""")
+        location = await db.execute_df("""SELECT COUNT(*) FROM location;""")
+        twilight = await db.execute_df("""SELECT COUNT(*) FROM twilight;""")
+        weather = await db.execute_df("""SELECT COUNT(*) FROM weather;""")
+        wind = await db.execute_df("""SELECT COUNT(*) FROM wind;""")
 
         res = {
             "accident": accident.to_dict(orient="records")[0],
@@ -558,142 +1086,285 @@ def create_traffic_accident(accident: TrafficIncidentCreate, db: Session = Depen
 
 ### Prediction API
 import os
-import joblib
-from typing import Any, Optional
-from sklearn.ensemble import RandomForestClassifier
 
 
-class MLModelsLoader:
-    _instance: Optional['MLModelsLoader'] = None
+# FastAPI dependency function to use in route handlers; each request works with one version snapshot
+def get_ml_models() -> ModelVersion:
+    return model_registry.current
 
-    def __new__(cls, models_path: str = "../models"):
-        if not cls._instance:
-            cls._instance = super(MLModelsLoader, cls).__new__(cls)
-            cls._instance._initialize(models_path)
-        return cls._instance
 
-    def _initialize(self, models_path: str):
-        # Construct full paths to the model files
-        binary_encoder_path = os.path.join(models_path, "binary_encoder.joblib")
-        random_forest_path = os.path.join(models_path, "random_forest_model.joblib")
-        scaler_path = os.path.join(models_path, "scaler.joblib")
+def rss_megabytes() -> float:
+    """Resident set size of this worker process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS, but the best portable number available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
-        # Load models with error handling
-        try:
-            self._binary_encoder = joblib.load(binary_encoder_path)
-            self._random_forest_model = joblib.load(random_forest_path)
-            self._scaler = joblib.load(scaler_path)
-        except FileNotFoundError as e:
-            raise FileNotFoundError(f"Model file not found: {e}")
-        except Exception as e:
-            raise RuntimeError(f"Error loading models: {e}")
 
-    def get_binary_encoder(self) -> category_encoders.BinaryEncoder:
-        return self._binary_encoder
+def worker_stats() -> Dict[str, Any]:
+    loaded = model_registry.is_loaded()
+    return {
+        "pid": os.getpid(),
+        "rss_mb": round(rss_megabytes(), 1),
+        "models_loaded": loaded,
+        "models_load_seconds": round(model_registry.current.load_seconds, 3) if loaded else None,
+        "forest_shared": model_registry.current.forest_shared if loaded else None,
+    }
+
+
+def predict_severities(rows: List[PredictAccidentRequest]) -> np.ndarray:
+    """Score a micro-batch of requests; runs on a worker thread"""
+    version = model_registry.current
+    start = perf_counter()
+    severities = version.predict(rows)
+    model_registry.shadow(rows, severities, perf_counter() - start)
+    return severities
+
 
-    def get_random_forest_model(self) -> RandomForestClassifier:
-        return self._random_forest_model
+predict_batcher = MicroBatcher(predict_severities)
 
-    def get_scaler(self) -> MinMaxScaler:
-        return self._scaler
 
+async def warm_up_models(sample: PredictAccidentRequest) -> None:
+    """Load the models and score one row so the first request does not pay for either"""
+    logger = logging.getLogger(__name__)
+    rss_before = rss_megabytes()
+    ml_models = await asyncio.to_thread(lambda: model_registry.current)
+    await asyncio.to_thread(ml_models.predict, [sample])
+    forest = "memory-mapped FlatForest" if ml_models.forest_shared else "private sklearn forest"
+    logger.info(f"Worker {os.getpid()}: models {ml_models.version} ({forest}) loaded in {ml_models.load_seconds:.2f}s, "
+                f"RSS {rss_before:.0f} MB -> {rss_megabytes():.0f} MB")
 
-# FastAPI dependency function to use in route handlers
-def get_ml_models() -> MLModelsLoader:
-    return MLModelsLoader()
 
 @app.post('/predict')
-def predict_accident_severity(data: PredictAccidentRequest, ml_models: MLModelsLoader = Depends(get_ml_models)):
-    basic_info = pd.DataFrame({
-        "Temperature(F)": [data.temperature_f],
-        "Distance(mi)": [data.distance_mi],
-        "Humidity(%)": [data.humidity_percent],
-        "Pressure(in)": [data.pressure_in],
-        "Visibility(mi)": [data.visibility_mi],
-        "Wind_Speed(mph)": [data.wind_speed_mph],
-        "Precipitation(in)": [data.precipitation_in],
-        "Start_Lng": [data.start_lng],
-        "Start_Lat": [data.start_lat],
-    })
-    time_ = pd.DataFrame({
-        "Year": [data.start_time.year],
-        "Month": [data.start_time.month],
-        "Weekday": [data.start_time.weekday()],
-        "Day": [data.start_time.day],
-        "Hour": [data.start_time.hour],
-        "Minute": [data.start_time.minute],
-    })
-    features = ['Temperature(F)', 'Distance(mi)', 'Humidity(%)', 'Pressure(in)', 'Visibility(mi)', 'Wind_Speed(mph)',
-                'Precipitation(in)', 'Start_Lng', 'Start_Lat', 'Year', 'Month', 'Weekday', 'Day', 'Hour', 'Minute']
-    scaler = ml_models.get_scaler()
-    basic_and_time = pd.concat([basic_info, time_], axis=1)
-    basic_and_time[features] = scaler.transform(basic_and_time[features])
-
-    basic_info = basic_and_time[['Start_Lat', 'Start_Lng', 'Distance(mi)', 'Temperature(F)', 'Humidity(%)',
-                                 'Pressure(in)', 'Visibility(mi)', 'Wind_Speed(mph)', 'Precipitation(in)']]
-    time_ = basic_and_time.iloc[:, -6:]
-
-    road = pd.DataFrame({
-        "Amenity": [0],
-        "Bump": [0],
-        "Crossing": [0],
-        "Give_Way": [0],
-        "Junction": [0],
-        "No_Exit": [0],
-        "Railway": [0],
-        "Roundabout": [0],
-        "Station": [0],
-        "Stop": [0],
-        "Traffic_Calming": [0],
-        "Traffic_Signal": [0]
-    })
-
-    wind = pd.DataFrame({
-        "Wind_Direction_E": [0],
-        "Wind_Direction_N": [0],
-        "Wind_Direction_NE": [0],
-        "Wind_Direction_NW": [0],
-        "Wind_Direction_S": [0],
-        "Wind_Direction_SE": [0],
-        "Wind_Direction_SW": [0],
-        "Wind_Direction_Variable": [0],
-        "Wind_Direction_W": [0]
-    })
-
-    for col in wind.columns:
-        if data.wind_direction == col.split('_')[-1]:
-            wind[col] = [1]
-
-
-    weather = pd.DataFrame({
-        "Weather_Condition_Cloudy": [0],
-        "Weather_Condition_Fog": [0],
-        "Weather_Condition_Hail": [0],
-        "Weather_Condition_Rain": [0],
-        "Weather_Condition_Sand": [0],
-        "Weather_Condition_Smoke": [0],
-        "Weather_Condition_Snow": [0],
-        "Weather_Condition_Thunderstorm": [0],
-        "Weather_Condition_Tornado": [0],
-        "Weather_Condition_Windy": [0]
-    })
-    for col in weather.columns:
-        if data.weather_condition == col.split('_')[-1]:
-            weather[col] = [1]
-
-    twilight = pd.DataFrame({
-        "Civil_Twilight_Night": [1 if data.civil_twilight == "Night" else 0]
-    })
-
-    city = pd.DataFrame({
-        "City": [data.city]
-    })
-    binary_enc = ml_models.get_binary_encoder()
-    city = binary_enc.transform(city['City'])
-
-    X = pd.concat([basic_info, road, time_, wind, weather, twilight, city], axis=1)
+async def predict_accident_severity(data: PredictAccidentRequest):
+    try:
+        prediction = await predict_batcher.submit([data])
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many predictions queued, retry shortly"
+        )
+    #return {"severity": int(prediction[0])}
+    return int(prediction[0])
+
+
+@app.get('/predict/metrics')
+async def get_predict_metrics():
+    """Queue depth, batch sizes and wait times of the /predict micro-batcher, plus this worker's memory"""
+    return {**predict_batcher.metrics(), "worker": worker_stats()}
+
+
+@app.get('/models')
+async def get_models_status():
+    """Serving and candidate model versions, with shadow scoring agreement and latency"""
+    return model_registry.status()
+
+
+@app.post('/models/reload')
+async def reload_models():
+    """Load the artifacts on disk now instead of waiting for the directory watcher"""
+    try:
+        version = await asyncio.to_thread(model_registry.load_new_version)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Loading models failed: {str(e)}"
+        )
+    return {"loaded": version.version if version else None, **model_registry.status()}
+
+
+@app.post('/models/promote')
+async def promote_candidate_model():
+    candidate = model_registry.promote()
+    if candidate is None:
+        raise HTTPException(
+            status_code=409,
+            detail="No candidate model version to promote"
+        )
+    return model_registry.status()
+
+
+@app.post('/models/reject')
+async def reject_candidate_model():
+    candidate = model_registry.reject()
+    if candidate is None:
+        raise HTTPException(
+            status_code=409,
+            detail="No candidate model version to reject"
+        )
+    return model_registry.status()
+
+
+@app.post('/predict/batch', response_model=PredictBatchResponse)
+def predict_accident_severity_batch(data: List[PredictAccidentRequest],
+                                    ml_models: ModelVersion = Depends(get_ml_models),
+                                    settings: AppConfig = Depends(get_settings)):
+    if len(data) > settings.PREDICT_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size {len(data)} exceeds the limit of {settings.PREDICT_MAX_BATCH_SIZE} rows"
+        )
+    if not data:
+        return PredictBatchResponse(classes=[], severities=[], probabilities=[])
+
+    X = ml_models.get_feature_encoder().encode_batch(data)
 
     model = ml_models.get_random_forest_model()
-    prediction = model.predict(X)
-    #return {"severity": int(prediction[0])}
-    return int(prediction[0])
\ No newline at end of file
+    # One forest evaluation for the whole batch; predict() is the argmax of predict_proba()
+    probabilities = predict_proba(model, X)
+    severities = model.classes_.take(probabilities.argmax(axis=1))
+    return PredictBatchResponse(
+        classes=model.classes_.tolist(),
+        severities=severities.tolist(),
+        probabilities=probabilities.tolist(),
+    )
+
+
+def geocode_response(result) -> GeocodeResponse:
+    return GeocodeResponse(lat=result.lat, lng=result.lng, source=result.source, cached=result.cached)
+
+
+@app.post('/geocode', response_model=GeocodeResponse)
+async def geocode_address(data: GeocodeRequest, db: WarehouseCursor = Depends(get_dw)):
+    try:
+        result = await geocoder.geocode(db, Address(data.street, data.city, data.county, data.state))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Geocoding error: {str(e)}"
+        )
+    return geocode_response(result)
+
+
+@app.post('/geocode/batch', response_model=List[GeocodeResponse])
+async def geocode_addresses(data: List[GeocodeRequest],
+                            db: WarehouseCursor = Depends(get_dw),
+                            settings: AppConfig = Depends(get_settings)):
+    """
+    Geocode many addresses in request order, e.g. for bulk imports; each distinct address is resolved once.
+    Only GEOCODE_BATCH_MAX_REMOTE addresses are sent to Nominatim, the others not found locally come back
+    with source "none" uncached, to be sent again in a later batch.
+    """
+    if len(data) > settings.GEOCODE_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size {len(data)} exceeds the limit of {settings.GEOCODE_MAX_BATCH_SIZE} addresses"
+        )
+    try:
+        results = await geocoder.geocode_many(
+            db, [Address(row.street, row.city, row.county, row.state) for row in data],
+            max_remote=settings.GEOCODE_BATCH_MAX_REMOTE)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Geocoding error: {str(e)}"
+        )
+    return [geocode_response(result) for result in results]
+
+
+@app.get('/geocode/metrics')
+async def get_geocode_metrics():
+    return geocoder.stats
+
+
+@app.get('/weather')
+async def get_weather(lat: Annotated[float, Query(ge=-90, le=90)],
+                      lon: Annotated[float, Query(ge=-180, le=180)]):
+    """Current weather at (lat, lon) as an OpenWeather response; nearby lookups within 10 minutes share one"""
+    try:
+        return await weather_service.get(lat, lon)
+    except Exception as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Weather provider error: {str(e)}"
+        )
+
+
+@app.get('/weather/metrics')
+async def get_weather_metrics():
+    return weather_service.metrics()
+
+
+def insert_incident(incident: TrafficIncidentCreate) -> bool:
+    """Insert an incident into PostgreSQL on a session of its own; True once committed. Blocking."""
+    session = DatabaseConnection.SessionLocal()
+    try:
+        session.add(TrafficIncident(**incident.model_dump()))
+        session.commit()
+        return True
+    finally:
+        session.close()
+
+
+@app.post('/report', response_model=ReportResponse)
+async def submit_report(data: ReportRequest, db: WarehouseCursor = Depends(get_dw)):
+    """
+    Enrich a report form with its location, weather and daylight flags, then insert it and/or
+    predict its severity, as asked by `insert` and `predict`. Both run concurrently; when the
+    insert succeeds and the prediction fails, the response carries `prediction_error` instead of failing.
+    """
+    timings = {}
+    start = perf_counter()
+    try:
+        incident, geocode_source = await report_enricher.enrich(db, data, timings)
+    except LookupError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"{str(e)}, please check the details and try again"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Report enrichment error: {str(e)}"
+        )
+
+    stages = {}
+    if data.insert:
+        stages["insert"] = asyncio.to_thread(insert_incident, incident)
+    if data.predict:
+        stages["predict"] = predict_batcher.submit([PredictAccidentRequest(**incident.model_dump())])
+    results = await asyncio.gather(
+        *(report_enricher.timed(timings, stage, awaitable) for stage, awaitable in stages.items()),
+        return_exceptions=True)
+    outcome = dict(zip(stages, results))
+
+    inserted = outcome.get("insert") is True
+    if isinstance(outcome.get("insert"), Exception):
+        # Nothing was committed, so the client can safely resubmit
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(outcome['insert'])}"
+        )
+
+    predicted_severity, prediction_error = None, None
+    prediction = outcome.get("predict")
+    if isinstance(prediction, Exception):
+        prediction_error = ("Too many predictions queued, retry shortly" if isinstance(prediction, asyncio.QueueFull)
+                            else f"Prediction error: {str(prediction)}")
+        # Once the incident is stored, failing the call would make the client resubmit and duplicate it
+        if not inserted:
+            raise HTTPException(
+                status_code=503 if isinstance(prediction, asyncio.QueueFull) else 500,
+                detail=prediction_error
+            )
+    elif prediction is not None:
+        predicted_severity = int(prediction[0])
+    timings["total"] = round((perf_counter() - start) * 1000, 3)
+
+    return ReportResponse(
+        incident=incident,
+        inserted=inserted,
+        predicted_severity=predicted_severity,
+        prediction_error=prediction_error,
+        geocode_source=geocode_source,
+        timings_ms=timings,
+    )
+
+
+@app.get('/report/metrics')
+async def get_report_metrics():
+    """Calls and mean latency of each /report stage"""
+    return report_enricher.metrics()
@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import category_encoders
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler
+
+from compiled_forest import FLAT_FOREST_DIR, FlatForest
+from database import PredictAccidentRequest
+from features import CompiledFeatureEncoder, predict_proba
+
+BINARY_ENCODER_FILE = "binary_encoder.joblib"
+RANDOM_FOREST_FILE = "random_forest_model.joblib"
+SCALER_FILE = "scaler.joblib"
+
+# Delay before watching the models directory again after the watcher failed
+WATCH_RETRY_SECONDS = 30
+
+
+def _artifact_files(models_path: str) -> List[str]:
+    files = [os.path.join(models_path, name) for name in (BINARY_ENCODER_FILE, RANDOM_FOREST_FILE, SCALER_FILE)]
+    flat_path = os.path.join(models_path, FLAT_FOREST_DIR)
+    if os.path.isdir(flat_path):
+        files += sorted(os.path.join(flat_path, name) for name in os.listdir(flat_path))
+    return files
+
+
+def fingerprint(models_path: str) -> str:
+    """Identifies the artifacts currently on disk by name, size and modification time"""
+    digest = hashlib.sha1()
+    for path in _artifact_files(models_path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        digest.update(f"{os.path.relpath(path, models_path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+class ModelVersion:
+    """One loaded set of model artifacts: binary encoder, scaler, random forest and the compiled feature encoder"""
+
+    def __init__(self, models_path: str):
+        # Construct full paths to the model files
+        binary_encoder_path = os.path.join(models_path, BINARY_ENCODER_FILE)
+        random_forest_path = os.path.join(models_path, RANDOM_FOREST_FILE)
+        flat_forest_path = os.path.join(models_path, FLAT_FOREST_DIR)
+        scaler_path = os.path.join(models_path, SCALER_FILE)
+
+        self.fingerprint = fingerprint(models_path)
+        newest = max((os.stat(path).st_mtime for path in _artifact_files(models_path) if os.path.exists(path)),
+                     default=0)
+        self.version = f"{datetime.fromtimestamp(newest):%Y%m%d-%H%M%S}-{self.fingerprint[:8]}"
+
+        # Load models with error handling
+        start = perf_counter()
+        try:
+            self._binary_encoder = joblib.load(binary_encoder_path)
+            # The flattened export (python compiled_forest.py) is memory-mapped, so its pages are
+            # shared by every worker through the page cache instead of being copied per process.
+            # It is skipped when the pickled forest was retrained after the export was written.
+            if os.path.isdir(flat_forest_path) and \
+                    os.path.getmtime(os.path.join(flat_forest_path, "forest.json")) >= os.path.getmtime(random_forest_path):
+                self._random_forest_model = FlatForest.load(flat_forest_path)
+            else:
+                # Every worker keeps a private copy of the pickled forest: even when joblib maps an
+                # uncompressed pickle, unpickling a tree copies its node arrays into the tree's own memory
+                self._random_forest_model = joblib.load(random_forest_path)
+            self._scaler = joblib.load(scaler_path)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"Model file not found: {e}")
+        except Exception as e:
+            raise RuntimeError(f"Error loading models: {e}")
+
+        # Built once so a request never touches pandas on its way to the forest
+        self._feature_encoder = CompiledFeatureEncoder(
+            self.get_feature_columns(), self._scaler, self._binary_encoder)
+        self.load_seconds = perf_counter() - start
+        self.loaded_at = datetime.now()
+
+    def get_binary_encoder(self) -> category_encoders.BinaryEncoder:
+        return self._binary_encoder
+
+    def get_random_forest_model(self) -> Union[FlatForest, RandomForestClassifier]:
+        return self._random_forest_model
+
+    def get_scaler(self) -> MinMaxScaler:
+        return self._scaler
+
+    def get_feature_columns(self) -> List[str]:
+        """Feature columns in training order (DW_DSS/scripts/X_train_columns.csv)"""
+        return list(self._random_forest_model.feature_names_in_)
+
+    def get_feature_encoder(self) -> CompiledFeatureEncoder:
+        return self._feature_encoder
+
+    def predict(self, rows: Sequence[PredictAccidentRequest]) -> np.ndarray:
+        """Encode and score requests with this version's encoder and forest"""
+        model = self._random_forest_model
+        probabilities = predict_proba(model, self._feature_encoder.encode_batch(rows))
+        return model.classes_.take(probabilities.argmax(axis=1))
+
+    @property
+    def forest_shared(self) -> bool:
+        """Whether the forest lives in memory-mapped pages shared with the other workers"""
+        return isinstance(self._random_forest_model, FlatForest)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at.isoformat(timespec="seconds"),
+            "load_seconds": round(self.load_seconds, 3),
+            "forest": type(self._random_forest_model).__name__,
+            "forest_shared": self.forest_shared,
+        }
+
+
+class ShadowStats:
+    """Agreement and latency of a candidate version scored against live traffic"""
+
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.agreed = 0
+        self.failures = 0
+        self.dropped = 0
+        self.current_seconds = 0.0
+        self.candidate_seconds = 0.0
+
+    def describe(self) -> Dict[str, Any]:
+        batches = self.batches or 1
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "agreement": self.agreed / self.rows if self.rows else None,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "current_mean_ms": self.current_seconds / batches * 1000,
+            "candidate_mean_ms": self.candidate_seconds / batches * 1000,
+        }
+
+
+class ModelRegistry:
+    """
+    Serves the current model version and picks up retrained artifacts without a restart.
+
+    A background task watches the models directory. Once the files have stopped changing, the
+    new version is loaded on a worker thread while the current one keeps serving, then it is
+    swapped in with a single reference assignment. Callers take one snapshot of `current` per
+    request, so a request never mixes the encoder of one version with the forest of another.
+
+    With a shadow sample rate above zero the new version is held as a candidate instead: a sample
+    of live batches is also scored by it on a separate thread, and its agreement and latency are
+    reported until it is promoted or rejected.
+    """
+
+    def __init__(self, models_path: str = "../models", shadow_sample_rate: float = 0.0,
+                 poll_seconds: float = 5.0, settle_seconds: float = 2.0):
+        self.models_path = models_path
+        self.shadow_sample_rate = shadow_sample_rate
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.logger = logging.getLogger(__name__)
+        self._current: Optional[ModelVersion] = None
+        self._candidate: Optional[ModelVersion] = None
+        self._shadow = ShadowStats()
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow-scoring")
+        # Shadow scoring must never build up a backlog behind live traffic
+        self._shadow_slots = threading.BoundedSemaphore(4)
+        self._load_lock = threading.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._history: List[Dict[str, Any]] = []
+        self._last_error: Optional[str] = None
+
+    def configure(self, models_path: str, shadow_sample_rate: float, poll_seconds: float) -> None:
+        self.models_path = models_path
+        self.shadow_sample_rate = shadow_sample_rate
+        self.poll_seconds = poll_seconds
+
+    @property
+    def current(self) -> ModelVersion:
+        """The serving version, loaded on first use if startup did not load it"""
+        if self._current is None:
+            with self._load_lock:
+                if self._current is None:
+                    self._promote(ModelVersion(self.models_path))
+        return self._current
+
+    @property
+    def candidate(self) -> Optional[ModelVersion]:
+        return self._candidate
+
+    def is_loaded(self) -> bool:
+        return self._current is not None
+
+    def _promote(self, version: ModelVersion) -> None:
+        previous = self._current
+        self._current = version
+        self._history.append({**version.describe(), "promoted_at": datetime.now().isoformat(timespec="seconds")})
+        self._history = self._history[-10:]
+        self.logger.info(f"Serving model version {version.version}"
+                         + (f" (was {previous.version})" if previous else ""))
+
+    def promote(self) -> Optional[ModelVersion]:
+        """Make the shadowed candidate the serving version"""
+        candidate, self._candidate = self._candidate, None
+        if candidate is not None:
+            self._promote(candidate)
+        return candidate
+
+    def reject(self) -> Optional[ModelVersion]:
+        candidate, self._candidate = self._candidate, None
+        if candidate is not None:
+            self.logger.info(f"Rejected candidate model version {candidate.version}")
+        return candidate
+
+    def _is_known(self, on_disk: str) -> bool:
+        return on_disk in {v.fingerprint for v in (self._current, self._candidate) if v is not None}
+
+    def load_new_version(self) -> Optional[ModelVersion]:
+        """Load the artifacts on disk if they differ from the serving and candidate versions. Blocking."""
+        if self._is_known(fingerprint(self.models_path)):
+            return None
+
+        with self._load_lock:
+            # The file watcher and /models/reload may both get here; only the first one loads the version
+            if self._is_known(fingerprint(self.models_path)):
+                return None
+            version = ModelVersion(self.models_path)
+            if self._current is None or self.shadow_sample_rate <= 0:
+                self._promote(version)
+            else:
+                self._candidate = version
+                self._shadow = ShadowStats()
+                self.logger.info(f"Shadow scoring candidate model version {version.version} "
+                                 f"on {self.shadow_sample_rate:.0%} of batches")
+        return version
+
+    def shadow(self, rows: Sequence[PredictAccidentRequest], served: np.ndarray, served_seconds: float) -> None:
+        """Called after a batch was scored by the current version; may score it again with the candidate"""
+        candidate = self._candidate
+        if candidate is None or random.random() >= self.shadow_sample_rate:
+            return
+        if not self._shadow_slots.acquire(blocking=False):
+            self._shadow.dropped += 1
+            return
+        self._shadow_executor.submit(self._score_shadow, candidate, list(rows), served, served_seconds)
+
+    def _score_shadow(self, candidate: ModelVersion, rows: List[PredictAccidentRequest],
+                      served: np.ndarray, served_seconds: float) -> None:
+        stats = self._shadow
+        try:
+            start = perf_counter()
+            shadowed = candidate.predict(rows)
+            elapsed = perf_counter() - start
+            if candidate is not self._candidate:
+                return
+            stats.batches += 1
+            stats.rows += len(rows)
+            stats.agreed += int(np.count_nonzero(shadowed == served))
+            stats.current_seconds += served_seconds
+            stats.candidate_seconds += elapsed
+        except Exception as e:
+            stats.failures += 1
+            self.logger.error(f"Shadow scoring with {candidate.version} failed: {str(e)}")
+        finally:
+            self._shadow_slots.release()
+
+    async def _check_for_new_version(self) -> None:
+        before = fingerprint(self.models_path)
+        if self._is_known(before):
+            return
+        # Training writes the artifacts one after another; wait until they stop changing
+        await asyncio.sleep(self.settle_seconds)
+        if fingerprint(self.models_path) != before:
+            return
+        try:
+            await asyncio.to_thread(self.load_new_version)
+            self._last_error = None
+        except Exception as e:
+            # Keep serving the current version, the next change on disk triggers another attempt
+            self._last_error = str(e)
+            self.logger.error(f"Loading new model version failed: {str(e)}")
+
+    async def _watch(self) -> None:
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            awatch = None
+
+        if awatch is None:
+            while True:
+                await asyncio.sleep(self.poll_seconds)
+                await self._check_for_new_version()
+        else:
+            failing = False
+            while True:
+                try:
+                    async for _ in awatch(self.models_path, recursive=True):
+                        await self._check_for_new_version()
+                except Exception as e:
+                    # e.g. the models directory does not exist (yet); keep retrying instead of ending the watcher
+                    if not failing:
+                        self.logger.error(f"Watching {self.models_path} failed, retrying every "
+                                          f"{WATCH_RETRY_SECONDS}s: {str(e)}")
+                    failing = True
+                    await asyncio.sleep(WATCH_RETRY_SECONDS)
+                    if os.path.isdir(self.models_path):
+                        # Artifacts written while nothing was watching would otherwise go unnoticed
+                        await self._check_for_new_version()
+                    continue
+                failing = False
+
+    def start(self) -> None:
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+            self.logger.info(f"Watching {self.models_path} for new model versions")
+
+    async def stop(self) -> None:
+        if self._watch_task and not self._watch_task.done():
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+        self._watch_task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "models_path": self.models_path,
+            "watching": self._watch_task is not None and not self._watch_task.done(),
+            "current": self._current.describe() if self._current else None,
+            "candidate": self._candidate.describe() if self._candidate else None,
+            "shadow_sample_rate": self.shadow_sample_rate,
+            "shadow": self._shadow.describe() if self._candidate else None,
+            "last_error": self._last_error,
+            "history": self._history,
+        }
@@ -1,17 +1,207 @@
+import time
+
 import duckdb
 
+from clustering import require_location_columns
+from rollups import refresh_rollups
+from twilight import fill_missing_twilight
+
+# Only the columns the warehouse uses are pulled from PostgreSQL (no description text)
+STAGED_COLUMNS = """
+    severity, start_time, end_time, start_lat, start_lng, end_lat, end_lng, distance_mi,
+    street, city, county, state,
+    weather_timestamp, temperature_f, humidity_percent, visibility_mi, wind_direction, wind_speed_mph,
+    precipitation_in, weather_condition,
+    amenity, bump, crossing, give_way, junction, no_exit, railway, roundabout, station, stop,
+    traffic_calming, traffic_signal, turning_loop,
+    sunrise_sunset, civil_twilight, nautical_twilight, astronomical_twilight
+"""
+
+# Approximate payload of the staged rows: 13 numeric/timestamp columns, severity and 13 flags
+# are fixed width, text and enum columns count their length
+STAGED_SIZE = """
+SELECT
+    count(*),
+    coalesce(sum(
+        13 * 8 + 4 + 13
+        + octet_length(coalesce(street, '')) + octet_length(coalesce(city, ''))
+        + octet_length(coalesce(county, '')) + octet_length(coalesce(CAST(state AS VARCHAR), ''))
+        + octet_length(coalesce(CAST(wind_direction AS VARCHAR), ''))
+        + octet_length(coalesce(CAST(weather_condition AS VARCHAR), ''))
+        + octet_length(coalesce(CAST(sunrise_sunset AS VARCHAR), ''))
+        + octet_length(coalesce(CAST(civil_twilight AS VARCHAR), ''))
+        + octet_length(coalesce(CAST(nautical_twilight AS VARCHAR), ''))
+        + octet_length(coalesce(CAST(astronomical_twilight AS VARCHAR), ''))
+    ), 0)
+FROM staged_incidents;
+"""
+
+# noinspection SqlNoDataSourceInspection
+CREATE_DIMENSION_INDEXES = """
+-- First create UNIQUE constraints/indexes for the tables
+CREATE UNIQUE INDEX IF NOT EXISTS idx_environment_unique ON environment (
+    amenity, bump, crossing, give_way, junction, no_exit, railway, roundabout,
+    station, stop, traffic_calming, traffic_signal, turning_loop
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_twilight_unique ON twilight (
+    sunrise_sunset, civil_twilight, nautical_twilight, astronomical_twilight
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_unique ON weather (weather_condition);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_wind_unique ON wind (wind_direction);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_location_unique ON location (street, city, county, state);
+"""
+
+# Dimension members that are not in the warehouse yet are inserted in bulk from the staged incidents.
+# NOT EXISTS is planned as a hash anti-join; IS NOT DISTINCT FROM keeps NULL members from being duplicated.
+# noinspection SqlNoDataSourceInspection
+LOAD_DIMENSIONS = """
+-- Insert into environment
+INSERT INTO environment (
+    Environment_ID, Amenity, Bump, Crossing, Give_Way, Junction, No_Exit, Railway, Roundabout,
+    Station, Stop, Traffic_Calming, Traffic_Signal, Turning_Loop
+)
+SELECT nextval('seq_environment_id'), s.*
+FROM (
+    SELECT DISTINCT
+        amenity, bump, crossing, give_way, junction, no_exit, railway, roundabout,
+        station, stop, traffic_calming, traffic_signal, turning_loop
+    FROM staged_incidents
+) s
+WHERE NOT EXISTS (
+    SELECT 1 FROM environment e
+    WHERE e.Amenity IS NOT DISTINCT FROM s.amenity AND e.Bump IS NOT DISTINCT FROM s.bump
+        AND e.Crossing IS NOT DISTINCT FROM s.crossing AND e.Give_Way IS NOT DISTINCT FROM s.give_way
+        AND e.Junction IS NOT DISTINCT FROM s.junction AND e.No_Exit IS NOT DISTINCT FROM s.no_exit
+        AND e.Railway IS NOT DISTINCT FROM s.railway AND e.Roundabout IS NOT DISTINCT FROM s.roundabout
+        AND e.Station IS NOT DISTINCT FROM s.station AND e.Stop IS NOT DISTINCT FROM s.stop
+        AND e.Traffic_Calming IS NOT DISTINCT FROM s.traffic_calming
+        AND e.Traffic_Signal IS NOT DISTINCT FROM s.traffic_signal
+        AND e.Turning_Loop IS NOT DISTINCT FROM s.turning_loop
+);
+
+-- Insert into twilight
+INSERT INTO twilight (
+    Twilight_ID, Sunrise_Sunset, Civil_Twilight, Nautical_Twilight, Astronomical_Twilight
+)
+SELECT nextval('seq_twilight_id'), s.*
+FROM (
+    SELECT DISTINCT sunrise_sunset, civil_twilight, nautical_twilight, astronomical_twilight
+    FROM staged_incidents
+) s
+WHERE NOT EXISTS (
+    SELECT 1 FROM twilight tw
+    WHERE tw.Sunrise_Sunset IS NOT DISTINCT FROM s.sunrise_sunset
+        AND tw.Civil_Twilight IS NOT DISTINCT FROM s.civil_twilight
+        AND tw.Nautical_Twilight IS NOT DISTINCT FROM s.nautical_twilight
+        AND tw.Astronomical_Twilight IS NOT DISTINCT FROM s.astronomical_twilight
+);
+
+-- Insert into weather
+INSERT INTO weather (Weather_Condition_ID, Weather_Condition)
+SELECT nextval('seq_weather_id'), s.weather_condition
+FROM (SELECT DISTINCT weather_condition FROM staged_incidents) s
+WHERE NOT EXISTS (
+    SELECT 1 FROM weather w WHERE w.Weather_Condition IS NOT DISTINCT FROM s.weather_condition
+);
+
+-- Insert into wind
+INSERT INTO wind (Wind_Direction_ID, Wind_Direction)
+SELECT nextval('seq_wind_id'), s.wind_direction
+FROM (SELECT DISTINCT wind_direction FROM staged_incidents) s
+WHERE NOT EXISTS (
+    SELECT 1 FROM wind wd WHERE wd.Wind_Direction IS NOT DISTINCT FROM s.wind_direction
+);
+
+-- Insert into location
+INSERT INTO location (Location_ID, Street, City, County, State)
+SELECT nextval('seq_location_id'), s.*
+FROM (SELECT DISTINCT street, city, county, state FROM staged_incidents) s
+WHERE NOT EXISTS (
+    SELECT 1 FROM location l
+    WHERE l.Street IS NOT DISTINCT FROM s.street AND l.City IS NOT DISTINCT FROM s.city
+        AND l.County IS NOT DISTINCT FROM s.county AND l.State IS NOT DISTINCT FROM s.state
+);
+"""
+
+# Surrogate keys are resolved with one hash join per dimension instead of a lookup per row.
+# Appended rows are sorted like the clustered table (clustering.CLUSTER_ORDER), so new row groups
+# keep tight State and Start_Time statistics.
+# noinspection SqlNoDataSourceInspection
+LOAD_ACCIDENTS = """
+-- Insert into accident
+INSERT INTO accident (
+    Accident_ID, Severity, Start_Time, End_Time, Start_Lat, Start_Lng, End_Lat, End_Lng,
+    Distance_mi, Weather_Timestamp, Temperature_F, Humidity_percent, Wind_Speed_mph,
+    Precipitation_in, Visibility_mi, Location_ID, Environment_ID, Twilight_ID,
+    Weather_Condition_ID, Wind_Direction_ID, State, City
+)
+SELECT
+    nextval('seq_accident_id'),
+    t.severity,
+    t.start_time,
+    t.end_time,
+    t.start_lat,
+    t.start_lng,
+    t.end_lat,
+    t.end_lng,
+    t.distance_mi,
+    t.weather_timestamp,
+    t.temperature_f,
+    t.humidity_percent,
+    t.wind_speed_mph,
+    t.precipitation_in,
+    t.visibility_mi,
+    l.Location_ID,
+    e.Environment_ID,
+    tw.Twilight_ID,
+    w.Weather_Condition_ID,
+    wd.Wind_Direction_ID,
+    t.state,
+    t.city
+FROM staged_incidents t
+LEFT JOIN location l
+    ON l.Street IS NOT DISTINCT FROM t.street AND l.City IS NOT DISTINCT FROM t.city
+    AND l.County IS NOT DISTINCT FROM t.county AND l.State IS NOT DISTINCT FROM t.state
+LEFT JOIN environment e
+    ON e.Amenity IS NOT DISTINCT FROM t.amenity AND e.Bump IS NOT DISTINCT FROM t.bump
+    AND e.Crossing IS NOT DISTINCT FROM t.crossing AND e.Give_Way IS NOT DISTINCT FROM t.give_way
+    AND e.Junction IS NOT DISTINCT FROM t.junction AND e.No_Exit IS NOT DISTINCT FROM t.no_exit
+    AND e.Railway IS NOT DISTINCT FROM t.railway AND e.Roundabout IS NOT DISTINCT FROM t.roundabout
+    AND e.Station IS NOT DISTINCT FROM t.station AND e.Stop IS NOT DISTINCT FROM t.stop
+    AND e.Traffic_Calming IS NOT DISTINCT FROM t.traffic_calming
+    AND e.Traffic_Signal IS NOT DISTINCT FROM t.traffic_signal
+    AND e.Turning_Loop IS NOT DISTINCT FROM t.turning_loop
+LEFT JOIN twilight tw
+    ON tw.Sunrise_Sunset IS NOT DISTINCT FROM t.sunrise_sunset
+    AND tw.Civil_Twilight IS NOT DISTINCT FROM t.civil_twilight
+    AND tw.Nautical_Twilight IS NOT DISTINCT FROM t.nautical_twilight
+    AND tw.Astronomical_Twilight IS NOT DISTINCT FROM t.astronomical_twilight
+LEFT JOIN weather w ON w.Weather_Condition IS NOT DISTINCT FROM t.weather_condition
+LEFT JOIN wind wd ON wd.Wind_Direction IS NOT DISTINCT FROM t.wind_direction
+ORDER BY t.state, t.start_time;
+"""
+
 
 class DuckDBPostgresETL:
-    def __init__(self, duckdb_path, postgres_config, logger):
+    def __init__(self, duckdb_path, postgres_config, logger, watermark_lag_seconds=300, timezone="UTC"):
         """
         Initialize ETL process
         duckdb_path: Path to DuckDB file
         postgres_config: Dict with host, port, database, user, password
+        watermark_lag_seconds: Rows created more recently than this are left for the next run,
+            so transactions still in flight in PostgreSQL are not skipped
+        timezone: Zone of the incidents' naive start times, used to compute missing twilight flags
         """
         self.duckdb_path = duckdb_path
         self.postgres_config = postgres_config
         self.conn = None
         self.logger = logger
+        self.watermark_lag_seconds = watermark_lag_seconds
+        self.timezone = timezone
 
     def setup_connection(self):
         """Setup DuckDB connection and load PostgreSQL extension"""
@@ -37,126 +227,88 @@ class DuckDBPostgresETL:
         if self.conn:
             self.conn.close()
 
+    def get_extract_window(self):
+        """
+        Return the (low, high] created_at range of traffic incidents to load.
+        low is the persisted high-water mark of the previous run, high is the PostgreSQL
+        clock minus the configured lag. The first run starts at the beginning of the current day.
+        The load is insert-only: rows updated after they were loaded (updated_at) are not extracted again.
+        """
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS etl_watermark (
+                Source_Table VARCHAR PRIMARY KEY,
+                High_Water TIMESTAMP,
+                Updated_At TIMESTAMP
+            );
+        """)
+        # Use the PostgreSQL clock, created_at is filled in by the PostgreSQL server
+        high, start_of_day = self.conn.execute(f"""
+            SELECT * FROM postgres_query('postgres_db', 
+                'SELECT localtimestamp - interval ''{int(self.watermark_lag_seconds)} seconds'', 
+                        date_trunc(''day'', localtimestamp)')
+        """).fetchone()
+        row = self.conn.execute(
+            "SELECT High_Water FROM etl_watermark WHERE Source_Table = 'traffic_incidents'").fetchone()
+        low = row[0] if row else start_of_day
+        return low, max(low, high)
+
+    def _run_phase(self, timings, phase, sql):
+        """Execute one step of the ETL and record how long it took"""
+        start = time.perf_counter()
+        result = self.conn.execute(sql)
+        timings[phase] = time.perf_counter() - start
+        return result
+
     def run_daily_etl(self):
         """
-        Run ETL process for configured tables
-        table_configs: List of dicts with source_table and target_table
+        Load the traffic incidents created since the last successful run.
+        Runs that were missed are caught up automatically, since the window always starts at the
+        persisted high-water mark.
+        Returns the number of extracted rows, their approximate size and the per-phase timings.
         """
+        timings = {}
         try:
+            start = time.perf_counter()
             self.setup_connection()
+            self.conn.execute("BEGIN TRANSACTION;")
+            low, high = self.get_extract_window()
+            timings["connect"] = time.perf_counter() - start
+
+            # Sargable range on created_at, pushed down to PostgreSQL and served by idx_created_at
+            window = f"created_at > TIMESTAMP '{low.isoformat(sep=' ')}' AND created_at <= TIMESTAMP '{high.isoformat(sep=' ')}'"
 
-            self.logger.info("Starting ETL")
+            self.logger.info(f"Starting ETL for traffic incidents created in ({low}, {high}]")
 
             # noinspection SqlNoDataSourceInspection
             # noinspection SqlDialectInspection
+            self._run_phase(timings, "indexes", CREATE_DIMENSION_INDEXES)
+            require_location_columns(self.conn)
+
+            # Pull the new incidents from PostgreSQL in a single scan, everything below runs locally
+            self._run_phase(timings, "extract", f"""
+                CREATE OR REPLACE TEMP TABLE staged_incidents AS
+                SELECT {STAGED_COLUMNS}
+                FROM postgres_db.public.traffic_incidents
+                WHERE {window};
+            """)
+            rows, size = self.conn.execute(STAGED_SIZE).fetchone()
+
+            # Incidents entered without day/night flags get them computed before the dimension lookup
+            start = time.perf_counter()
+            fill_missing_twilight(self.conn, "staged_incidents", self.timezone, self.logger)
+            timings["twilight"] = time.perf_counter() - start
+
             # Insert new data
-            self.conn.execute(f"""
-            BEGIN TRANSACTION;
-            
-            -- First create UNIQUE constraints/indexes for the tables
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_environment_unique ON environment (
-                amenity, bump, crossing, give_way, junction, no_exit, railway, roundabout,
-                station, stop, traffic_calming, traffic_signal, turning_loop
-            );
-            
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_twilight_unique ON twilight (
-                sunrise_sunset, civil_twilight, nautical_twilight, astronomical_twilight
-            );
-            
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_unique ON weather (weather_condition);
-            
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_wind_unique ON wind (wind_direction);
-            
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_location_unique ON location (street, city, county, state);
-            
-
-            -- Insert into environment
-            INSERT INTO environment (
-                Environment_ID, Amenity, Bump, Crossing, Give_Way, Junction, No_Exit, Railway, Roundabout,
-                Station, Stop, Traffic_Calming, Traffic_Signal, Turning_Loop
-            )
-            SELECT DISTINCT
-                nextval('seq_environment_id'),
-                amenity, bump, crossing, give_way, junction, no_exit, railway, roundabout,
-                station, stop, traffic_calming, traffic_signal, turning_loop
-            FROM postgres_db.public.traffic_incidents
-            WHERE date_trunc('day', end_time) == current_date
-            ON CONFLICT (amenity, bump, crossing, give_way, junction, no_exit, railway, roundabout,
-                         station, stop, traffic_calming, traffic_signal, turning_loop) DO NOTHING;
-            
-            -- Insert into twilight
-            INSERT INTO twilight (
-                "Twilight_ID", "Sunrise_Sunset", "Civil_Twilight", "Nautical_Twilight", "Astronomical_Twilight"
-            )
-            SELECT DISTINCT
-                nextval('seq_twilight_id'),
-                sunrise_sunset, civil_twilight, nautical_twilight, astronomical_twilight
-            FROM postgres_db.public.traffic_incidents
-            WHERE date_trunc('day', end_time) == current_date
-            ON CONFLICT (sunrise_sunset, civil_twilight, nautical_twilight, astronomical_twilight) DO NOTHING;
-            
-            -- Insert into weather
-            INSERT INTO weather (Weather_Condition_ID, Weather_Condition)
-            SELECT DISTINCT
-                nextval('seq_weather_id'),
-                weather_condition
-            FROM postgres_db.public.traffic_incidents
-            WHERE date_trunc('day', end_time) == current_date
-            ON CONFLICT (weather_condition) DO NOTHING;
-            
-            -- Insert into wind
-            INSERT INTO wind (Wind_Direction_ID, Wind_Direction)
-            SELECT DISTINCT
-                nextval('seq_wind_id'),
-                wind_direction
-            FROM postgres_db.public.traffic_incidents
-            WHERE date_trunc('day', end_time) == current_date
-            ON CONFLICT (wind_direction) DO NOTHING;
-            
-            -- Insert into location
-            INSERT INTO location (Location_ID, Street, City, County, State)
-            SELECT DISTINCT
-                nextval('seq_location_id'),
-                street, city, county, state
-            FROM postgres_db.public.traffic_incidents
-            WHERE date_trunc('day', end_time) == current_date
-            ON CONFLICT (street, city, county, state) DO NOTHING;
-
-            -- Insert into accident
-            INSERT INTO accident (
-                Accident_ID, Severity, Start_Time, End_Time, Start_Lat, Start_Lng, End_Lat, End_Lng,
-                Distance_mi, Weather_Timestamp, Temperature_F, Humidity_percent, Wind_Speed_mph,
-                Precipitation_in, Visibility_mi, Location_ID, Environment_ID, Twilight_ID,
-                Weather_Condition_ID, Wind_Direction_ID
-            )
-            SELECT
-                nextval('seq_accident_id'),
-                severity,
-                start_time,
-                end_time,
-                start_lat,
-                start_lng,
-                end_lat,
-                end_lng,
-                distance_mi,
-                weather_timestamp,
-                temperature_f,
-                humidity_percent,
-                wind_speed_mph,
-                precipitation_in,
-                visibility_mi,
-                (SELECT id FROM location WHERE street = t.street AND city = t.city AND county = t.county AND state = t.state),
-                (SELECT id FROM environment WHERE amenity = t.amenity AND bump = t.bump AND crossing = t.crossing AND give_way = t.give_way
-                    AND junction = t.junction AND no_exit = t.no_exit AND railway = t.railway AND roundabout = t.roundabout
-                    AND station = t.station AND stop = t.stop AND traffic_calming = t.traffic_calming AND traffic_signal = t.traffic_signal
-                    AND turning_loop = t.turning_loop),
-                (SELECT id FROM twilight WHERE sunrise_sunset = t.sunrise_sunset AND civil_twilight = t.civil_twilight
-                    AND nautical_twilight = t.nautical_twilight AND astronomical_twilight = t.astronomical_twilight),
-                (SELECT id FROM weather WHERE weather_condition = t.weather_condition),
-                (SELECT id FROM wind WHERE wind_direction = t.wind_direction)
-            FROM postgres_db.public.traffic_incidents t
-            WHERE date_trunc('day', end_time) == current_date;
-            COMMIT;
+            self._run_phase(timings, "dimensions", LOAD_DIMENSIONS)
+            self._run_phase(timings, "accidents", LOAD_ACCIDENTS)
+
+            # Advance the high-water mark in the same transaction as the load
+            self._run_phase(timings, "commit", f"""
+                INSERT INTO etl_watermark VALUES ('traffic_incidents', TIMESTAMP '{high.isoformat(sep=' ')}', current_timestamp)
+                ON CONFLICT (Source_Table) DO UPDATE SET
+                    High_Water = excluded.High_Water,
+                    Updated_At = excluded.Updated_At;
+                COMMIT;
             """)
             self.logger.info("ETL process completed")
 
@@ -164,5 +316,14 @@ class DuckDBPostgresETL:
             self.logger.error(f"ETL process failed: {str(e)}")
             self.conn.execute("ROLLBACK")
             raise
+        else:
+            # Fold the newly loaded accidents into the chart rollups
+            start = time.perf_counter()
+            refresh_rollups(self.conn, self.logger)
+            timings["rollups"] = time.perf_counter() - start
+
+            phases = ", ".join(f"{phase}={seconds:.2f}s" for phase, seconds in timings.items())
+            self.logger.info(f"ETL extracted {rows} rows (~{size / 1024:.1f} KiB transferred), {phases}")
+            return {"rows": rows, "bytes": size, "timings": timings}
         finally:
             self.close()
\ No newline at end of file
@@ -0,0 +1,124 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, Dict, Optional, Tuple
+
+from database import ReportRequest, TrafficIncidentCreate
+from geocoding import Address, Geocoder
+from twilight import daylight_fields
+from weather import WeatherService
+
+# OpenWeather "main" conditions that are named differently in WeatherConditionEnum
+WEATHER_CONDITIONS = {
+    "Clouds": "Cloudy",
+    "Drizzle": "Rain",
+    "Mist": "Fog",
+    "Haze": "Fog",
+    "Dust": "Sand",
+    "Ash": "Sand",
+    "Squall": "Windy",
+}
+
+# Wind below CALM_MPH is "Calm", above VARIABLE_MPH "Variable", in between the compass point
+CALM_MPH = 1.11846815
+VARIABLE_MPH = 6.90467669
+COMPASS_POINTS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+
+
+def wind_direction(degrees: Optional[float], speed_mph: Optional[float]) -> str:
+    if speed_mph is None or speed_mph < CALM_MPH:
+        return "Calm"
+    if speed_mph > VARIABLE_MPH or degrees is None:
+        return "Variable"
+    return COMPASS_POINTS[int(((degrees % 360) + 22.5) // 45) % 8]
+
+
+def weather_fields(weather: Dict[str, Any], observed_at: datetime) -> Dict[str, Any]:
+    """TrafficIncidentCreate weather fields of an OpenWeather response, in the dataset's US units"""
+    main = weather.get("main", {})
+    wind = weather.get("wind", {})
+    condition = (weather.get("weather") or [{}])[0].get("main", "Clear")
+
+    def converted(value, convert):
+        return round(convert(value), 2) if value is not None else None
+
+    wind_speed_mph = converted(wind.get("speed"), lambda ms: ms * 2.23694)
+    return {
+        "weather_timestamp": observed_at,
+        "temperature_f": converted(main.get("temp"), lambda k: (k - 273.15) * 9 / 5 + 32),
+        "humidity_percent": main.get("humidity"),
+        "pressure_in": converted(main.get("pressure"), lambda hpa: hpa * 0.02953),
+        "visibility_mi": converted(weather.get("visibility"), lambda m: m / 1609.34),
+        "wind_direction": wind_direction(wind.get("deg"), wind_speed_mph),
+        "wind_speed_mph": wind_speed_mph,
+        "precipitation_in": weather.get("rain", {}).get("1h", 0),
+        "weather_condition": WEATHER_CONDITIONS.get(condition, condition),
+    }
+
+
+class ReportEnricher:
+    """
+    Turns a report form into a TrafficIncidentCreate: geocodes the address, then looks up the
+    weather and computes the daylight flags at that point concurrently. Every stage is cached
+    (the geocoder's cache, the weather buckets, the twilight boundaries per city-day) and timed.
+    """
+
+    def __init__(self, geocoder: Geocoder, weather_service: WeatherService):
+        self.geocoder = geocoder
+        self.weather_service = weather_service
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.seconds: Dict[str, float] = defaultdict(float)
+
+    async def timed(self, timings: Dict[str, float], stage: str, awaitable):
+        start = perf_counter()
+        try:
+            return await awaitable
+        finally:
+            elapsed = perf_counter() - start
+            timings[stage] = round(elapsed * 1000, 3)
+            self.calls[stage] += 1
+            self.seconds[stage] += elapsed
+
+    async def enrich(self, db, report: ReportRequest,
+                     timings: Dict[str, float]) -> Tuple[TrafficIncidentCreate, str]:
+        """
+        The incident to insert or score and the geocoding source. `db` is a WarehouseCursor;
+        raises LookupError when the address cannot be located.
+        """
+        start_time = report.start_time or datetime.now()
+        location = await self.timed(timings, "geocode", self.geocoder.geocode(
+            db, Address(report.street, report.city, report.county, report.state)))
+        if not location.found:
+            raise LookupError("Address not found")
+
+        weather, daylight = await asyncio.gather(
+            self.timed(timings, "weather", self.weather_service.get(location.lat, location.lng)),
+            self.timed(timings, "daylight", asyncio.to_thread(
+                daylight_fields, location.lat, location.lng, start_time)),
+        )
+
+        incident = TrafficIncidentCreate(
+            severity=report.severity,
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=report.duration_minutes),
+            start_lat=location.lat,
+            start_lng=location.lng,
+            description=report.description,
+            street=report.street,
+            city=report.city,
+            county=report.county,
+            state=report.state,
+            **weather_fields(weather, start_time),
+            **daylight,
+            **report.model_dump(include={
+                "amenity", "bump", "crossing", "give_way", "junction", "no_exit", "railway", "roundabout",
+                "station", "stop", "traffic_calming", "traffic_signal", "turning_loop"}),
+        )
+        return incident, location.source
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            stage: {"calls": calls, "mean_ms": round(self.seconds[stage] / calls * 1000, 3)}
+            for stage, calls in self.calls.items()
+        }
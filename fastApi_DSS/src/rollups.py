@@ -0,0 +1,176 @@
+import duckdb
+
+from tiles import TILE_ZOOM_LEVELS, tile_x_sql, tile_y_sql
+
+# Rollups are keyed by (Month_Start, State, City, Severity) plus the chart's extra dimension,
+# or by (Day, State, City, Severity) for daily rollups, unless they name their own "keys".
+# Each refresh appends the aggregate of the accidents loaded since the previous refresh,
+# so readers always SUM(count) over the matching keys.
+ROLLUPS = {
+    # /chart/stats KPIs
+    "daily_summary": {
+        "period": "day",
+        "columns": "",
+        "select": "",
+        "joins": "",
+    },
+    # /chart/1
+    "monthly_severity_rollup": {
+        "columns": "",
+        "select": "",
+        "joins": "",
+    },
+    # /chart/2
+    "monthly_weather_rollup": {
+        "columns": "Weather_Condition VARCHAR,",
+        "select": "w.Weather_Condition,",
+        "joins": "JOIN weather w ON a.Weather_Condition_ID = w.Weather_Condition_ID",
+    },
+    # /chart/3
+    "monthly_density_rollup": {
+        "columns": "grid_lat DECIMAL(10, 2), grid_lng DECIMAL(10, 2),",
+        "select": "ROUND(a.Start_Lat, 2), ROUND(a.Start_Lng, 2),",
+        "joins": "",
+        "where": "AND a.Start_Lat IS NOT NULL AND a.Start_Lng IS NOT NULL",
+    },
+    # /chart/4
+    "monthly_grid_severity_rollup": {
+        "columns": "grid_lat DECIMAL(10, 1), grid_lng DECIMAL(10, 1),",
+        "select": "ROUND(a.Start_Lat, 1), ROUND(a.Start_Lng, 1),",
+        "joins": "",
+        "where": "AND a.Start_Lat IS NOT NULL AND a.Start_Lng IS NOT NULL",
+    },
+    # /chart/tiles: the spatial pyramid, one row per tile at every level of TILE_ZOOM_LEVELS.
+    # The coordinate sums give the centroid of the accidents in a tile.
+    "monthly_tile_rollup": {
+        "columns": "Zoom TINYINT, Tile_X INTEGER, Tile_Y INTEGER, lat_sum DOUBLE, lng_sum DOUBLE,",
+        "select": f"z.Zoom, {tile_x_sql('a.Start_Lng', 'z.Zoom')}, {tile_y_sql('a.Start_Lat', 'z.Zoom')}, "
+                  "SUM(a.Start_Lat), SUM(a.Start_Lng),",
+        "joins": f"CROSS JOIN (SELECT unnest({list(TILE_ZOOM_LEVELS)}) AS Zoom) z",
+        "where": "AND a.Start_Lat IS NOT NULL AND a.Start_Lng IS NOT NULL",
+    },
+    # /chart/6
+    "monthly_hour_rollup": {
+        "columns": "Hour INTEGER,",
+        "select": "date_part('hour', a.Start_Time),",
+        "joins": "",
+    },
+    # Report geocoding: the centroid of the accidents on each street, from the coordinate sums
+    "street_rollup": {
+        "keys": ("State CHAR(2), City VARCHAR,", "l.State, l.City,"),
+        "columns": "Street VARCHAR, lat_sum DOUBLE, lng_sum DOUBLE,",
+        "select": "l.Street, SUM(a.Start_Lat), SUM(a.Start_Lng),",
+        "joins": "JOIN location l ON a.Location_ID = l.Location_ID",
+        "where": "AND a.Start_Lat IS NOT NULL AND a.Start_Lng IS NOT NULL AND l.Street IS NOT NULL",
+    },
+}
+
+
+def _keys(spec: dict):
+    """(column definitions, select expressions) of the keys every row of the rollup is grouped by"""
+    if "keys" in spec:
+        return spec["keys"]
+    period = spec.get("period", "month")
+    return (f"{'Day' if period == 'day' else 'Month_Start'} DATE, State CHAR(2), City VARCHAR, Severity INTEGER,",
+            f"CAST(date_trunc('{period}', a.Start_Time) AS DATE), a.State, a.City, a.Severity,")
+
+
+def create_rollup_tables(conn: duckdb.DuckDBPyConnection) -> None:
+    """Create the rollup tables and their refresh state if they do not exist yet"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            Name VARCHAR PRIMARY KEY,
+            Last_Accident_ID BIGINT,
+            Refreshed_At TIMESTAMP
+        );
+    """)
+    for table, spec in ROLLUPS.items():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {_keys(spec)[0]}
+                {spec["columns"]}
+                count BIGINT
+            );
+        """)
+
+
+def _roll_up(conn: duckdb.DuckDBPyConnection, table: str, last_id: int, upper_id: int) -> None:
+    spec = ROLLUPS[table]
+    conn.execute(f"""
+        INSERT INTO {table}
+        SELECT
+            {_keys(spec)[1]}
+            {spec["select"]}
+            COUNT(*)
+        FROM accident a
+        {spec["joins"]}
+        WHERE a.Accident_ID > ? AND a.Accident_ID <= ?
+        {spec.get("where", "")}
+        GROUP BY ALL;
+    """, [last_id, upper_id])
+
+
+def rollups_built(conn: duckdb.DuckDBPyConnection) -> bool:
+    """Whether every rollup table exists, i.e. a refresh has built them from the full history"""
+    tables = {row[0] for row in conn.execute(
+        "SELECT table_name FROM duckdb_tables() WHERE schema_name = current_schema()").fetchall()}
+    return {"rollup_state", *ROLLUPS} <= tables
+
+
+def refresh_rollups(conn: duckdb.DuckDBPyConnection, logger) -> int:
+    """
+    Bring every rollup up to date with the accident table.
+    The first call builds the rollups from the full history, later calls only
+    aggregate accidents with an Accident_ID above the stored watermark.
+    A rollup added after the first refresh is backfilled up to the watermark first.
+    Returns the number of accidents that were rolled up.
+    """
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        existing = {row[0] for row in conn.execute(
+            "SELECT table_name FROM duckdb_tables() WHERE schema_name = current_schema()").fetchall()}
+        create_rollup_tables(conn)
+
+        state = conn.execute(
+            "SELECT Last_Accident_ID FROM rollup_state WHERE Name = 'monthly'").fetchone()
+        last_id = state[0] if state else 0
+
+        for table in ROLLUPS:
+            if last_id and table not in existing:
+                _roll_up(conn, table, 0, last_id)
+                logger.info(f"Backfilled {table} up to Accident_ID {last_id}")
+
+        upper_id, pending = conn.execute(
+            "SELECT max(Accident_ID), count(*) FROM accident WHERE Accident_ID > ?", [last_id]).fetchone()
+
+        if not pending:
+            conn.execute("COMMIT")
+            return 0
+
+        for table in ROLLUPS:
+            _roll_up(conn, table, last_id, upper_id)
+
+        conn.execute("""
+            INSERT INTO rollup_state VALUES ('monthly', ?, current_timestamp)
+            ON CONFLICT (Name) DO UPDATE SET
+                Last_Accident_ID = excluded.Last_Accident_ID,
+                Refreshed_At = excluded.Refreshed_At;
+        """, [upper_id])
+        conn.execute("COMMIT")
+        logger.info(f"Rolled up {pending} accidents (Accident_ID {last_id} -> {upper_id})")
+        return pending
+    except Exception as e:
+        logger.error(f"Rollup refresh failed: {str(e)}")
+        conn.execute("ROLLBACK")
+        raise
+
+
+if __name__ == "__main__":
+    # python rollups.py <duckdb_path>, with the backend stopped (DuckDB allows one writing process)
+    import logging
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    connection = duckdb.connect(sys.argv[1])
+    refresh_rollups(connection, logging.getLogger("rollups"))
+    connection.close()
@@ -0,0 +1,131 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# KPI figures from the daily_summary rollup over [min(month start, yesterday), tomorrow), filtered by
+# state/city. The KPI periods are FILTERs of one scan and the three groupings share it.
+# grouping_id: 3 = all rows, 1 = per City, 2 = per Severity
+STATS_QUERY = """
+    SELECT
+        grouping(City, Severity) AS grouping_id,
+        City,
+        Severity,
+        CAST(coalesce(SUM(count) FILTER (WHERE Day = ?), 0) AS BIGINT) AS today,
+        CAST(coalesce(SUM(count) FILTER (WHERE Day = ?), 0) AS BIGINT) AS yesterday,
+        CAST(coalesce(SUM(count) FILTER (WHERE Day >= ?), 0) AS BIGINT) AS month
+    FROM daily_summary
+    WHERE Day >= ? AND Day < ?
+        AND (? IS NULL OR State = ?) AND (? IS NULL OR City = ?)
+    GROUP BY GROUPING SETS ((), (City), (Severity))
+"""
+
+# Incidents in PostgreSQL the ETL has not loaded yet (created after its high-water mark)
+LIVE_QUERY = """
+    SELECT CAST(start_time AS DATE) AS day, city AS "City", severity AS "Severity", COUNT(*) AS count
+    FROM traffic_incidents
+    WHERE start_time >= :start AND start_time < :end
+        AND (CAST(:high_water AS TIMESTAMP) IS NULL OR created_at > :high_water)
+        AND (CAST(:state AS TEXT) IS NULL OR CAST(state AS TEXT) = :state)
+        AND (CAST(:city AS TEXT) IS NULL OR city = :city)
+    GROUP BY 1, 2, 3
+"""
+
+
+def stats_window(as_of: date) -> Dict[str, date]:
+    """Half-open day bounds of the KPI periods for the day `as_of`"""
+    return {
+        "today": as_of,
+        "tomorrow": as_of + timedelta(days=1),
+        "yesterday": as_of - timedelta(days=1),
+        "month_start": as_of.replace(day=1),
+    }
+
+
+async def read_high_water(db) -> Optional[datetime]:
+    """created_at of the newest incident the ETL has loaded, None before its first run"""
+    exists = await db.execute_df(
+        "SELECT count(*) AS n FROM duckdb_tables() WHERE table_name = 'etl_watermark'")
+    if not exists["n"].iloc[0]:
+        return None
+    res = await db.execute_df(
+        "SELECT High_Water FROM etl_watermark WHERE Source_Table = 'traffic_incidents'")
+    return None if res.empty else res["High_Water"].iloc[0].to_pydatetime()
+
+
+def fetch_live_counts(session: Session, as_of: date, high_water: Optional[datetime],
+                      state: Optional[str], city: Optional[str]) -> pd.DataFrame:
+    """(day, City, Severity, count) of the not yet loaded incidents in the KPI periods. Blocking."""
+    window = stats_window(as_of)
+    rows = session.execute(text(LIVE_QUERY), {
+        "start": datetime.combine(min(window["yesterday"], window["month_start"]), time.min),
+        "end": datetime.combine(window["tomorrow"], time.min),
+        "high_water": high_water,
+        "state": state,
+        "city": city,
+    }).fetchall()
+    return pd.DataFrame(rows, columns=["day", "City", "Severity", "count"])
+
+
+def _group_live(live: pd.DataFrame, as_of: date) -> pd.DataFrame:
+    """The live counts shaped like the STATS_QUERY result"""
+    window = stats_window(as_of)
+    periods = pd.DataFrame({
+        "City": live["City"],
+        "Severity": live["Severity"].astype("Int64"),
+        "today": live["count"].where(live["day"] == window["today"], 0),
+        "yesterday": live["count"].where(live["day"] == window["yesterday"], 0),
+        "month": live["count"].where(live["day"] >= window["month_start"], 0),
+    })
+    counts = ["today", "yesterday", "month"]
+    return pd.concat([
+        periods[counts].sum().to_frame().T.assign(grouping_id=3, City=None, Severity=None),
+        periods.groupby("City", dropna=False)[counts].sum().reset_index().assign(grouping_id=1, Severity=None),
+        periods.groupby("Severity", dropna=False)[counts].sum().reset_index().assign(grouping_id=2, City=None),
+    ], ignore_index=True)
+
+
+async def compute_stats(db, as_of: date, state: Optional[str] = None, city: Optional[str] = None,
+                        live: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    KPI figures of the dashboard for the day `as_of` in the selected state/city: today's and
+    yesterday's accident counts, the cities with the most and least accidents this month and
+    today's count per severity. `db` is a WarehouseCursor; `live` holds the fetch_live_counts()
+    of incidents the ETL has not loaded yet, which are added to the warehouse figures.
+    """
+    window = stats_window(as_of)
+    res = await db.execute_df(STATS_QUERY, [
+        window["today"], window["yesterday"], window["month_start"],
+        min(window["yesterday"], window["month_start"]), window["tomorrow"],
+        state, state, city, city,
+    ])
+    if live is not None and not live.empty:
+        res = (pd.concat([res, _group_live(live, as_of)], ignore_index=True)
+               .groupby(["grouping_id", "City", "Severity"], dropna=False)[["today", "yesterday", "month"]]
+               .sum().reset_index())
+
+    totals = res[res["grouping_id"] == 3]
+    today = int(totals["today"].sum())
+    yesterday = int(totals["yesterday"].sum())
+
+    cities = res[(res["grouping_id"] == 1) & res["City"].notna() & (res["month"] > 0)]
+    most = cities.sort_values(["month", "City"], ascending=[False, True]).head(1)
+    least = cities.sort_values(["month", "City"], ascending=[True, True]).head(1)
+
+    severities = res[(res["grouping_id"] == 2) & res["Severity"].notna() & (res["today"] > 0)].sort_values("Severity")
+
+    return {
+        "as_of": as_of.isoformat(),
+        "state": state,
+        "city": city,
+        "live": live is not None,
+        "total_accident_today": {"total_accident_today": today, "total_yesterday": yesterday},
+        "most_accident_city": {"City": most["City"].iloc[0], "count": int(most["month"].iloc[0])}
+        if not most.empty else {"City": "No Data", "count": 0},
+        "least_accident_city": {"City": least["City"].iloc[0], "count": int(least["month"].iloc[0])}
+        if not least.empty else {"City": "No Data", "count": 0},
+        "count_each_severity_today": [{"Severity": int(severity), "count": int(count)}
+                                      for severity, count in zip(severities["Severity"], severities["today"])],
+    }
@@ -0,0 +1,121 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+except ImportError:  # DuckDB needs pyarrow for record batches; without it charts are not streamed
+    pa = None
+
+# End-of-stream marker of the Arrow IPC streaming format
+ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque pagination cursor holding the sort key of the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(list(values), default=str).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed cursor")
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+    return values
+
+
+def keyset_page(query: str, parameters: list, keys: Sequence[str],
+                after: Optional[Sequence[Any]], limit: int) -> Tuple[str, list]:
+    """
+    Wrap a chart query so it returns its rows ordered by `keys`, starting after the key values
+    `after` and stopping after `limit` + 1 rows (the extra row tells whether there is a next page).
+    """
+    parameters = list(parameters)
+    where = ""
+    if after is not None:
+        if len(after) != len(keys):
+            raise ValueError("Malformed cursor")
+        # Lexicographic (k1, k2, ...) > (v1, v2, ...) with NULLs sorting last, spelled out because
+        # comparisons with NULL are NULL: nothing follows a NULL key value, NULL follows every other
+        clauses = []
+        for i, key in enumerate(keys):
+            if after[i] is None:
+                continue
+            clauses.append("(" + " AND ".join([f"{k} IS NOT DISTINCT FROM ?" for k in keys[:i]]
+                                              + [f"({key} > ? OR {key} IS NULL)"]) + ")")
+            parameters += list(after[:i + 1])
+        where = "WHERE " + (" OR ".join(clauses) if clauses else "false")
+    sql = f"""
+        SELECT * FROM ({query.strip().rstrip(';')}) page
+        {where}
+        ORDER BY {', '.join(f"{key} NULLS LAST" for key in keys)}
+        LIMIT {int(limit) + 1}
+    """
+    return sql, parameters
+
+
+class RecordBatchEncoder:
+    """
+    Encodes a DuckDB record batch reader chunk by chunk, so only one batch is held in memory.
+
+    JSON is written as the usual array of records, or, for paginated requests, as
+    {"rows": [...], "next_cursor": ...} with the cursor written after the last row.
+    Arrow is written as an IPC stream: the schema message, one message per batch, end-of-stream.
+    At most `limit` rows are written; the reader is expected to hold one more row when
+    another page exists.
+    """
+
+    def __init__(self, reader: "pa.RecordBatchReader", keys: Sequence[str], limit: int,
+                 arrow: bool = False, envelope: bool = False):
+        self.reader = reader
+        self.keys = list(keys)
+        self.limit = limit
+        self.arrow = arrow
+        self.envelope = envelope
+        self.rows = 0
+        self.has_more = False
+        self._last_key: Optional[List[Any]] = None
+
+    def header(self) -> bytes:
+        if self.arrow:
+            return self.reader.schema.serialize().to_pybytes()
+        return b'{"rows":[' if self.envelope else b"["
+
+    def next_chunk(self) -> Optional[bytes]:
+        """The next encoded batch, or None once the result or the row limit is exhausted. Blocking."""
+        while True:
+            try:
+                batch = self.reader.read_next_batch()
+            except StopIteration:
+                return None
+            if batch.num_rows == 0:
+                continue
+
+            remaining = self.limit - self.rows
+            if batch.num_rows > remaining:
+                self.has_more = True
+                batch = batch.slice(0, remaining)
+                if batch.num_rows == 0:
+                    return None
+
+            first = self.rows == 0
+            self.rows += batch.num_rows
+            last = batch.num_rows - 1
+            self._last_key = [batch.column(key)[last].as_py() for key in self.keys]
+
+            if self.arrow:
+                return batch.serialize().to_pybytes()
+            records = batch.to_pandas().to_json(orient="records")[1:-1]
+            return (records if first else "," + records).encode()
+
+    def next_cursor(self) -> Optional[str]:
+        return encode_cursor(self._last_key) if self.has_more else None
+
+    def footer(self) -> bytes:
+        if self.arrow:
+            return ARROW_EOS
+        if self.envelope:
+            return f'],"next_cursor":{json.dumps(self.next_cursor())}}}'.encode()
+        return b"]"
@@ -0,0 +1,48 @@
+import math
+from typing import Tuple
+
+# Zoom levels of the spatial tile pyramid (Web Mercator / slippy map tiles, as used by the map charts)
+TILE_ZOOM_LEVELS = (6, 8, 10, 12, 14)
+
+# A map shown at zoom Z is drawn from tiles this many levels deeper: 32x32 cells per 256 pixel
+# map tile, about one cell per 8 pixels (zoom 3 -> level 8, about 1.4 degrees of longitude)
+TILE_DETAIL_LEVELS = 5
+
+# Web Mercator is undefined at the poles
+MAX_LATITUDE = 85.0511
+
+
+def tile_x(lng: float, zoom: int) -> int:
+    n = 2 ** zoom
+    return min(max(int(math.floor((lng + 180.0) / 360.0 * n)), 0), n - 1)
+
+
+def tile_y(lat: float, zoom: int) -> int:
+    n = 2 ** zoom
+    lat = math.radians(min(max(lat, -MAX_LATITUDE), MAX_LATITUDE))
+    y = (1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) / 2.0 * n
+    return min(max(int(math.floor(y)), 0), n - 1)
+
+
+def tile_x_sql(lng: str, zoom: str) -> str:
+    """SQL equivalent of tile_x() over column expressions"""
+    return f"CAST(least(greatest(floor(({lng} + 180.0) / 360.0 * pow(2, {zoom})), 0), pow(2, {zoom}) - 1) AS INTEGER)"
+
+
+def tile_y_sql(lat: str, zoom: str) -> str:
+    """SQL equivalent of tile_y() over column expressions"""
+    rad = f"radians(least(greatest(CAST({lat} AS DOUBLE), -{MAX_LATITUDE}), {MAX_LATITUDE}))"
+    return (f"CAST(least(greatest(floor((1.0 - ln(tan({rad}) + 1.0 / cos({rad})) / pi()) / 2.0 * pow(2, {zoom})), 0), "
+            f"pow(2, {zoom}) - 1) AS INTEGER)")
+
+
+def pyramid_level(map_zoom: float) -> int:
+    """Stored pyramid level used to draw a map at `map_zoom`"""
+    wanted = map_zoom + TILE_DETAIL_LEVELS
+    return max((level for level in TILE_ZOOM_LEVELS if level <= wanted), default=TILE_ZOOM_LEVELS[0])
+
+
+def bbox_tiles(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+               zoom: int) -> Tuple[int, int, int, int]:
+    """(x_min, x_max, y_min, y_max) tile range covering a bounding box; tile y grows southwards"""
+    return tile_x(min_lng, zoom), tile_x(max_lng, zoom), tile_y(max_lat, zoom), tile_y(min_lat, zoom)
@@ -0,0 +1,188 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Solar altitude (degrees) at which each Day/Night flag flips: the sun's upper limb on the horizon
+# (with refraction) for sunrise/sunset, then its centre 6, 12 and 18 degrees below the horizon
+TWILIGHT_ALTITUDES = {
+    "sunrise_sunset": -0.833,
+    "civil_twilight": -6.0,
+    "nautical_twilight": -12.0,
+    "astronomical_twilight": -18.0,
+}
+
+MINUTES_PER_DAY = 1440
+TROPICAL_YEAR_DAYS = 365.2422
+
+# City-day memoization rounds coordinates to ~1 km, which moves the boundaries by seconds
+COORDINATE_DECIMALS = 2
+
+Boundaries = Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+DAY_NIGHT = np.array(["Night", "Day"], dtype=object)
+
+# Staged incidents missing any flag but with the coordinates and start time to compute them
+MISSING_TWILIGHT = """
+    SELECT rowid AS row_id, CAST(start_lat AS DOUBLE) AS lat, CAST(start_lng AS DOUBLE) AS lng, start_time
+    FROM {table}
+    WHERE (sunrise_sunset IS NULL OR civil_twilight IS NULL
+           OR nautical_twilight IS NULL OR astronomical_twilight IS NULL)
+        AND start_lat IS NOT NULL AND start_lng IS NOT NULL AND start_time IS NOT NULL
+"""
+
+# Only the missing flags are filled, flags entered with the report are kept
+FILL_TWILIGHT = """
+    UPDATE {table} SET
+        sunrise_sunset = coalesce({table}.sunrise_sunset, f.sunrise_sunset),
+        civil_twilight = coalesce({table}.civil_twilight, f.civil_twilight),
+        nautical_twilight = coalesce({table}.nautical_twilight, f.nautical_twilight),
+        astronomical_twilight = coalesce({table}.astronomical_twilight, f.astronomical_twilight)
+    FROM twilight_fill f
+    WHERE {table}.rowid = f.row_id
+"""
+
+
+def solar_position(minutes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Declination (radians) and equation of time (minutes) of the sun at UTC instants given in minutes
+    since 1970-01-01, from NOAA's fractional-year series. The year angle runs over the mean tropical
+    year instead of restarting every January 1st, which avoids calendar arithmetic per point.
+    """
+    g = 2 * np.pi / TROPICAL_YEAR_DAYS * (np.asarray(minutes, dtype=np.float64) / MINUTES_PER_DAY - 0.5)
+    cos_g, sin_g = np.cos(g), np.sin(g)
+    # Multiple angles from cos g and sin g instead of four more trigonometric calls
+    cos_2g, sin_2g = 2 * cos_g ** 2 - 1, 2 * sin_g * cos_g
+    cos_3g, sin_3g = cos_g * (4 * cos_g ** 2 - 3), sin_g * (3 - 4 * sin_g ** 2)
+
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * cos_g - 0.032077 * sin_g
+                                 - 0.014615 * cos_2g - 0.040849 * sin_2g)
+    declination = (0.006918 - 0.399912 * cos_g + 0.070257 * sin_g - 0.006758 * cos_2g
+                   + 0.000907 * sin_2g - 0.002697 * cos_3g + 0.00148 * sin_3g)
+    return declination, equation_of_time
+
+
+def solar_days(lng: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    """The local solar day (days since 1970-01-01) of UTC instants given in minutes since the epoch"""
+    return np.floor((minutes + 4 * lng) / MINUTES_PER_DAY).astype(np.int64)
+
+
+def _half_day(sin_lat: np.ndarray, cos_lat: np.ndarray, declination: np.ndarray, altitude: float):
+    """
+    Minutes between noon and the sun crossing `altitude`, and the cosine of that hour angle,
+    which is outside [-1, 1] when the sun does not cross it
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_hour_angle = ((np.sin(np.radians(altitude)) - sin_lat * np.sin(declination))
+                          / (cos_lat * np.cos(declination)))
+    return 4 * np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1))), cos_hour_angle
+
+
+def boundaries(lat: np.ndarray, lng: np.ndarray, days: np.ndarray) -> Boundaries:
+    """
+    (start, end) of the daylight period of each altitude in TWILIGHT_ALTITUDES, in minutes since
+    1970-01-01 UTC, for each (lat, lng, solar day). The period is (-inf, inf) where the sun stays above
+    the altitude all day and (NaN, NaN) where it never reaches it.
+
+    The sun's position is evaluated at the solar day's midnights and noon and interpolated linearly
+    to each crossing estimated from the noon position, then the crossing is solved once more.
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.asarray(lng, dtype=np.float64)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    mean_noon = np.asarray(days, dtype=np.int64) * MINUTES_PER_DAY + 720 - 4 * lng
+    noon_declination, noon_equation = solar_position(mean_noon)
+    midnights = {side: solar_position(mean_noon + side * MINUTES_PER_DAY / 2) for side in (-1, 1)}
+
+    result = {}
+    for column, altitude in TWILIGHT_ALTITUDES.items():
+        estimate, _ = _half_day(sin_lat, cos_lat, noon_declination, altitude)
+        crossings = []
+        for side, (midnight_declination, midnight_equation) in midnights.items():
+            weight = estimate / (MINUTES_PER_DAY / 2)
+            declination = noon_declination + (midnight_declination - noon_declination) * weight
+            equation = noon_equation + (midnight_equation - noon_equation) * weight
+            half_day, cos_hour_angle = _half_day(sin_lat, cos_lat, declination, altitude)
+            crossings.append((mean_noon - equation + side * half_day, cos_hour_angle))
+        (start, cos_start), (end, cos_end) = crossings
+        always_up = (cos_start < -1) & (cos_end < -1)
+        never_up = (cos_start > 1) & (cos_end > 1)
+        start[always_up], end[always_up] = -np.inf, np.inf
+        start[never_up], end[never_up] = np.nan, np.nan
+        result[column] = (start, end)
+    return result
+
+
+def daylight_flags(lat, lng, times, memoize: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Day/Night flags of each TWILIGHT_ALTITUDES column for many points at once, as object arrays
+    of "Day", "Night" and None (where the coordinates or time are missing). `times` are UTC
+    (datetime64 or anything np.asarray converts to it). With `memoize`, the boundaries are computed
+    once per city-day, that is per coordinates rounded to two decimals and solar day.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    times = np.asarray(times, dtype="datetime64[s]")
+    valid = ~(np.isnan(lat) | np.isnan(lng) | np.isnat(times))
+    minutes = np.where(valid, times.astype(np.int64), 0) / 60
+    lat, lng = np.where(valid, lat, 0), np.where(valid, lng, 0)
+    days = solar_days(lng, minutes)
+
+    if memoize:
+        lat_key = np.round(lat * 10 ** COORDINATE_DECIMALS).astype(np.int64)
+        lng_key = np.round(lng * 10 ** COORDINATE_DECIMALS).astype(np.int64)
+        lng_range = 360 * 10 ** COORDINATE_DECIMALS + 1
+        keys = ((lat_key * lng_range + lng_key) << 24) + days
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        periods = {column: (start[inverse], end[inverse]) for column, (start, end) in boundaries(
+            lat_key[first] / 10 ** COORDINATE_DECIMALS, lng_key[first] / 10 ** COORDINATE_DECIMALS,
+            days[first]).items()}
+    else:
+        periods = boundaries(lat, lng, days)
+
+    flags = {}
+    for column, (start, end) in periods.items():
+        flag = DAY_NIGHT[((start <= minutes) & (minutes <= end)).view(np.int8)]
+        flag[~valid] = None
+        flags[column] = flag
+    return flags
+
+
+@lru_cache(maxsize=4096)
+def _city_day(lat: float, lng: float, day: int) -> Dict[str, Tuple[float, float]]:
+    return {column: (float(start[0]), float(end[0]))
+            for column, (start, end) in boundaries(np.array([lat]), np.array([lng]), np.array([day])).items()}
+
+
+def daylight_fields(lat: float, lng: float, at: datetime) -> Dict[str, Optional[str]]:
+    """Day/Night flags at one point for a report; a naive `at` is the server's local time. Memoized per city-day."""
+    minutes = at.astimezone(timezone.utc).timestamp() / 60
+    day = int(solar_days(np.float64(lng), np.float64(minutes)))
+    periods = _city_day(round(lat, COORDINATE_DECIMALS), round(lng, COORDINATE_DECIMALS), day)
+    return {column: "Day" if start <= minutes <= end else "Night" for column, (start, end) in periods.items()}
+
+
+def fill_missing_twilight(conn, table: str, tz: str, logger) -> int:
+    """
+    Compute the missing Day/Night flags of the incidents in DuckDB `table` (the ETL's staged_incidents)
+    from their coordinates and start time. start_time is naive local time in the zone `tz`.
+    Returns the number of incidents filled.
+    """
+    rows = conn.execute(MISSING_TWILIGHT.format(table=table)).df()
+    if rows.empty:
+        return 0
+    start_utc = (pd.to_datetime(rows["start_time"])
+                 .dt.tz_localize(tz, ambiguous="NaT", nonexistent="shift_forward")
+                 .dt.tz_convert("UTC").dt.tz_localize(None))
+    flags = daylight_flags(rows["lat"].to_numpy(), rows["lng"].to_numpy(), start_utc.to_numpy())
+    fill = pd.DataFrame({"row_id": rows["row_id"], **flags})
+
+    conn.register("twilight_fill", fill)
+    try:
+        conn.execute(FILL_TWILIGHT.format(table=table))
+    finally:
+        conn.unregister("twilight_fill")
+    logger.info(f"Filled missing twilight flags of {len(fill)} incidents")
+    return len(fill)
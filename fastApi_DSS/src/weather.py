@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+# Reports this close in space (about 1 km) and time share one weather observation
+COORDINATE_DECIMALS = 2
+BUCKET_SECONDS = 600
+
+WeatherKey = Tuple[float, float, int]
+
+
+class OpenWeatherProvider:
+    """Current weather from OpenWeather over a pooled keep-alive session. Blocking."""
+
+    def __init__(self, api_key: str, timeout: Tuple[float, float] = (3.05, 10), pool_size: int = 8):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",), respect_retry_after_header=True)
+        self.session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                   max_retries=retry))
+
+    def fetch(self, lat: float, lon: float) -> Dict[str, Any]:
+        response = self.session.get(OPENWEATHER_URL, params={"lat": lat, "lon": lon, "appid": self.api_key},
+                                    timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class FixtureProvider:
+    """Serves one recorded OpenWeather response for every location, for tests and offline development"""
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            self.payload = json.load(f)
+
+    def fetch(self, lat: float, lon: float) -> Dict[str, Any]:
+        return {**self.payload, "coord": {"lat": lat, "lon": lon}}
+
+    def close(self) -> None:
+        pass
+
+
+def make_provider(name: str, api_key: str, fixture_path: str):
+    if not name:
+        name = "openweather" if api_key else "fixture"
+    if name == "fixture":
+        return FixtureProvider(fixture_path)
+    if name == "openweather":
+        if not api_key:
+            raise ValueError("The openweather provider needs OPENWEATHER_API_KEY")
+        return OpenWeatherProvider(api_key)
+    raise ValueError(f"Unknown weather provider: {name}")
+
+
+class WeatherService:
+    """
+    Weather lookups cached per (rounded lat, rounded lon, 10-minute bucket).
+
+    Concurrent lookups of the same bucket share one in-flight provider call (single flight),
+    so a burst of reports from one place costs one upstream request. The provider's
+    blocking fetch runs on a worker thread.
+    """
+
+    def __init__(self, provider=None, ttl_seconds: float = BUCKET_SECONDS, max_entries: int = 4096):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self._cache: "OrderedDict[WeatherKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[WeatherKey, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.fetch_seconds = 0.0
+
+    def configure(self, provider, ttl_seconds: float) -> None:
+        if self.provider is not None:
+            self.provider.close()
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self._cache.clear()
+
+    @staticmethod
+    def bucket(lat: float, lon: float, at: Optional[float] = None) -> WeatherKey:
+        at = time.time() if at is None else at
+        return round(lat, COORDINATE_DECIMALS), round(lon, COORDINATE_DECIMALS), int(at // BUCKET_SECONDS)
+
+    async def get(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Current weather at (lat, lon) as an OpenWeather response"""
+        if self.provider is None:
+            raise RuntimeError("No weather provider configured")
+        key = self.bucket(lat, lon)
+
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl_seconds:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A task of its own, so the fetch completes for the other waiters when the caller that
+            # started it is cancelled (e.g. its client disconnected)
+            in_flight = asyncio.create_task(self._fetch(key))
+            self._in_flight[key] = in_flight
+        return await asyncio.shield(in_flight)
+
+    async def _fetch(self, key: WeatherKey) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            # The rounded coordinates are fetched, so every report in the bucket gets the same observation
+            weather = await asyncio.to_thread(self.provider.fetch, key[0], key[1])
+        except Exception:
+            self.errors += 1
+            raise
+        else:
+            self._cache[key] = (time.monotonic(), weather)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            return weather
+        finally:
+            self.fetch_seconds += time.perf_counter() - start
+            del self._in_flight[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "provider": type(self.provider).__name__ if self.provider else None,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else None,
+            "mean_fetch_ms": self.fetch_seconds / self.misses * 1000 if self.misses else None,
+        }